@@ -0,0 +1,80 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, TypeVar
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.util import await_only
+from config import get_settings
+
+settings = get_settings()
+
+# Async drivers for the sync URLs used in DATABASE_URL
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+}
+
+def get_async_database_url() -> str:
+    """Async counterpart of DATABASE_URL unless ASYNC_DATABASE_URL is set"""
+    if settings.ASYNC_DATABASE_URL:
+        return settings.ASYNC_DATABASE_URL
+
+    url = make_url(settings.DATABASE_URL)
+    driver = ASYNC_DRIVERS.get(url.drivername, url.drivername)
+    return url.set(drivername=driver).render_as_string(hide_password=False)
+
+def engine_options(url: str) -> Dict[str, Any]:
+    """DB_POOL_* sizing only for dialects whose default pool is a QueuePool; in-memory SQLite's is not"""
+    options: Dict[str, Any] = {"pool_pre_ping": True}
+    parsed = make_url(url)
+    if issubclass(parsed.get_dialect().get_pool_class(parsed), QueuePool):
+        options.update(
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT
+        )
+    return options
+
+async_engine = create_async_engine(get_async_database_url(), **engine_options(get_async_database_url()))
+
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    class_=AsyncSession,
+    expire_on_commit=False
+)
+
+async def get_async_db():
+    """Request-scoped async database session"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+T = TypeVar("T")
+
+async def _settle(waiting):
+    if waiting is None:
+        await asyncio.sleep(0)  # a bare yield
+    else:
+        await asyncio.wait([waiting])
+
+def _drive(coroutine):
+    """Run a coroutine to completion from inside AsyncSession.run_sync.
+
+    Its sync Session calls run on run_sync's greenlet like any other code
+    there; whatever it really awaits is handed back to the event loop.
+    """
+    while True:
+        try:
+            waiting = coroutine.send(None)
+        except StopIteration as done:
+            return done.value
+        await_only(_settle(waiting))
+
+async def run_sync_service(db: AsyncSession, call: Callable[[Session], Awaitable[T]]) -> T:
+    """Await a method of a service still written against a sync Session, on db's own connection.
+
+    Its queries go through the async driver, so they never block the event
+    loop and a request needs no second pooled connection.
+    """
+    return await db.run_sync(lambda session: _drive(call(session)))
\ No newline at end of file
@@ -0,0 +1,85 @@
+from typing import NamedTuple
+from fastapi import Depends, HTTPException, status
+from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
+from async_database import get_async_db
+from .jwt_handler import verify_token
+from .token_cache import principal_cache
+import models
+
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
+
+class Principal(NamedTuple):
+    id: int
+    username: str
+
+async def _attach(db: AsyncSession, columns: dict) -> models.RedditAccount:
+    """Cached account columns as an instance of this session, without a query"""
+    account = models.RedditAccount(**columns)
+    make_transient_to_detached(account)
+    return await db.merge(account, load=False)
+
+async def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_async_db)
+):
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+    payload = verify_token(token)
+    username: str = payload.get("sub")
+    if username is None:
+        raise credentials_exception
+    account_id = payload.get("aid")
+
+    columns = principal_cache.get(account_id=account_id, username=username)
+    if columns is not None:
+        return await _attach(db, columns)
+
+    if account_id is not None:
+        user = await db.get(models.RedditAccount, account_id)
+        if user is not None and user.username != username:
+            user = None
+    else:
+        user = await db.scalar(
+            select(models.RedditAccount).where(
+                models.RedditAccount.username == username
+            )
+        )
+
+    if user is None:
+        raise credentials_exception
+    principal_cache.put(user)
+    return user
+
+async def get_current_active_user(
+    current_user: models.RedditAccount = Depends(get_current_user)
+):
+    if not current_user.is_active:
+        raise HTTPException(status_code=400, detail="Inactive user")
+    return current_user
+
+async def get_current_principal(
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_async_db)
+) -> Principal:
+    """Id and username of the caller, from the token claims alone when possible.
+
+    Tokens carrying the account id need no query while principal_cache
+    holds the account as active; anything else goes through
+    get_current_active_user, which checks the database.
+    """
+    payload = verify_token(token)
+    account_id = payload.get("aid")
+    if account_id is not None:
+        columns = principal_cache.get(account_id=account_id, username=payload["sub"])
+        if columns is not None and columns["is_active"]:
+            return Principal(account_id, payload["sub"])
+
+    user = await get_current_active_user(await get_current_user(token, db))
+    return Principal(user.id, user.username)
\ No newline at end of file
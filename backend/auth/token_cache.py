@@ -0,0 +1,170 @@
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Set, Tuple
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
+from config import get_settings
+from utils.logger import app_logger
+import models
+
+settings = get_settings()
+
+PRINCIPAL_CHANNEL = "principal-changed"
+
+class VerifiedTokenCache:
+    """Decoded payloads of tokens whose signature was already checked.
+
+    Keyed by a hash of the token so raw bearer tokens are not kept in
+    memory. An entry lives until the token's own exp, after which the
+    token is decoded again and rejected as expired.
+    """
+
+    def __init__(self, max_items: int):
+        self.max_items = max_items
+        self.entries: "OrderedDict[bytes, Tuple[Dict, float]]" = OrderedDict()
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> Optional[Dict]:
+        key = self._key(token)
+        cached = self.entries.get(key)
+        if cached is None:
+            return None
+        payload, expires_at = cached
+        if expires_at <= time.time():
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return payload
+
+    def put(self, token: str, payload: Dict):
+        expires_at = payload.get("exp")
+        if expires_at is None:
+            return  # Never cache a token that does not expire
+        key = self._key(token)
+        self.entries[key] = (payload, float(expires_at))
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.max_items:
+            self.entries.popitem(last=False)
+
+class PrincipalCache:
+    """Column values of recently authenticated accounts for PRINCIPAL_CACHE_TTL seconds.
+
+    Every committed ORM change to a RedditAccount invalidates it, whoever
+    wrote it, so a deactivated or deleted account stops authenticating
+    right away. With CACHE_BACKEND=redis the account id is also published
+    on PRINCIPAL_CHANNEL and every API process listening drops its copy;
+    get() itself never leaves the process. Entries carry the generation
+    they were cached in, which moves on whenever the listener
+    (re)subscribes, and while it is not subscribed nothing is served from
+    the cache. With the memory backend other processes catch up once
+    their copy expires.
+    """
+
+    def __init__(self, ttl: float, max_items: int):
+        self.ttl = ttl
+        self.max_items = max_items
+        self.entries: "OrderedDict[int, Tuple[Dict, float, int]]" = OrderedDict()
+        self.ids_by_username: Dict[str, int] = {}
+        self.generation = 0
+        self.redis = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.listener: Optional[asyncio.Task] = None
+        self.subscribed = False
+        self.announcing: Set[asyncio.Task] = set()
+
+    def get(self, account_id: Optional[int] = None, username: Optional[str] = None) -> Optional[Dict]:
+        if self.redis is not None and not self.subscribed:
+            return None  # Changes in other processes could go unnoticed
+        if account_id is None:
+            account_id = self.ids_by_username.get(username)
+        cached = self.entries.get(account_id)
+        if cached is None:
+            return None
+        columns, expires_at, generation = cached
+        if expires_at <= time.monotonic() or columns["username"] != username or generation != self.generation:
+            self._drop(account_id)
+            return None
+        return columns
+
+    def put(self, account):
+        columns = {attribute.key: getattr(account, attribute.key) for attribute in inspect(account).mapper.column_attrs}
+        self.entries[account.id] = (columns, time.monotonic() + self.ttl, self.generation)
+        self.entries.move_to_end(account.id)
+        self.ids_by_username[account.username] = account.id
+        if len(self.entries) > self.max_items:
+            self._drop(next(iter(self.entries)))
+
+    def _drop(self, account_id: int):
+        cached = self.entries.pop(account_id, None)
+        if cached is not None and self.ids_by_username.get(cached[0]["username"]) == account_id:
+            del self.ids_by_username[cached[0]["username"]]
+
+    def invalidate(self, account_id: int):
+        """Forget an account after it was updated or deleted, in every process listening; safe from any thread"""
+        self._drop(account_id)
+        if self.redis is not None and self.loop is not None and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self._announce, account_id)
+
+    def _announce(self, account_id: int):
+        task = self.loop.create_task(self.redis.publish(PRINCIPAL_CHANNEL, str(account_id)))
+        self.announcing.add(task)
+        task.add_done_callback(self.announcing.discard)
+
+    async def start(self, client=None):
+        """Listen for changes made in other processes; takes a redis.asyncio compatible client"""
+        self.loop = asyncio.get_running_loop()
+        if client is None and settings.CACHE_BACKEND == "redis":
+            import redis.asyncio as redis
+            client = redis.from_url(settings.CACHE_REDIS_URL)
+        self.redis = client
+        if client is not None:
+            self.listener = asyncio.create_task(self._listen(), name="principal_cache")
+
+    async def stop(self):
+        if self.listener is not None:
+            self.listener.cancel()
+            await asyncio.gather(self.listener, *self.announcing, return_exceptions=True)
+            self.listener = None
+        self.subscribed = False
+
+    async def _listen(self):
+        while True:
+            try:
+                async with self.redis.pubsub() as pubsub:
+                    await pubsub.subscribe(PRINCIPAL_CHANNEL)
+                    # Anything cached before now may have missed a message
+                    self.generation += 1
+                    self.subscribed = True
+                    async for message in pubsub.listen():
+                        if message["type"] == "message":
+                            self._drop(int(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                app_logger.exception("Principal cache lost its subscription, retrying")
+            finally:
+                self.subscribed = False
+            await asyncio.sleep(1)
+
+verified_tokens = VerifiedTokenCache(settings.JWT_CACHE_SIZE)
+principal_cache = PrincipalCache(settings.PRINCIPAL_CACHE_TTL, settings.PRINCIPAL_CACHE_SIZE)
+
+# Invalidate on commit rather than in each service, so no writer can leave a principal stale
+@event.listens_for(models.RedditAccount, "after_update")
+@event.listens_for(models.RedditAccount, "after_delete")
+def _account_changed(mapper, connection, account):
+    object_session(account).info.setdefault("changed_accounts", set()).add(account.id)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_accounts(session):
+    for account_id in session.info.pop("changed_accounts", ()):
+        principal_cache.invalidate(account_id)
+
+@event.listens_for(Session, "after_rollback")
+def _forget_changed_accounts(session):
+    session.info.pop("changed_accounts", None)
\ No newline at end of file
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Dict, Optional
 from functools import lru_cache
 import os
 from dotenv import load_dotenv
@@ -14,36 +14,118 @@ class Settings(BaseSettings):
     
     # Database Settings
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./reddit_pulse.db")
+    ASYNC_DATABASE_URL: Optional[str] = None  # derived from DATABASE_URL when unset
+    DB_POOL_SIZE: int = 20
+    DB_MAX_OVERFLOW: int = 30
+    DB_POOL_TIMEOUT: int = 30  # seconds
+    AUTO_MIGRATE: bool = True  # turn off for fast starts and run `python -m migrate` on deploy
+    STARTUP_BUDGET_SECONDS: float = 3.0  # a slower cold start is logged as a warning
     
     # JWT Settings
     JWT_SECRET_KEY: str = os.getenv("JWT_SECRET_KEY")
     JWT_ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    JWT_CACHE_SIZE: int = 10000  # verified tokens kept until they expire
+    JWT_ACCOUNT_ID_CLAIM: bool = True  # put the account id in new tokens
+    PRINCIPAL_CACHE_TTL: int = 30  # seconds an authenticated account is reused
+    PRINCIPAL_CACHE_SIZE: int = 10000
+    PASSWORD_BCRYPT_ROUNDS: int = 12  # older hashes are upgraded on the next login
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_QUEUE: int = 32  # waiting hashes before logins get 429
     
     # Reddit API Settings
     REDDIT_USER_AGENT: str = "RedditPulse Bot v1.0"
     REDDIT_CLIENT_ID: Optional[str] = None
     REDDIT_CLIENT_SECRET: Optional[str] = None
+    REDDIT_REQUESTS_PER_MINUTE: int = 100  # per OAuth client
+    REDDIT_OAUTH_URL: str = "https://oauth.reddit.com"
+    REDDIT_URL: str = "https://www.reddit.com"
+    REDDIT_POOL_CONNECTIONS: int = 10
+    REDDIT_POOL_MAXSIZE: int = 32  # keep-alive connections per host
+    REDDIT_TOKEN_REFRESH_MARGIN: int = 300  # seconds before expiry
+    REDDIT_TOKEN_CHECK_INTERVAL: int = 60  # seconds
     
     # Scheduling Settings
     MIN_SCHEDULING_INTERVAL: int = 5  # minutes
     MAX_POSTS_PER_DAY: int = 10
     SCHEDULING_TIMEZONE: str = "UTC"
+    SCHEDULER_RESYNC_INTERVAL: int = 60  # minutes
+    PUBLISH_WORKERS: int = 16
+    PUBLISH_RETRY_DELAY: int = 60  # seconds
+    PUBLISH_MAX_ATTEMPTS: int = 5  # then the post is unscheduled and recorded as failed
+    IMPORT_CHUNK_SIZE: int = 500  # rows per insert batch
+    IMPORT_JOB_RETENTION_HOURS: int = 24
+    
+    # Background Job Settings
+    BACKGROUND_MODE: str = "inprocess"  # 'inprocess', or 'queue' with `python -m tasks.worker`
+    WEB_CONCURRENCY: int = 1  # API worker processes, as uvicorn and gunicorn read it; inprocess needs 1
+    JOB_WORKER_PROCESSES: int = 2
+    JOB_WORKER_CONCURRENCY: int = 8  # jobs running at once per worker process
+    JOB_POLL_INTERVAL: float = 1.0  # seconds between claims while the queue is empty
+    JOB_LEASE_SECONDS: int = 60  # renewed while a job runs
+    JOB_MAX_ATTEMPTS: int = 5
+    JOB_RETRY_DELAY: int = 60  # seconds, doubled per attempt
+    JOB_RETRY_MAX_DELAY: int = 3600
+    JOB_RETENTION_DAYS: int = 7  # finished jobs are deleted after this
+    BEST_TIMES_RELOAD_INTERVAL: int = 15 * 60  # seconds; queue mode only, where workers apply new analytics
+    BEST_TIMES_MAX_SUBREDDITS: int = 1000  # matrices kept in memory, about 8 KB each
+    
+    # Autoresponder Settings
+    AUTORESPONDER_MODE: str = "stream"  # 'stream' or 'poll'
+    STREAM_MIN_INTERVAL: float = 2  # seconds between polls of a busy stream
+    STREAM_MAX_INTERVAL: float = 8  # seconds between polls of a quiet stream; bounds reply latency after a lull
+    STREAM_BATCH_SIZE: int = 100
+    STREAM_QUEUE_SIZE: int = 1000
+    STREAM_RESPONSE_WORKERS: int = 4
+    STREAM_RESYNC_POLLS: int = 10  # empty polls before re-reading without the mark
+    STREAM_REFRESH_INTERVAL: int = 60  # seconds between reloads of accounts and rules
+    
+    # Media Settings
+    MEDIA_ROOT: str = "./media"
+    MEDIA_BASE_URL: str = "http://localhost:8000/media"
+    MEDIA_CHUNK_SIZE: int = 1024 * 1024
+    MEDIA_MAX_BYTES: int = 512 * 1024 * 1024
+    MEDIA_MAX_PIXELS: int = 80_000_000
+    MEDIA_THUMBNAIL_SIZE: int = 320
+    MEDIA_PROCESS_WORKERS: int = 2
+    
+    # Subreddit Metadata Settings
+    SUBREDDIT_FLAIRS_TTL: int = 24 * 3600  # seconds
+    SUBREDDIT_RULES_TTL: int = 24 * 3600
+    SUBREDDIT_STATS_TTL: int = 15 * 60
+    SUBREDDIT_METADATA_MAX_STALE: int = 7 * 24 * 3600  # served while revalidating up to this age
+    SUBREDDIT_METADATA_CONCURRENCY: int = 4
+    SUBREDDIT_METADATA_MAX_ENTRIES: int = 5000  # subreddits kept in memory
     
     # Analytics Settings
     ANALYTICS_UPDATE_INTERVAL: int = 5  # minutes
     ANALYTICS_RETENTION_DAYS: int = 90
+    ANALYTICS_HOURLY_DAYS: int = 14  # hourly resolution until then, daily after
+    ANALYTICS_COMPACTION_INTERVAL: int = 60  # minutes
+    ANALYTICS_LEGACY_WRITES: bool = True  # keep filling the analytics table until every reader uses partitions; compaction prunes it under ANALYTICS_RETENTION_DAYS
     
     # Rate Limiting
     RATE_LIMIT_REQUESTS: int = 100
     RATE_LIMIT_PERIOD: int = 60  # seconds
+    RATE_LIMIT_ACCOUNT_REQUESTS: int = 300
+    RATE_LIMIT_ROUTES: Dict[str, int] = {}  # path prefix -> requests per period
+    RATE_LIMIT_MAX_KEYS: int = 100000
+    RATE_LIMIT_REDIS_URL: Optional[str] = None
     
     # Cache Settings
     CACHE_TTL: int = 300  # seconds
+    CACHE_BACKEND: str = "memory"  # 'memory' or 'redis'
+    CACHE_REDIS_URL: Optional[str] = None
+    CACHE_MAX_ENTRIES: int = 10000
+    CACHE_MAX_BYTES: int = 64 * 1024 * 1024
     
     # Logging Settings
     LOG_LEVEL: str = "INFO"
     LOG_FORMAT: str = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    LOG_JSON_CONSOLE: bool = False  # the log file is always JSON
+    LOG_QUEUE_SIZE: int = 10000  # records beyond this are dropped, never waited on
+    LOG_REQUEST_SAMPLE_RATE: float = 0.1  # share of fast successful requests logged
+    LOG_SLOW_REQUEST_SECONDS: float = 1.0  # slower requests are always logged
     
     class Config:
         env_file = ".env"
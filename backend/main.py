@@ -1,39 +1,63 @@
+import time
+
+# Taken before the heavy imports below so startup_seconds covers them
+process_started = time.perf_counter()
+
 from fastapi import FastAPI, Depends
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.staticfiles import StaticFiles
 from contextlib import asynccontextmanager
-from sqlalchemy.orm import Session
+import os
 import uvicorn
 
-from database import engine, SessionLocal
+from async_database import async_engine
+from auth.jwt_handler import password_hasher
+from auth.token_cache import principal_cache
 from config import get_settings
 from middleware.error_middleware import ErrorHandlingMiddleware
 from middleware.rate_limit import RateLimitMiddleware
 from utils.logger import app_logger
+from utils.metrics import metrics
+from utils.reddit_clients import reddit_clients
 from tasks.task_manager import TaskManager
-import models
+from services.media_service import media_service
 import routers
+import routers.auth
 
 settings = get_settings()
 
-# Create database tables
-models.Base.metadata.create_all(bind=engine)
+if settings.AUTO_MIGRATE:
+    # Create database tables; migrate imports every table-defining service, so only when needed
+    from migrate import migrate
+    migrate()
 
 # Task manager instance
 task_manager = None
+startup_seconds = None
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
-    global task_manager
-    task_manager = TaskManager(SessionLocal())
+    global task_manager, startup_seconds
+    os.makedirs(media_service.root, exist_ok=True)
+    await principal_cache.start()
+    task_manager = TaskManager()
     await task_manager.start_all_tasks()
-    app_logger.info("Application started, background tasks initialized")
+    startup_seconds = time.perf_counter() - process_started
+    app_logger.info("Application started in %.2fs, background tasks initialized", startup_seconds)
+    if startup_seconds > settings.STARTUP_BUDGET_SECONDS:
+        app_logger.warning("Startup took longer than the %ss budget", settings.STARTUP_BUDGET_SECONDS)
     
     yield
     
     # Shutdown
     if task_manager:
         await task_manager.stop_all_tasks()
+    media_service.shutdown()
+    password_hasher.shutdown()
+    await principal_cache.stop()
+    await async_engine.dispose()
     app_logger.info("Application shutting down, tasks stopped")
 
 app = FastAPI(
@@ -43,26 +67,20 @@ app = FastAPI(
     lifespan=lifespan
 )
 
-# Middleware
-app.add_middleware(ErrorHandlingMiddleware)
+# Middleware (the last one added runs first)
 app.add_middleware(RateLimitMiddleware)
+app.add_middleware(ErrorHandlingMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:3000"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],  # listing endpoints return the next page's cursor here
 )
 
-# Database dependency
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 # Include routers
+app.include_router(routers.auth.router, tags=["auth"])
 app.include_router(
     routers.accounts.router,
     prefix=f"{settings.API_V1_PREFIX}/accounts",
@@ -84,14 +102,25 @@ app.include_router(
     tags=["scheduling"]
 )
 
+# Content-addressed media store behind MEDIA_BASE_URL; the lifespan creates the directory
+app.mount("/media", StaticFiles(directory=media_service.root, check_dir=False), name="media")
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
+    workers = task_manager.health() if task_manager else []
     return {
-        "status": "healthy",
-        "version": "1.0.0"
+        "status": "healthy" if all(worker["healthy"] for worker in workers) else "degraded",
+        "version": "1.0.0",
+        "startup_seconds": startup_seconds,
+        "workers": workers
     }
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Prometheus metrics endpoint"""
+    return metrics.render() + "\n".join(reddit_clients.render()) + "\n"
+
 if __name__ == "__main__":
     uvicorn.run(
         "main:app",
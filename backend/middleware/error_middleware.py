@@ -1,67 +1,89 @@
-from starlette.middleware.base import BaseHTTPMiddleware
-from fastapi import Request
 from fastapi.responses import JSONResponse
+import random
 import time
-from utils.logger import app_logger
+import uuid
+from config import get_settings
+from utils.logger import access_logger, app_logger, request_id_var
+from utils.metrics import metrics, request_timings
+
+settings = get_settings()
+
+class ErrorHandlingMiddleware:
+    """Times every HTTP request, records metrics and turns crashes into 500s"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.perf_counter()
+        timings = {"db": 0.0, "reddit": 0.0}
+        token = request_timings.set(timings)
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == b"x-request-id":
+                request_id = value.decode("latin-1")[:64]
+                break
+        request_id = request_id or uuid.uuid4().hex
+        request_id_token = request_id_var.set(request_id)
+        status_code = 500
+        response_started = False
+
+        async def send_wrapper(message):
+            nonlocal status_code, response_started
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                response_started = True
+                message.setdefault("headers", [])
+                message["headers"] = [*message["headers"], (b"x-request-id", request_id.encode("latin-1"))]
+            await send(message)
 
-class ErrorHandlingMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
+        metrics.in_flight += 1
         try:
-            start_time = time.time()
-            response = await call_next(request)
-            process_time = time.time() - start_time
-            
-            # Log request completion
-            app_logger.info(
-                f"Request completed: {request.method} {request.url.path} "
-                f"(Duration: {process_time:.2f}s, Status: {response.status_code})"
-            )
-            
-            return response
-            
+            await self.app(scope, receive, send_wrapper)
+
         except Exception as exc:
             app_logger.exception("Unhandled exception occurred")
-            
-            return JSONResponse(
+            if response_started:
+                raise
+
+            response = JSONResponse(
                 status_code=500,
                 content={
                     "error": "Internal Server Error",
                     "detail": str(exc)
                 }
             )
+            await response(scope, receive, send_wrapper)
 
-# /app/backend/middleware/rate_limit.py
-from fastapi import Request, HTTPException
-from starlette.middleware.base import BaseHTTPMiddleware
-import time
-from collections import defaultdict
-from config import get_settings
+        finally:
+            metrics.in_flight -= 1
+            request_timings.reset(token)
+            process_time = time.perf_counter() - start_time
 
-settings = get_settings()
-
-class RateLimitMiddleware(BaseHTTPMiddleware):
-    def __init__(self, app):
-        super().__init__(app)
-        self.request_counts = defaultdict(list)
+            # Label by route template, not raw path, to keep series bounded
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+            metrics.observe_request(scope["method"], route_path, status_code, process_time, timings)
 
-    async def dispatch(self, request: Request, call_next):
-        client_ip = request.client.host
-        current_time = time.time()
-        
-        # Clean up old requests
-        self.request_counts[client_ip] = [
-            req_time for req_time in self.request_counts[client_ip]
-            if current_time - req_time < settings.RATE_LIMIT_PERIOD
-        ]
-        
-        # Check rate limit
-        if len(self.request_counts[client_ip]) >= settings.RATE_LIMIT_REQUESTS:
-            raise HTTPException(
-                status_code=429,
-                detail="Too many requests"
-            )
-        
-        # Add current request
-        self.request_counts[client_ip].append(current_time)
-        
-        return await call_next(request)
\ No newline at end of file
+            # Fast successful requests are sampled; errors and slow ones are always logged
+            if (
+                status_code >= 400
+                or process_time >= settings.LOG_SLOW_REQUEST_SECONDS
+                or random.random() < settings.LOG_REQUEST_SAMPLE_RATE
+            ):
+                access_logger.info(
+                    "Request completed: %s %s (Duration: %.6fs, Status: %s)",
+                    scope["method"], scope["path"], process_time, status_code,
+                    extra={
+                        "method": scope["method"],
+                        "path": scope["path"],
+                        "route": route_path,
+                        "status": status_code,
+                        "duration": round(process_time, 6)
+                    }
+                )
+            request_id_var.reset(request_id_token)
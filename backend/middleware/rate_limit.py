@@ -0,0 +1,163 @@
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+import math
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from auth.jwt_handler import verify_token
+from config import get_settings
+
+settings = get_settings()
+
+class MemoryRateStore:
+    """GCRA state kept in-process: one theoretical arrival time per key.
+
+    Keys are held in least-recently-seen order. A key whose arrival time has
+    passed carries no state worth keeping, so such keys are evicted from
+    the cold end as new ones arrive, and the table never exceeds max_keys.
+    """
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self.tats: "OrderedDict[str, float]" = OrderedDict()
+
+    async def hit(self, limits: List[Tuple[str, int]], period: int) -> Tuple[bool, float]:
+        """Charge one request to every (key, limit) if all of them allow it, else to none"""
+        now = time.monotonic()
+        new_tats = []
+        retry_after = 0.0
+        for key, limit in limits:
+            new_tat = max(self.tats.get(key, now), now) + period / limit
+            retry_after = max(retry_after, new_tat - now - period)
+            new_tats.append((key, new_tat))
+        if retry_after > 0:
+            return False, retry_after
+
+        for key, new_tat in new_tats:
+            self.tats[key] = new_tat
+            self.tats.move_to_end(key)
+        self._evict(now)
+        return True, 0.0
+
+    def _evict(self, now: float):
+        tats = self.tats
+        # Idle keys sit at the front; drop a couple per hit to amortize cleanup
+        for _ in range(2):
+            if not tats:
+                return
+            key, tat = next(iter(tats.items()))
+            if tat > now and len(tats) <= self.max_keys:
+                return
+            del tats[key]
+
+class RedisRateStore:
+    """GCRA state shared between workers through a redis.asyncio client.
+
+    All keys of a request are checked and charged in one script, so it runs
+    atomically and in one round trip.
+    """
+
+    SCRIPT = """
+    local clock = redis.call('TIME')
+    local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+    local period = tonumber(ARGV[1])
+    local new_tats = {}
+    local retry_after = 0
+    for i, key in ipairs(KEYS) do
+        local tat = tonumber(redis.call('GET', key) or now)
+        if tat < now then tat = now end
+        new_tats[i] = tat + tonumber(ARGV[i + 1])
+        if new_tats[i] - now - period > retry_after then
+            retry_after = new_tats[i] - now - period
+        end
+    end
+    if retry_after > 0 then
+        return tostring(retry_after)
+    end
+    for i, key in ipairs(KEYS) do
+        redis.call('SET', key, tostring(new_tats[i]), 'PX', math.ceil((new_tats[i] - now) * 1000))
+    end
+    return '0'
+    """
+
+    def __init__(self, client, prefix: str = "ratelimit:"):
+        self.client = client
+        self.prefix = prefix
+        self.script = client.register_script(self.SCRIPT)
+
+    async def hit(self, limits: List[Tuple[str, int]], period: int) -> Tuple[bool, float]:
+        """Charge one request to every (key, limit) if all of them allow it, else to none"""
+        retry_after = float(await self.script(
+            keys=[self.prefix + key for key, _ in limits],
+            args=[period, *(period / limit for _, limit in limits)]
+        ))
+        return retry_after == 0, retry_after
+
+def create_rate_store():
+    if settings.RATE_LIMIT_REDIS_URL:
+        import redis.asyncio as redis
+        return RedisRateStore(redis.from_url(settings.RATE_LIMIT_REDIS_URL))
+    return MemoryRateStore(settings.RATE_LIMIT_MAX_KEYS)
+
+class RateLimitMiddleware:
+    """Per-client, per-account and per-route request limits.
+
+    Every request counts against its client IP. Requests carrying a valid
+    bearer token also count against the account in its sub claim, however
+    many tokens it holds, and requests under a prefix listed in
+    RATE_LIMIT_ROUTES count against that route's own limit as well. A
+    request refused by any limit is charged to none of them.
+    """
+
+    def __init__(self, app, store=None, routes: Optional[Dict[str, int]] = None):
+        self.app = app
+        self.store = store or create_rate_store()
+        routes = settings.RATE_LIMIT_ROUTES if routes is None else routes
+        # Longest prefix first so the most specific route rule wins
+        self.routes = sorted(routes.items(), key=lambda item: len(item[0]), reverse=True)
+
+    def _route_limit(self, path: str) -> Optional[Tuple[str, int]]:
+        for prefix, limit in self.routes:
+            if path.startswith(prefix):
+                return prefix, limit
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        client = scope.get("client")
+        client_ip = client[0] if client else "unknown"
+        period = settings.RATE_LIMIT_PERIOD
+        checks = [(f"ip:{client_ip}", settings.RATE_LIMIT_REQUESTS)]
+
+        authorization = None
+        for name, value in scope["headers"]:
+            if name == b"authorization":
+                authorization = value
+                break
+        if authorization and authorization[:7].lower() == b"bearer ":
+            try:
+                # Verified tokens are cached, so this is a dict lookup after the first request
+                account = verify_token(authorization[7:].decode("latin-1"))["sub"]
+                checks.append((f"account:{account}", settings.RATE_LIMIT_ACCOUNT_REQUESTS))
+            except HTTPException:
+                pass  # The auth dependency rejects it; the IP limit still applies
+
+        route = self._route_limit(scope["path"])
+        if route is not None:
+            prefix, limit = route
+            checks.append((f"route:{prefix}:{client_ip}", limit))
+
+        allowed, retry_after = await self.store.hit(checks, period)
+        if not allowed:
+            response = JSONResponse(
+                status_code=429,
+                content={"error": "Too many requests"},
+                headers={"Retry-After": str(math.ceil(retry_after))}
+            )
+            await response(scope, receive, send)
+            return
+
+        await self.app(scope, receive, send)
@@ -0,0 +1,25 @@
+import argparse
+from database import engine
+from services.listing_service import ensure_indexes
+import models
+
+# Tables defined next to their services only register on models.Base once imported
+import services.credential_service
+import services.import_service
+import services.job_queue
+import services.publish_failure_service
+import services.rollup_service
+import services.stream_cursor_service
+import services.subreddit_metadata_service
+import services.trend_index_service  # noqa: F401 - only imported to register its tables
+
+def migrate():
+    """Create missing tables and indexes; existing ones are left untouched"""
+    models.Base.metadata.create_all(bind=engine)
+    ensure_indexes(engine)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create the database schema before starting the API or workers")
+    parser.parse_args()
+    migrate()
+    print("Database schema is up to date")
\ No newline at end of file
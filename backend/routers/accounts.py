@@ -1,26 +1,25 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
-from database import get_db
+from async_database import get_async_db, run_sync_service
 import schemas
 from services.account_service import AccountService
+from services.credential_service import CredentialService
+from utils.reddit_clients import reddit_clients
 
 router = APIRouter()
 
 @router.post("/", response_model=schemas.Account)
-async def create_account(account: schemas.AccountCreate, db: Session = Depends(get_db)):
-    service = AccountService(db)
-    return await service.create_account(account)
+async def create_account(account: schemas.AccountCreate, db: AsyncSession = Depends(get_async_db)):
+    return await run_sync_service(db, lambda session: AccountService(session).create_account(account))
 
 @router.get("/", response_model=List[schemas.Account])
-async def get_accounts(db: Session = Depends(get_db)):
-    service = AccountService(db)
-    return await service.get_accounts()
+async def get_accounts(db: AsyncSession = Depends(get_async_db)):
+    return await run_sync_service(db, lambda session: AccountService(session).get_accounts())
 
 @router.get("/{account_id}", response_model=schemas.Account)
-async def get_account(account_id: int, db: Session = Depends(get_db)):
-    service = AccountService(db)
-    account = await service.get_account(account_id)
+async def get_account(account_id: int, db: AsyncSession = Depends(get_async_db)):
+    account = await run_sync_service(db, lambda session: AccountService(session).get_account(account_id))
     if not account:
         raise HTTPException(status_code=404, detail="Account not found")
     return account
@@ -29,13 +28,26 @@ async def get_account(account_id: int, db: Session = Depends(get_db)):
 async def update_account(
     account_id: int, 
     account_update: schemas.AccountUpdate, 
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    service = AccountService(db)
-    return await service.update_account(account_id, account_update)
+    account = await run_sync_service(
+        db, lambda session: AccountService(session).update_account(account_id, account_update)
+    )
+    reddit_clients.evict(account_id)
+    return account
+
+@router.put("/{account_id}/password")
+async def change_password(account_id: int, change: schemas.PasswordChange, db: AsyncSession = Depends(get_async_db)):
+    account = await run_sync_service(db, lambda session: AccountService(session).get_account(account_id))
+    if not account:
+        raise HTTPException(status_code=404, detail="Account not found")
+    if not await CredentialService(db).change_password(account_id, change.new_password, change.current_password):
+        raise HTTPException(status_code=403, detail="Current password is incorrect")
+    return {"message": "Password changed successfully"}
 
 @router.delete("/{account_id}")
-async def delete_account(account_id: int, db: Session = Depends(get_db)):
-    service = AccountService(db)
-    await service.delete_account(account_id)
+async def delete_account(account_id: int, db: AsyncSession = Depends(get_async_db)):
+    await run_sync_service(db, lambda session: AccountService(session).delete_account(account_id))
+    await CredentialService(db).forget(account_id)
+    reddit_clients.evict(account_id)
     return {"message": "Account deleted successfully"}
\ No newline at end of file
@@ -1,10 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Dict
-from database import get_db
+from async_database import get_async_db, run_sync_service
 import schemas
 from services.analytics_service import AnalyticsService
-from services.trend_analysis_service import TrendAnalysisService
+from services.trend_index_service import TrendIndexService
+from services.rollup_service import RollupService
+from services.best_times_service import best_times_engine
+from services.subreddit_metadata_service import subreddit_metadata
+from utils.cache import get_response_cache
 
 router = APIRouter()
 
@@ -12,38 +17,86 @@ router = APIRouter()
 async def get_analytics_overview(
     account_id: int,
     timeframe: str = "30d",
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    service = AnalyticsService(db)
-    return await service.get_overview(account_id, timeframe)
+    service = RollupService(db)
+    try:
+        return await get_response_cache().get_or_compute(
+            "overview",
+            lambda: service.get_overview(account_id, timeframe),
+            account_id=account_id,
+            timeframe=timeframe
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/subreddit/{subreddit}", response_model=schemas.SubredditAnalytics)
 async def get_subreddit_analytics(
     subreddit: str,
     timeframe: str = "30d",
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    service = AnalyticsService(db)
-    return await service.analyze_subreddit(subreddit, timeframe)
+    async def compute():
+        analytics = jsonable_encoder(await run_sync_service(
+            db, lambda session: AnalyticsService(session).analyze_subreddit(subreddit, timeframe)
+        ))
+        analytics["best_posting_times"] = await best_times_engine.get_best_times(db, subreddit)
+        stats = (await subreddit_metadata.get(subreddit, ["stats"]))["stats"]
+        if stats:
+            analytics["subscriber_count"] = stats["subscriber_count"]
+            analytics["active_users"] = stats["active_users"]
+        return analytics
+
+    return await get_response_cache().get_or_compute(
+        "subreddit",
+        compute,
+        subreddit=subreddit,
+        timeframe=timeframe
+    )
+
+@router.get("/subreddit/{subreddit}/metadata", response_model=Dict)
+async def get_subreddit_metadata(subreddit: str):
+    """Cached flairs, rules and subscriber stats for flair selection and validation"""
+    return await subreddit_metadata.get(subreddit)
 
 @router.get("/trends/{subreddit}", response_model=schemas.TrendAnalysis)
 async def get_trend_analysis(
     subreddit: str,
     timeframe: str = "30d",
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    service = TrendAnalysisService(db)
-    return await service.analyze_trends(subreddit, timeframe)
+    service = TrendIndexService(db)
+    try:
+        return await get_response_cache().get_or_compute(
+            "trends",
+            lambda: service.analyze_trends(subreddit, timeframe),
+            subreddit=subreddit,
+            timeframe=timeframe
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/post/{post_id}", response_model=schemas.PostAnalytics)
-async def get_post_analytics(post_id: str, db: Session = Depends(get_db)):
-    service = AnalyticsService(db)
-    return await service.get_post_performance(post_id)
+async def get_post_analytics(post_id: str, db: AsyncSession = Depends(get_async_db)):
+    return await run_sync_service(db, lambda session: AnalyticsService(session).get_post_performance(post_id))
 
 @router.get("/best-times", response_model=Dict)
 async def get_best_posting_times(
     subreddit: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    service = AnalyticsService(db)
-    return await service.get_best_posting_times(subreddit)
\ No newline at end of file
+    async def compute():
+        return {
+            "subreddit": subreddit,
+            "best_times": await best_times_engine.get_best_times(db, subreddit)
+        }
+
+    return await get_response_cache().get_or_compute(
+        "best-times",
+        compute,
+        subreddit=subreddit
+    )
+
+@router.get("/cache/stats", response_model=Dict)
+async def get_cache_stats():
+    return get_response_cache().stats()
\ No newline at end of file
@@ -0,0 +1,25 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from async_database import get_async_db
+from auth.jwt_handler import ACCESS_TOKEN_EXPIRE_MINUTES, create_access_token
+import schemas
+from services.credential_service import CredentialService
+
+router = APIRouter()
+
+@router.post("/token", response_model=schemas.Token)
+async def login(credentials: schemas.UserAuth, db: AsyncSession = Depends(get_async_db)):
+    account = await CredentialService(db).authenticate(credentials.username, credentials.password)
+    if account is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Incorrect username or password",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    if not account.is_active:
+        raise HTTPException(status_code=400, detail="Inactive user")
+    return {
+        "access_token": create_access_token({"sub": account.username}, account_id=account.id),
+        "token_type": "bearer",
+        "expires_in": ACCESS_TOKEN_EXPIRE_MINUTES * 60
+    }
\ No newline at end of file
@@ -1,45 +1,112 @@
-from fastapi import APIRouter, Depends, HTTPException, File, UploadFile
-from sqlalchemy.orm import Session
-from typing import List
-from database import get_db
+from fastapi import APIRouter, Depends, HTTPException, File, Form, Query, Response, UploadFile
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from async_database import get_async_db, run_sync_service
 import schemas
 from services.post_service import PostService
+from services.import_service import import_service
+from services.media_service import MediaTooLarge, media_service
+from services.listing_service import ListingService
+from utils.pagination import InvalidCursor
+from services.post_events import load_before_change, on_post_deleted, on_post_updated, on_posts_created
 
 router = APIRouter()
 
 @router.post("/", response_model=schemas.Post)
-async def create_post(post: schemas.PostCreate, db: Session = Depends(get_db)):
-    service = PostService(db)
-    return await service.create_post(post)
+async def create_post(post: schemas.PostCreate, db: AsyncSession = Depends(get_async_db)):
+    created = await run_sync_service(db, lambda session: PostService(session).create_post(post))
+    await on_posts_created(db, [created])
+    return created
 
 @router.post("/bulk", response_model=List[schemas.Post])
-async def create_bulk_posts(posts: List[schemas.PostCreate], db: Session = Depends(get_db)):
-    service = PostService(db)
-    return await service.create_bulk_posts(posts)
+async def create_bulk_posts(posts: List[schemas.PostCreate], db: AsyncSession = Depends(get_async_db)):
+    created = await run_sync_service(db, lambda session: PostService(session).create_bulk_posts(posts))
+    await on_posts_created(db, created)
+    return created
+
+@router.post("/import")
+async def import_posts(
+    file: UploadFile = File(...),
+    account_id: int = Form(...),
+    timezone: str = Form("UTC")
+):
+    try:
+        job = await import_service.start_import(file, account_id, timezone)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return job.to_dict()
+
+@router.get("/import/{job_id}")
+async def get_import_status(job_id: str):
+    job = await import_service.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return job.to_dict()
+
+@router.get("/import/{job_id}/errors")
+async def get_import_errors(job_id: str):
+    job = await import_service.get_job(job_id)
+    if not job or not job.rows_failed:
+        raise HTTPException(status_code=404, detail="No error report for this import")
+    return StreamingResponse(
+        import_service.iter_report(job_id),
+        media_type="text/csv",
+        headers={"Content-Disposition": f'attachment; filename="import-{job_id}-errors.csv"'}
+    )
+
+def _attach_media(session, post_id: int, media: dict):
+    service = PostService(session)
+    metadata = dict(schemas.Post.model_validate(service.get_post(post_id)).metadata or {})
+    metadata.update(media["metadata"])
+    return service.update_post(post_id, schemas.PostUpdate(media_url=media["media_url"], metadata=metadata))
 
 @router.post("/upload-media")
 async def upload_media(
     file: UploadFile = File(...),
-    db: Session = Depends(get_db)
+    post_id: Optional[int] = Form(None),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    service = PostService(db)
-    return await service.upload_media(file)
+    """Store an upload; with post_id its media_url and metadata["media"] are set on that post"""
+    before = None
+    if post_id is not None:
+        before = await load_before_change(db, post_id)
+        if not before:
+            raise HTTPException(status_code=404, detail="Post not found")
+    try:
+        media = await media_service.store_upload(file)
+    except MediaTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if post_id is not None:
+        post = await run_sync_service(db, lambda session: _attach_media(session, post_id, media))
+        await on_post_updated(db, before, post)
+        media["post_id"] = post_id
+    return media
 
 @router.get("/", response_model=List[schemas.Post])
 async def get_posts(
-    skip: int = 0,
-    limit: int = 100,
+    response: Response,
+    cursor: str = None,
+    limit: int = Query(100, ge=1, le=500),
     account_id: int = None,
     subreddit: str = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    service = PostService(db)
-    return await service.get_posts(skip, limit, account_id, subreddit)
+    service = ListingService(db)
+    try:
+        posts, next_cursor = await service.list_posts(account_id, subreddit, cursor, limit)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return posts
 
 @router.get("/{post_id}", response_model=schemas.Post)
-async def get_post(post_id: int, db: Session = Depends(get_db)):
-    service = PostService(db)
-    post = await service.get_post(post_id)
+async def get_post(post_id: int, db: AsyncSession = Depends(get_async_db)):
+    post = await run_sync_service(db, lambda session: PostService(session).get_post(post_id))
     if not post:
         raise HTTPException(status_code=404, detail="Post not found")
     return post
@@ -48,13 +115,16 @@ async def get_post(post_id: int, db: Session = Depends(get_db)):
 async def update_post(
     post_id: int,
     post_update: schemas.PostUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    service = PostService(db)
-    return await service.update_post(post_id, post_update)
+    before = await load_before_change(db, post_id)
+    post = await run_sync_service(db, lambda session: PostService(session).update_post(post_id, post_update))
+    await on_post_updated(db, before, post)
+    return post
 
 @router.delete("/{post_id}")
-async def delete_post(post_id: int, db: Session = Depends(get_db)):
-    service = PostService(db)
-    await service.delete_post(post_id)
+async def delete_post(post_id: int, db: AsyncSession = Depends(get_async_db)):
+    before = await load_before_change(db, post_id)
+    await run_sync_service(db, lambda session: PostService(session).delete_post(post_id))
+    await on_post_deleted(db, before, post_id)
     return {"message": "Post deleted successfully"}
\ No newline at end of file
@@ -1,41 +1,83 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
-from database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional, Union
+from datetime import date, datetime
+from async_database import get_async_db, run_sync_service
 import schemas
 from services.scheduling_service import SchedulingService
+from services.schedule_solver import ScheduleSolver
+from services.subreddit_metadata_service import subreddit_metadata
+from services.listing_service import ListingService
+from services.post_events import load_before_change, on_post_deleted, on_post_updated, on_posts_created
+from utils.pagination import InvalidCursor, parse_date_bound
 
 router = APIRouter()
 
-@router.post("/schedule", response_model=List[schemas.ScheduledPost])
+@router.post("/schedule", response_model=schemas.SchedulePlan)
 async def schedule_posts(
     posts: List[schemas.PostCreate],
-    db: Session = Depends(get_db)
+    dry_run: bool = False,
+    use_best_times: bool = True,
+    db: AsyncSession = Depends(get_async_db)
 ):
-    service = SchedulingService(db)
-    return await service.create_schedule(posts)
+    flair_errors = await subreddit_metadata.validate_flairs([(post.subreddit, post.flair) for post in posts])
+    invalid = [{"index": index, "error": error} for index, error in enumerate(flair_errors) if error]
+    if invalid:
+        raise HTTPException(status_code=422, detail=invalid)
+
+    placements = await ScheduleSolver(db).solve(posts, use_best_times)
+    if not dry_run:
+        planned = [
+            post.model_copy(update={"scheduled_time": placement["scheduled_time"]})
+            for post, placement in zip(posts, placements)
+        ]
+        scheduled = await run_sync_service(db, lambda session: SchedulingService(session).create_schedule(planned))
+        for placement, post in zip(placements, scheduled):
+            placement["post_id"] = post.id
+        await on_posts_created(db, scheduled)
+    return {"dry_run": dry_run, "placements": placements}
 
 @router.get("/scheduled", response_model=List[schemas.ScheduledPost])
 async def get_scheduled_posts(
+    response: Response,
     account_id: int,
-    start_date: str = None,
-    end_date: str = None,
-    db: Session = Depends(get_db)
+    start_date: Optional[Union[datetime, date]] = None,
+    end_date: Optional[Union[datetime, date]] = None,
+    cursor: str = None,
+    limit: int = Query(100, ge=1, le=500),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    service = SchedulingService(db)
-    return await service.get_scheduled_posts(account_id, start_date, end_date)
+    start = parse_date_bound(start_date)
+    end = parse_date_bound(end_date, end=True)
+    if start and end and start >= end:
+        raise HTTPException(status_code=400, detail="start_date must be before end_date")
+
+    service = ListingService(db)
+    try:
+        posts, next_cursor = await service.list_scheduled(account_id, start, end, cursor, limit)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return posts
 
 @router.put("/schedule/{post_id}", response_model=schemas.ScheduledPost)
 async def update_scheduled_post(
     post_id: int,
     updates: schemas.PostUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    service = SchedulingService(db)
-    return await service.update_schedule(post_id, updates)
+    before = await load_before_change(db, post_id)
+    post = await run_sync_service(db, lambda session: SchedulingService(session).update_schedule(post_id, updates))
+    await on_post_updated(db, before, post)
+    return post
 
 @router.delete("/schedule/{post_id}")
-async def delete_scheduled_post(post_id: int, db: Session = Depends(get_db)):
-    service = SchedulingService(db)
-    await service.delete_scheduled_post(post_id)
+async def delete_scheduled_post(
+    post_id: int,
+    db: AsyncSession = Depends(get_async_db)
+):
+    before = await load_before_change(db, post_id)
+    await run_sync_service(db, lambda session: SchedulingService(session).delete_scheduled_post(post_id))
+    await on_post_deleted(db, before, post_id)
     return {"message": "Scheduled post deleted successfully"}
\ No newline at end of file
@@ -51,6 +51,7 @@ class PostUpdate(BaseModel):
     is_nsfw: Optional[bool] = None
     is_spoiler: Optional[bool] = None
     flair: Optional[str] = None
+    media_url: Optional[HttpUrl] = None
     scheduled_time: Optional[datetime] = None
     metadata: Optional[Dict] = None
 
@@ -65,6 +66,19 @@ class Post(PostBase):
     class Config:
         from_attributes = True
 
+class SchedulePlacement(BaseModel):
+    index: int  # position in the submitted batch
+    account_id: int
+    subreddit: str
+    requested_time: Optional[datetime]
+    scheduled_time: datetime
+    status: str  # 'requested', 'moved', 'best_time' or 'earliest_free'
+    post_id: Optional[int] = None
+
+class SchedulePlan(BaseModel):
+    dry_run: bool
+    placements: List[SchedulePlacement]
+
 # Analytics Schemas
 class AnalyticsBase(BaseModel):
     post_id: str
@@ -147,4 +161,8 @@ class TokenData(BaseModel):
 
 class UserAuth(BaseModel):
     username: str
-    password: str
\ No newline at end of file
+    password: str
+
+class PasswordChange(BaseModel):
+    new_password: str
+    current_password: Optional[str] = None  # required once the account has a password
\ No newline at end of file
@@ -0,0 +1,317 @@
+import argparse
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+from sqlalchemy import (
+    Column, DateTime, Float, Index, Integer, MetaData, String, Table, delete, func, inspect, select
+)
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+from config import get_settings
+from utils.logger import app_logger
+import models
+
+settings = get_settings()
+
+# Partitions are plain tables named by tier and period, so the same code
+# works on SQLite and PostgreSQL and expiring data is a DROP TABLE
+RAW = "analytics_raw_"  # every snapshot, one table per day
+HOURLY = "analytics_hourly_"  # last snapshot per post and hour, one table per day
+DAILY = "analytics_daily_"  # last snapshot per post and day, one table per month
+
+RAW_HOURS = 48
+CATALOG_TTL = 60  # seconds before partitions created or dropped by other processes are seen
+LEGACY_PRUNE_BATCH = 5000
+COLUMNS = ("post_id", "subreddit", "score", "upvote_ratio", "num_comments", "created_at", "tracked_at")
+
+partition_metadata = MetaData()
+
+def _partition(name: str) -> Table:
+    table = partition_metadata.tables.get(name)
+    if table is None:
+        table = Table(
+            name, partition_metadata,
+            Column("post_id", String, nullable=False),
+            Column("subreddit", String, nullable=False),
+            Column("score", Integer, nullable=False),
+            Column("upvote_ratio", Float, nullable=False),
+            Column("num_comments", Integer, nullable=False),
+            Column("created_at", DateTime, nullable=False),
+            Column("tracked_at", DateTime, nullable=False),
+            Index(f"ix_{name}_post_tracked", "post_id", "tracked_at"),
+            Index(f"ix_{name}_subreddit", "subreddit")
+        )
+    return table
+
+class PartitionCatalog:
+    """Process-wide set of existing partition names, so reads and writes skip the inspector.
+
+    Partitions this process creates or drops update it at once; other
+    processes' changes show up after CATALOG_TTL, or right after a query
+    fails on a partition that is gone.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self.names: Optional[Set[str]] = None
+        self.loaded_at = 0.0
+
+    def get(self, db: Session) -> Set[str]:
+        if self.names is None or time.monotonic() - self.loaded_at > self.ttl:
+            self.names = {
+                name for name in inspect(db.connection()).get_table_names()
+                if name.startswith((RAW, HOURLY, DAILY))
+            }
+            self.loaded_at = time.monotonic()
+        return self.names
+
+    def add(self, name: str):
+        if self.names is not None:
+            self.names.add(name)
+
+    def discard(self, name: str):
+        if self.names is not None:
+            self.names.discard(name)
+
+    def forget(self):
+        self.names = None
+
+catalog = PartitionCatalog(CATALOG_TTL)
+
+def _day_name(prefix: str, moment: datetime) -> str:
+    return f"{prefix}{moment:%Y%m%d}"
+
+def _month_name(moment: datetime) -> str:
+    return f"{DAILY}{moment:%Y%m}"
+
+def _period(name: str) -> Tuple[datetime, datetime]:
+    """Start and end of the period a partition covers"""
+    suffix = name.rsplit("_", 1)[1]
+    if len(suffix) == 8:
+        start = datetime.strptime(suffix, "%Y%m%d")
+        return start, start + timedelta(days=1)
+    start = datetime.strptime(suffix, "%Y%m")
+    return start, (start + timedelta(days=32)).replace(day=1)
+
+def _hour(moment: datetime) -> datetime:
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+def _day(moment: datetime) -> datetime:
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+class AnalyticsStore:
+    """Analytics snapshots in time-partitioned tables with retention compaction.
+
+    New snapshots go to a table per day. compact() rolls raw days older than
+    48 hours into hourly resolution, hourly days older than
+    ANALYTICS_HOURLY_DAYS into daily resolution, and drops daily months past
+    ANALYTICS_RETENTION_DAYS. Each step copies one partition and drops it,
+    so no row-by-row deletes ever run and freed pages are reused. While
+    ANALYTICS_LEGACY_WRITES fills the old analytics table, compact() also
+    deletes its rows past the same retention.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def partitions(self, prefix: Optional[str] = None) -> List[str]:
+        """Existing partition names, newest first"""
+        names = [name for name in catalog.get(self.db) if prefix is None or name.startswith(prefix)]
+        return sorted(names, key=lambda name: (_period(name)[0], name.startswith(RAW)), reverse=True)
+
+    def _ensure(self, name: str) -> Table:
+        table = _partition(name)
+        if name not in catalog.get(self.db):
+            table.create(bind=self.db.connection(), checkfirst=True)
+            catalog.add(name)
+        return table
+
+    def _drop(self, name: str):
+        table = _partition(name)
+        table.drop(bind=self.db.connection())
+        partition_metadata.remove(table)
+        catalog.discard(name)
+
+    def _execute(self, statement, parameters=None):
+        try:
+            return self.db.execute(statement, parameters)
+        except DBAPIError:
+            # The partition may be gone in another process, or its create rolled back here
+            catalog.forget()
+            raise
+
+    def write(self, rows: List[Dict]):
+        """Insert snapshots into their day partitions; the caller commits"""
+        by_partition: Dict[str, List[Dict]] = {}
+        for row in rows:
+            by_partition.setdefault(_day_name(RAW, row["tracked_at"]), []).append(row)
+        for name, partition_rows in by_partition.items():
+            self._execute(self._ensure(name).insert(), partition_rows)
+
+    def _overlapping(self, since: Optional[datetime], until: Optional[datetime]) -> List[Table]:
+        tables = []
+        for name in self.partitions():
+            start, end = _period(name)
+            if (since is None or end > since) and (until is None or start <= until):
+                tables.append(_partition(name))
+        return tables
+
+    def history(self, post_id: str, since: Optional[datetime] = None, until: Optional[datetime] = None) -> List[Dict]:
+        """Snapshots of one post in time order, at the resolution each period still has"""
+        snapshots = []
+        for table in self._overlapping(since, until):
+            query = select(*(table.c[column] for column in COLUMNS)).where(table.c.post_id == post_id)
+            if since is not None:
+                query = query.where(table.c.tracked_at >= since)
+            if until is not None:
+                query = query.where(table.c.tracked_at <= until)
+            snapshots.extend(dict(row._mapping) for row in self._execute(query))
+        snapshots.sort(key=lambda snapshot: snapshot["tracked_at"])
+        return snapshots
+
+    def iter_subreddit(self, subreddit: str, columns: Sequence[str], batch_size: int = 50_000) -> Iterator[List[Tuple]]:
+        """Every stored snapshot of a subreddit's posts as batches of column tuples, in no particular order"""
+        for name in self.partitions():
+            table = _partition(name)
+            result = self._execute(
+                select(*(table.c[column] for column in columns)).where(table.c.subreddit == subreddit)
+            )
+            while batch := result.fetchmany(batch_size):
+                yield batch
+
+    def latest(self, post_ids: Iterable[str]) -> Dict[str, Dict]:
+        """Newest snapshot of each post, searching partitions from newest to oldest"""
+        wanted = set(post_ids)
+        found: Dict[str, Dict] = {}
+        for name in self.partitions():
+            if not wanted:
+                break
+            table = _partition(name)
+            pending = list(wanted)
+            for start in range(0, len(pending), 500):
+                query = select(*(table.c[column] for column in COLUMNS)).where(
+                    table.c.post_id.in_(pending[start:start + 500])
+                )
+                for row in self._execute(query):
+                    snapshot = dict(row._mapping)
+                    current = found.get(snapshot["post_id"])
+                    if current is None or snapshot["tracked_at"] > current["tracked_at"]:
+                        found[snapshot["post_id"]] = snapshot
+            wanted -= found.keys()
+        return found
+
+    def _downsample(self, source: str, target: str, truncate):
+        """Copy the last snapshot per post and period of source into target, then drop source"""
+        table = _partition(source)
+        target_table = self._ensure(target)
+        rows = self.db.execute(
+            select(*(table.c[column] for column in COLUMNS)).order_by(table.c.post_id, table.c.tracked_at)
+        )
+        batch = []
+        current_key, current = None, None
+        for row in rows:
+            snapshot = dict(row._mapping)
+            key = (snapshot["post_id"], truncate(snapshot["tracked_at"]))
+            if current is not None and key != current_key:
+                # Rows arrive grouped by post in time order, so the previous period is complete
+                batch.append(current)
+                if len(batch) >= 1000:
+                    self.db.execute(target_table.insert(), batch)
+                    batch = []
+            current_key, current = key, snapshot
+        if current is not None:
+            batch.append(current)
+        if batch:
+            self.db.execute(target_table.insert(), batch)
+        self._drop(source)
+
+    def compact(self, now: Optional[datetime] = None) -> Dict[str, int]:
+        """Downsample and expire partitions; commits after each partition"""
+        now = now or datetime.utcnow()
+        raw_cutoff = now - timedelta(hours=RAW_HOURS)
+        hourly_cutoff = now - timedelta(days=settings.ANALYTICS_HOURLY_DAYS)
+        retention_cutoff = _day(now - timedelta(days=settings.ANALYTICS_RETENTION_DAYS))
+        counts = {"hourly": 0, "daily": 0, "dropped": 0, "legacy_deleted": 0}
+
+        for name in reversed(self.partitions()):
+            start, end = _period(name)
+            if end <= retention_cutoff:
+                self._drop(name)
+                counts["dropped"] += 1
+            elif name.startswith(RAW) and end <= raw_cutoff:
+                self._downsample(name, _day_name(HOURLY, start), _hour)
+                counts["hourly"] += 1
+            elif name.startswith(HOURLY) and end <= hourly_cutoff:
+                self._downsample(name, _month_name(start), _day)
+                counts["daily"] += 1
+            else:
+                continue
+            self.db.commit()
+
+        if settings.ANALYTICS_LEGACY_WRITES:
+            counts["legacy_deleted"] = self._prune_legacy(retention_cutoff)
+        return counts
+
+    def _prune_legacy(self, cutoff: datetime) -> int:
+        """Delete legacy analytics rows older than cutoff in batches, committing after each"""
+        deleted = 0
+        while True:
+            expired = select(models.Analytics.id).where(models.Analytics.tracked_at < cutoff).limit(LEGACY_PRUNE_BATCH)
+            result = self.db.execute(
+                delete(models.Analytics).where(models.Analytics.id.in_(expired)).execution_options(synchronize_session=False)
+            )
+            self.db.commit()
+            deleted += result.rowcount
+            if result.rowcount < LEGACY_PRUNE_BATCH:
+                return deleted
+
+    def _oldest_snapshot(self) -> Optional[datetime]:
+        names = self.partitions()
+        if not names:
+            return None
+        table = _partition(names[-1])
+        return self.db.scalar(select(func.min(table.c.tracked_at)))
+
+    def migrate_legacy(self, batch_size: int = 5000) -> int:
+        """Move rows of the old single analytics table into partitions.
+
+        With ANALYTICS_LEGACY_WRITES on, newer rows are in both places, so
+        only rows older than every partitioned snapshot are copied.
+        """
+        moved = 0
+        last_id = 0
+        query = self.db.query(models.Analytics)
+        oldest = self._oldest_snapshot()
+        if oldest is not None:
+            query = query.filter(models.Analytics.tracked_at < oldest)
+        while True:
+            rows = query.filter(
+                models.Analytics.id > last_id
+            ).order_by(models.Analytics.id).limit(batch_size).all()
+            if not rows:
+                return moved
+            self.write([{column: getattr(row, column) for column in COLUMNS} for row in rows])
+            self.db.commit()
+            last_id = rows[-1].id
+            moved += len(rows)
+
+if __name__ == "__main__":
+    from database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Maintain partitioned analytics storage")
+    parser.add_argument("command", choices=["compact", "migrate"])
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        store = AnalyticsStore(db)
+        if args.command == "compact":
+            app_logger.info("Compacted analytics partitions: %s", store.compact())
+        else:
+            app_logger.info(
+                "Copied %d snapshots into partitions; drop the analytics table once nothing reads it "
+                "and ANALYTICS_LEGACY_WRITES is off",
+                store.migrate_legacy()
+            )
+    finally:
+        db.close()
\ No newline at end of file
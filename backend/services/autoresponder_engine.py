@@ -0,0 +1,198 @@
+import hashlib
+import heapq
+import json
+import re
+import string
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+WORD_RE = re.compile(r"\w+(?:'\w+)?")
+
+class CompiledTemplate:
+    """Response template parsed once into literal and field parts.
+
+    Uses str.format field syntax, e.g. "Thanks {author}!". Fields the item
+    does not provide are left in place rather than raising.
+    """
+
+    __slots__ = ("parts",)
+
+    def __init__(self, template: str):
+        self.parts: List[Tuple[str, Optional[str]]] = [
+            (literal, field)
+            for literal, field, _, _ in string.Formatter().parse(template)
+        ]
+
+    def render(self, values: Dict) -> str:
+        out = []
+        for literal, field in self.parts:
+            out.append(literal)
+            if field is not None:
+                value = values.get(field)
+                out.append("{" + field + "}" if value is None else str(value))
+        return "".join(out)
+
+def _lower_set(values) -> Optional[Set[str]]:
+    if not values:
+        return None
+    if isinstance(values, str):
+        values = [values]
+    return {str(value).lower() for value in values}
+
+class CompiledRule:
+    __slots__ = (
+        "id", "account_id", "type", "subreddits", "authors", "exclude_authors",
+        "keywords", "exclude_keywords", "pattern", "template"
+    )
+
+    def __init__(self, rule):
+        conditions = rule.conditions or {}
+        self.id = rule.id
+        self.account_id = rule.account_id
+        self.type = rule.type
+        self.subreddits = _lower_set(conditions.get("subreddits"))
+        self.authors = _lower_set(conditions.get("authors"))
+        self.exclude_authors = _lower_set(conditions.get("exclude_authors")) or set()
+        self.keywords = _lower_set(conditions.get("keywords"))
+        self.exclude_keywords = _lower_set(conditions.get("exclude_keywords")) or set()
+        self.pattern = re.compile(conditions["regex"], re.IGNORECASE) if conditions.get("regex") else None
+        self.template = CompiledTemplate(rule.template)
+
+def tokenize(text: str) -> Tuple[List[str], Set[str]]:
+    tokens = WORD_RE.findall(text.lower())
+    return tokens, set(tokens)
+
+class KeywordIndex:
+    """Finds which rules' keywords occur in a text in one pass.
+
+    Keywords are split into word tokens. Single words are looked up per
+    token in a dict; phrases are indexed by their first word and compared
+    against the following tokens only where that word occurs.
+    """
+
+    def __init__(self, keywords_by_rule: Dict[int, Set[str]]):
+        self.words: Dict[str, Set[int]] = defaultdict(set)
+        self.phrases: Dict[str, Dict[Tuple[str, ...], Set[int]]] = defaultdict(lambda: defaultdict(set))
+        for rule_id, keywords in keywords_by_rule.items():
+            for keyword in keywords:
+                tokens = tuple(WORD_RE.findall(keyword))
+                if len(tokens) == 1:
+                    self.words[tokens[0]].add(rule_id)
+                elif tokens:
+                    self.phrases[tokens[0]][tokens[1:]].add(rule_id)
+
+    def __bool__(self):
+        return bool(self.words or self.phrases)
+
+    def hits(self, tokens: List[str], token_set: Set[str]) -> Set[int]:
+        """Rules with a keyword among tokens, the lowercased words of a text from tokenize()"""
+        # Intersect and union in C first; only tokens that start some phrase are visited
+        hits: Set[int] = set().union(*map(self.words.__getitem__, self.words.keys() & token_set))
+        heads = self.phrases.keys() & token_set
+        if heads:
+            for position, token in enumerate(tokens):
+                if token not in heads:
+                    continue
+                for tail, rule_ids in self.phrases[token].items():
+                    if tuple(tokens[position + 1:position + 1 + len(tail)]) == tail:
+                        hits |= rule_ids
+        return hits
+
+class RuleMatcher:
+    """All active autoresponder rules of one account compiled for matching.
+
+    Rules are bucketed by item type and subreddit, keyword conditions of all
+    rules share one KeywordIndex, and only the few rules left after those
+    lookups run their author and regex checks. Rules are tried in id order
+    and the first match wins.
+    """
+
+    def __init__(self, rules: Iterable):
+        self.rules: Dict[int, CompiledRule] = {}
+        self.by_scope: Dict[Tuple[str, Optional[str]], List[int]] = defaultdict(list)
+
+        for rule in sorted(rules, key=lambda rule: rule.id):
+            compiled = CompiledRule(rule)
+            self.rules[compiled.id] = compiled
+            for subreddit in compiled.subreddits or (None,):
+                self.by_scope[(compiled.type, subreddit)].append(compiled.id)
+
+        self.include = KeywordIndex({rule.id: rule.keywords for rule in self.rules.values() if rule.keywords})
+        self.exclude = KeywordIndex({rule.id: rule.exclude_keywords for rule in self.rules.values() if rule.exclude_keywords})
+        self._scopes: Dict[Tuple[str, str], Tuple[Set[int], List[int]]] = {}
+
+    def _scope(self, item_type: str, subreddit: str) -> Tuple[Set[int], List[int]]:
+        """Rules that apply to this type and subreddit: (keyword rules, other rules in id order)"""
+        key = (item_type, subreddit)
+        scope = self._scopes.get(key)
+        if scope is None:
+            rule_ids = set(self.by_scope.get((item_type, subreddit), ())) | set(self.by_scope.get((item_type, None), ()))
+            scope = (
+                {rule_id for rule_id in rule_ids if self.rules[rule_id].keywords is not None},
+                sorted(rule_id for rule_id in rule_ids if self.rules[rule_id].keywords is None)
+            )
+            self._scopes[key] = scope
+        return scope
+
+    def match(self, item: Dict) -> Optional[Tuple[CompiledRule, str]]:
+        """Return the first rule matching the item and its rendered reply"""
+        keyword_rules, other_rules = self._scope(item["type"], (item.get("subreddit") or "").lower())
+        if not keyword_rules and not other_rules:
+            return None
+
+        author = (item.get("author") or "").lower()
+        text = " ".join(filter(None, (item.get("subject"), item.get("title"), item.get("body"))))
+        # Both indexes share one tokenization of the text
+        tokens = tokenize(text) if keyword_rules or self.exclude else None
+        hits = self.include.hits(*tokens) & keyword_rules if keyword_rules else ()
+        excluded = self.exclude.hits(*tokens) if self.exclude else set()
+
+        # Keyword rules only need checking when one of their keywords occurred
+        for rule_id in heapq.merge(sorted(hits), other_rules):
+            rule = self.rules[rule_id]
+            if rule_id in excluded:
+                continue
+            if rule.authors is not None and author not in rule.authors:
+                continue
+            if author in rule.exclude_authors:
+                continue
+            if rule.pattern is not None and not rule.pattern.search(text):
+                continue
+            return rule, rule.template.render(item)
+        return None
+
+def rules_fingerprint(rules: Iterable) -> str:
+    digest = hashlib.sha1()
+    for rule in sorted(rules, key=lambda rule: rule.id):
+        digest.update(json.dumps(
+            [rule.id, rule.type, rule.template, rule.conditions, rule.is_active],
+            sort_keys=True, default=str
+        ).encode())
+    return digest.hexdigest()
+
+class MatcherCache:
+    """Compiled matchers per account, rebuilt when the account's rules change.
+
+    Rule writes need no invalidation: a changed rule changes the fingerprint
+    of the account's rules on the next get().
+    """
+
+    def __init__(self):
+        self.matchers: Dict[int, Tuple[str, RuleMatcher]] = {}
+
+    def get(self, account_id: int, rules: List) -> RuleMatcher:
+        active = [rule for rule in rules if rule.is_active]
+        fingerprint = rules_fingerprint(active)
+        cached = self.matchers.get(account_id)
+        if cached is None or cached[0] != fingerprint:
+            cached = (fingerprint, RuleMatcher(active))
+            self.matchers[account_id] = cached
+        return cached[1]
+
+    def retain(self, account_ids: Iterable[int]):
+        """Drop matchers of accounts that no longer have active rules"""
+        keep = set(account_ids)
+        for account_id in [account_id for account_id in self.matchers if account_id not in keep]:
+            del self.matchers[account_id]
+
+matcher_cache = MatcherCache()
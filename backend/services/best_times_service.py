@@ -0,0 +1,212 @@
+import math
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence
+from zoneinfo import ZoneInfo
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from async_database import run_sync_service
+from config import get_settings
+from services.analytics_store import AnalyticsStore
+
+if TYPE_CHECKING:
+    import numpy as np
+
+settings = get_settings()
+
+BINS = 7 * 24
+HALF_LIFE_DAYS = 30
+DECAY_RATE = math.log(2) / (HALF_LIFE_DAYS * 86400)  # per second
+COMMENT_WEIGHT = 2.0  # one comment counts as much as two points of score
+MIN_SAMPLES = 3
+Z_95 = 1.96
+HISTORY_COLUMNS = ("created_at", "tracked_at", "score", "num_comments")
+WEEKDAYS = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+
+class EngagementMatrix:
+    """Time-decayed weekday x hour engagement sums for one subreddit.
+
+    Every snapshot lands in the bin of its post's creation time, weighted
+    exp(-rate * (anchor - tracked)) relative to a moving anchor, so adding
+    new snapshots never requires touching old ones. Moving the anchor
+    rescales every sum by the same factor and leaves means unchanged.
+    """
+
+    __slots__ = ("anchor", "loaded_at", "count", "w", "w2", "score", "score2", "comments")
+
+    def __init__(self, anchor: float):
+        # NumPy is imported on first use to keep it out of API startup
+        import numpy as np
+
+        self.anchor = anchor
+        self.loaded_at = time.monotonic()
+        self.count = np.zeros(BINS, dtype=np.int64)
+        self.w = np.zeros(BINS)
+        self.w2 = np.zeros(BINS)
+        self.score = np.zeros(BINS)
+        self.score2 = np.zeros(BINS)
+        self.comments = np.zeros(BINS)
+
+    def reanchor(self, anchor: float):
+        factor = math.exp(-DECAY_RATE * (anchor - self.anchor))
+        self.w *= factor
+        self.w2 *= factor * factor
+        self.score *= factor
+        self.score2 *= factor
+        self.comments *= factor
+        self.anchor = anchor
+
+    def add(self, bins, tracked, scores, comments):
+        import numpy as np
+
+        weights = np.exp(-DECAY_RATE * (self.anchor - tracked))
+        self.count += np.bincount(bins, minlength=BINS)
+        self.w += np.bincount(bins, weights=weights, minlength=BINS)
+        self.w2 += np.bincount(bins, weights=weights * weights, minlength=BINS)
+        self.score += np.bincount(bins, weights=weights * scores, minlength=BINS)
+        self.score2 += np.bincount(bins, weights=weights * scores * scores, minlength=BINS)
+        self.comments += np.bincount(bins, weights=weights * comments, minlength=BINS)
+
+class BestTimesEngine:
+    """Best weekday/hour posting slots per subreddit.
+
+    Each subreddit's snapshot history in AnalyticsStore is binned once with
+    NumPy into a 7x24 matrix in SCHEDULING_TIMEZONE, then kept current as
+    the analytics refresh writes new snapshots, so a query is a handful of
+    vector operations over 168 cells. The BEST_TIMES_MAX_SUBREDDITS most
+    recently queried subreddits stay loaded.
+    """
+
+    def __init__(self, tz_name: Optional[str] = None, max_subreddits: Optional[int] = None):
+        self.tz = ZoneInfo(tz_name or settings.SCHEDULING_TIMEZONE)
+        self.matrices: "OrderedDict[str, EngagementMatrix]" = OrderedDict()
+        self.max_subreddits = max_subreddits or settings.BEST_TIMES_MAX_SUBREDDITS
+        # In queue mode observe() only runs in worker processes, so API processes reload from the store
+        self.max_age = settings.BEST_TIMES_RELOAD_INTERVAL if settings.BACKGROUND_MODE == "queue" else None
+
+    def _bins(self, seconds: "np.ndarray") -> "np.ndarray":
+        """Map UTC epoch seconds to weekday * 24 + hour in the local timezone"""
+        import numpy as np
+
+        hours, inverse = np.unique(seconds // 3600, return_inverse=True)
+        offsets = np.array([
+            datetime.fromtimestamp(int(hour) * 3600, self.tz).utcoffset().total_seconds()
+            for hour in hours
+        ], dtype=np.int64)
+        local = seconds + offsets[inverse]
+        weekday = (local // 86400 + 3) % 7  # 1970-01-01 was a Thursday
+        hour = (local % 86400) // 3600
+        return (weekday * 24 + hour).astype(np.int64)
+
+    @staticmethod
+    def _seconds(moments: Sequence[datetime]) -> "np.ndarray":
+        import numpy as np
+
+        # Naive datetimes are UTC throughout the backend
+        return np.array(moments, dtype="datetime64[s]").astype(np.int64)
+
+    def _add(self, matrix: EngagementMatrix, created_at, tracked_at, scores, comments):
+        import numpy as np
+
+        matrix.add(
+            self._bins(self._seconds(created_at)),
+            self._seconds(tracked_at),
+            np.asarray(scores, dtype=np.float64),
+            np.asarray(comments, dtype=np.float64)
+        )
+
+    def _load(self, db: Session, subreddit: str, anchor: float) -> EngagementMatrix:
+        matrix = EngagementMatrix(anchor)
+        for batch in AnalyticsStore(db).iter_subreddit(subreddit, HISTORY_COLUMNS):
+            self._add(matrix, *zip(*batch))
+        return matrix
+
+    def _remember(self, subreddit: str, matrix: EngagementMatrix):
+        self.matrices[subreddit] = matrix
+        self.matrices.move_to_end(subreddit)
+        while len(self.matrices) > self.max_subreddits:
+            self.matrices.popitem(last=False)
+
+    async def _matrix(self, db: AsyncSession, subreddit: str) -> EngagementMatrix:
+        matrix = self.matrices.get(subreddit)
+        now = datetime.utcnow().replace(tzinfo=timezone.utc).timestamp()
+        if matrix is not None and self.max_age is not None and time.monotonic() - matrix.loaded_at > self.max_age:
+            matrix = None
+        if matrix is not None:
+            self.matrices.move_to_end(subreddit)
+            if now - matrix.anchor > 86400:
+                matrix.reanchor(now)
+            return matrix
+
+        matrix = await run_sync_service(db, lambda session: self._load(session, subreddit, now))
+        self._remember(subreddit, matrix)
+        return matrix
+
+    def observe(self, snapshots: List[Dict]):
+        """Fold newly written snapshots into already loaded subreddits.
+
+        Each snapshot carries subreddit, created_at, tracked_at, score and
+        num_comments, as written to AnalyticsStore.
+        """
+        by_subreddit: Dict[str, List[Dict]] = {}
+        for snapshot in snapshots:
+            if snapshot["subreddit"] in self.matrices:
+                by_subreddit.setdefault(snapshot["subreddit"], []).append(snapshot)
+
+        for subreddit, items in by_subreddit.items():
+            self._add(self.matrices[subreddit], *zip(*(tuple(item[column] for column in HISTORY_COLUMNS) for item in items)))
+
+    async def get_best_times(self, db: AsyncSession, subreddit: str, limit: int = 5) -> List[Dict]:
+        """Top slots ranked by the lower 95% bound of expected engagement"""
+        import numpy as np
+
+        matrix = await self._matrix(db, subreddit)
+        valid = matrix.count >= MIN_SAMPLES
+        if not valid.any():
+            return []
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean_score = matrix.score / matrix.w
+            mean_comments = matrix.comments / matrix.w
+            variance = np.maximum(matrix.score2 / matrix.w - mean_score * mean_score, 0)
+            effective_n = matrix.w * matrix.w / matrix.w2
+            margin = Z_95 * np.sqrt(variance / effective_n)
+
+        engagement = mean_score + COMMENT_WEIGHT * mean_comments
+        lower = np.where(valid, engagement - margin, -np.inf)
+        order = np.argsort(lower)[::-1][:limit]
+
+        return [
+            {
+                "weekday": WEEKDAYS[index // 24],
+                "hour": int(index % 24),
+                "timezone": self.tz.key,
+                "expected_score": float(mean_score[index]),
+                "expected_comments": float(mean_comments[index]),
+                "engagement": float(engagement[index]),
+                "confidence_interval": [float(engagement[index] - margin[index]), float(engagement[index] + margin[index])],
+                "samples": int(matrix.count[index])
+            }
+            for index in order
+            if valid[index]
+        ]
+
+    async def next_best_slot(self, db: AsyncSession, subreddit: str, after: datetime, limit: int = 5) -> Optional[datetime]:
+        """Earliest naive-UTC hour at or after `after` that falls in a top slot"""
+        best = await self.get_best_times(db, subreddit, limit)
+        if not best:
+            return None
+        wanted = {(WEEKDAYS.index(slot["weekday"]), slot["hour"]) for slot in best}
+
+        local = after.replace(tzinfo=timezone.utc).astimezone(self.tz)
+        local = local.replace(minute=0, second=0, microsecond=0)
+        if local.astimezone(timezone.utc).replace(tzinfo=None) < after:
+            local += timedelta(hours=1)
+        for _ in range(BINS + 1):
+            if (local.weekday(), local.hour) in wanted:
+                return local.astimezone(timezone.utc).replace(tzinfo=None)
+            local = (local.astimezone(timezone.utc) + timedelta(hours=1)).astimezone(self.tz)
+        return None
+
+best_times_engine = BestTimesEngine()
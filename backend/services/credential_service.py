@@ -0,0 +1,65 @@
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import Column, DateTime, Integer, String, delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from auth.jwt_handler import password_hasher
+from models import Base
+import models
+
+class AccountCredential(Base):
+    """Password hash of an account that signs in to the API"""
+    __tablename__ = "account_credentials"
+
+    account_id = Column(Integer, primary_key=True)
+    password_hash = Column(String, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+class CredentialService:
+    """Sign-in checks and password changes; bcrypt runs on password_hasher's pool, never on the event loop"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def authenticate(self, username: str, password: str) -> Optional[models.RedditAccount]:
+        """The account if the password matches, storing a fresh hash if the old one uses outdated parameters"""
+        row = (await self.db.execute(
+            select(models.RedditAccount, AccountCredential)
+            .join(AccountCredential, AccountCredential.account_id == models.RedditAccount.id)
+            .where(models.RedditAccount.username == username)
+        )).first()
+        if row is None:
+            await password_hasher.hash(password)  # as slow as a wrong password, so usernames cannot be probed
+            return None
+
+        account, credential = row
+        if not await self._verify(credential, password):
+            return None
+        return account
+
+    async def change_password(self, account_id: int, new_password: str, current_password: Optional[str] = None) -> bool:
+        """Set an account's password; once it has one, only with the current password"""
+        credential = await self.db.get(AccountCredential, account_id)
+        if credential is not None and (current_password is None or not await self._verify(credential, current_password)):
+            return False
+
+        password_hash = await password_hasher.hash(new_password)
+        if credential is None:
+            credential = AccountCredential(account_id=account_id)
+            self.db.add(credential)
+        credential.password_hash = password_hash
+        credential.updated_at = datetime.utcnow()
+        await self.db.commit()
+        return True
+
+    async def forget(self, account_id: int):
+        """Drop a deleted account's password, so an account reusing its id cannot sign in with it"""
+        await self.db.execute(delete(AccountCredential).where(AccountCredential.account_id == account_id))
+        await self.db.commit()
+
+    async def _verify(self, credential: AccountCredential, password: str) -> bool:
+        valid, new_hash = await password_hasher.verify(password, credential.password_hash)
+        if valid and new_hash:
+            credential.password_hash = new_hash
+            credential.updated_at = datetime.utcnow()
+            await self.db.commit()
+        return valid
\ No newline at end of file
@@ -0,0 +1,337 @@
+import asyncio
+import csv
+import io
+import math
+import os
+import tempfile
+import uuid
+from datetime import datetime, timedelta, timezone, tzinfo
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Set, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from pydantic import ValidationError
+from sqlalchemy import Column, DateTime, Integer, String, Text, delete, select
+from async_database import AsyncSessionLocal, run_sync_service
+from config import get_settings
+from models import Base
+from services.post_service import PostService
+from services.post_events import on_posts_created
+from services.subreddit_metadata_service import subreddit_metadata
+from utils.logger import app_logger
+import schemas
+
+settings = get_settings()
+
+MAX_TITLE_LENGTH = 300
+BOOLEAN_VALUES = ("true", "false")
+REPORT_BATCH = 1000
+
+def _text(value) -> str:
+    if value is None:
+        return ""
+    return str(value).strip()
+
+def parse_timezone(name: Optional[str]) -> tzinfo:
+    """Zone for naive spreadsheet times, as sent by the uploader's browser"""
+    if not name:
+        return timezone.utc
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValueError(f"Unknown timezone: {name}")
+
+def _parse_datetime(value, zone: tzinfo = timezone.utc) -> Optional[datetime]:
+    """Parse a spreadsheet datetime cell into naive UTC; naive cells are in zone"""
+    if isinstance(value, datetime):
+        parsed = value
+    else:
+        try:
+            parsed = datetime.fromisoformat(_text(value))
+        except ValueError:
+            return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=zone)
+    return parsed.astimezone(timezone.utc).replace(tzinfo=None)
+
+def _is_number(value) -> bool:
+    try:
+        return math.isfinite(float(_text(value)))
+    except ValueError:
+        return False
+
+def validate_row(row: Dict, now: datetime, zone: tzinfo = timezone.utc) -> List[str]:
+    """Checks the bulk upload page used to run in the browser; now is naive UTC"""
+    errors = []
+
+    # Required fields
+    if not _text(row.get("title")):
+        errors.append("Title is required")
+    if not _text(row.get("subreddit")):
+        errors.append("Subreddit is required")
+
+    # Title length
+    if len(_text(row.get("title"))) > MAX_TITLE_LENGTH:
+        errors.append(f"Title exceeds {MAX_TITLE_LENGTH} characters")
+
+    # Valid datetime
+    if _text(row.get("scheduled_time")):
+        scheduled_time = _parse_datetime(row["scheduled_time"], zone)
+        if scheduled_time is None:
+            errors.append("Invalid scheduled time format")
+        elif scheduled_time < now:
+            errors.append("Scheduled time must be in the future")
+
+    # Numeric values
+    if _text(row.get("auto_delete_hours")) and not _is_number(row["auto_delete_hours"]):
+        errors.append("Auto delete hours must be a number")
+    if _text(row.get("auto_delete_score")) and not _is_number(row["auto_delete_score"]):
+        errors.append("Auto delete score must be a number")
+
+    # Boolean values
+    if _text(row.get("nsfw")) and _text(row["nsfw"]).lower() not in BOOLEAN_VALUES:
+        errors.append("NSFW must be true or false")
+    if _text(row.get("spoiler")) and _text(row["spoiler"]).lower() not in BOOLEAN_VALUES:
+        errors.append("Spoiler must be true or false")
+
+    return errors
+
+def row_to_post(row: Dict, account_id: int, zone: tzinfo = timezone.utc) -> schemas.PostCreate:
+    metadata = {}
+    for field in ("auto_delete_hours", "auto_delete_score"):
+        if _text(row.get(field)):
+            metadata[field] = float(_text(row[field]))
+
+    return schemas.PostCreate(
+        account_id=account_id,
+        title=_text(row["title"]),
+        content=_text(row.get("content")) or None,
+        subreddit=_text(row["subreddit"]),
+        scheduled_time=_parse_datetime(row["scheduled_time"], zone) if _text(row.get("scheduled_time")) else None,
+        flair=_text(row.get("flair")) or None,
+        is_nsfw=_text(row.get("nsfw")).lower() == "true",
+        is_spoiler=_text(row.get("spoiler")).lower() == "true",
+        metadata=metadata or None
+    )
+
+def iter_csv_rows(path: str) -> Iterator[Dict]:
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        for row in csv.DictReader(f):
+            yield row
+
+def iter_xlsx_rows(path: str) -> Iterator[Dict]:
+    from openpyxl import load_workbook
+
+    # read_only streams rows from the sheet XML instead of loading the workbook
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = [_text(cell) for cell in next(rows, ())]
+        for values in rows:
+            if all(value is None for value in values):
+                continue
+            yield dict(zip(header, values))
+    finally:
+        workbook.close()
+
+class ImportJob(Base):
+    """Progress of one import, shared by every API process"""
+    __tablename__ = "import_jobs"
+
+    id = Column(String, primary_key=True)
+    account_id = Column(Integer, nullable=False)
+    filename = Column(String, nullable=False)
+    status = Column(String, nullable=False, default="queued")
+    rows_processed = Column(Integer, nullable=False, default=0)
+    rows_imported = Column(Integer, nullable=False, default=0)
+    rows_failed = Column(Integer, nullable=False, default=0)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True, index=True)
+
+    def to_dict(self) -> Dict:
+        return {
+            "job_id": self.id,
+            "filename": self.filename,
+            "status": self.status,
+            "rows_processed": self.rows_processed,
+            "rows_imported": self.rows_imported,
+            "rows_failed": self.rows_failed,
+            "error": self.error,
+            "created_at": self.created_at.isoformat(),
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "has_error_report": self.rows_failed > 0
+        }
+
+class ImportFailure(Base):
+    """A rejected row, kept in the database so any API process can serve the error report"""
+    __tablename__ = "import_failures"
+
+    id = Column(Integer, primary_key=True)
+    job_id = Column(String, nullable=False, index=True)
+    row = Column(Integer, nullable=False)
+    title = Column(Text, nullable=False)
+    errors = Column(Text, nullable=False)
+
+class ImportService:
+    """Streams CSV/XLSX uploads into posts in fixed-size chunks.
+
+    Rows are read one at a time from a temporary copy of the upload, so
+    memory stays bounded by the chunk size whatever the file size. Rows that
+    fail validation are saved as ImportFailure rows with each chunk instead
+    of being held. Job progress is saved after every chunk too, so any API
+    process can answer status and error report requests.
+    """
+
+    def __init__(self):
+        self.running: Set[asyncio.Task] = set()
+
+    async def get_job(self, job_id: str) -> Optional[ImportJob]:
+        async with AsyncSessionLocal() as db:
+            return await db.get(ImportJob, job_id)
+
+    async def iter_report(self, job_id: str) -> AsyncIterator[str]:
+        """Error report CSV of a job, read from the database in batches"""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(["row", "title", "errors"])
+        last_id = 0
+        async with AsyncSessionLocal() as db:
+            while True:
+                failures = (await db.scalars(
+                    select(ImportFailure).where(
+                        ImportFailure.job_id == job_id, ImportFailure.id > last_id
+                    ).order_by(ImportFailure.id).limit(REPORT_BATCH)
+                )).all()
+                for failure in failures:
+                    writer.writerow([failure.row, failure.title, failure.errors])
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+                if len(failures) < REPORT_BATCH:
+                    return
+                last_id = failures[-1].id
+
+    async def start_import(self, upload, account_id: int, timezone_name: Optional[str] = None) -> ImportJob:
+        """Copy the upload to disk and process it in the background.
+
+        Naive scheduled times in the sheet are read in timezone_name, the
+        uploader's zone; UTC when it is not given.
+        """
+        filename = upload.filename or ""
+        suffix = os.path.splitext(filename)[1].lower()
+        if suffix not in (".csv", ".xlsx"):
+            raise ValueError("Only .csv and .xlsx files can be imported")
+        zone = parse_timezone(timezone_name)
+
+        fd, path = tempfile.mkstemp(suffix=suffix, prefix="import-")
+        with os.fdopen(fd, "wb") as f:
+            while chunk := await upload.read(1024 * 1024):
+                await asyncio.to_thread(f.write, chunk)
+
+        job = ImportJob(
+            id=uuid.uuid4().hex, account_id=account_id, filename=filename, status="queued",
+            rows_processed=0, rows_imported=0, rows_failed=0, created_at=datetime.utcnow()
+        )
+        await self._save(job)
+        await self._prune()
+
+        task = asyncio.create_task(self._run(job, path, zone))
+        self.running.add(task)
+        task.add_done_callback(self.running.discard)
+        return job
+
+    async def _save(self, job: ImportJob):
+        async with AsyncSessionLocal() as db:
+            await db.merge(job)
+            await db.commit()
+
+    async def _prune(self):
+        """Drop finished jobs and their failed rows after IMPORT_JOB_RETENTION_HOURS"""
+        cutoff = datetime.utcnow() - timedelta(hours=settings.IMPORT_JOB_RETENTION_HOURS)
+        async with AsyncSessionLocal() as db:
+            expired = select(ImportJob.id).where(ImportJob.finished_at < cutoff)
+            await db.execute(delete(ImportFailure).where(ImportFailure.job_id.in_(expired)))
+            await db.execute(delete(ImportJob).where(ImportJob.finished_at < cutoff))
+            await db.commit()
+
+    async def _save_failures(self, job: ImportJob, failures: List[Tuple[int, Dict, List[str]]]):
+        async with AsyncSessionLocal() as db:
+            db.add_all(
+                # Row 1 of the sheet is the header
+                ImportFailure(job_id=job.id, row=index + 2, title=_text(row.get("title")), errors="; ".join(errors))
+                for index, row, errors in failures
+            )
+            await db.commit()
+
+    async def _run(self, job: ImportJob, path: str, zone: tzinfo = timezone.utc):
+        job.status = "running"
+        await self._save(job)
+        rows = iter_xlsx_rows(path) if path.endswith(".xlsx") else iter_csv_rows(path)
+
+        try:
+            while True:
+                chunk = await asyncio.to_thread(self._next_chunk, rows, job.rows_processed)
+                if not chunk:
+                    break
+
+                now = datetime.utcnow()
+                posts: List[Tuple[schemas.PostCreate, int, Dict]] = []
+                failures: List[Tuple[int, Dict, List[str]]] = []
+                for index, row in chunk:
+                    errors = validate_row(row, now, zone)
+                    if not errors:
+                        try:
+                            posts.append((row_to_post(row, job.account_id, zone), index, row))
+                        except ValidationError as e:
+                            errors = [error["msg"] for error in e.errors()]
+                    if errors:
+                        failures.append((index, row, errors))
+
+                flair_errors = await subreddit_metadata.validate_flairs(
+                    [(post.subreddit, post.flair) for post, _, _ in posts]
+                )
+                accepted = []
+                for (post, index, row), error in zip(posts, flair_errors):
+                    if error:
+                        failures.append((index, row, [error]))
+                    else:
+                        accepted.append(post)
+                posts = accepted
+
+                if posts:
+                    await self._insert(posts)
+                    job.rows_imported += len(posts)
+
+                if failures:
+                    failures.sort(key=lambda failure: failure[0])
+                    await self._save_failures(job, failures)
+                    job.rows_failed += len(failures)
+
+                job.rows_processed += len(chunk)
+                await self._save(job)
+
+            job.status = "complete"
+        except Exception as e:
+            app_logger.exception("Import job %s failed", job.id)
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            rows.close()
+            os.remove(path)
+            job.finished_at = datetime.utcnow()
+            await self._save(job)
+
+    @staticmethod
+    def _next_chunk(rows: Iterator[Dict], start: int) -> List[Tuple[int, Dict]]:
+        chunk = []
+        for row in rows:
+            chunk.append((start + len(chunk), row))
+            if len(chunk) >= settings.IMPORT_CHUNK_SIZE:
+                break
+        return chunk
+
+    async def _insert(self, posts: List[schemas.PostCreate]):
+        async with AsyncSessionLocal() as db:
+            created = await run_sync_service(db, lambda session: PostService(session).create_bulk_posts(posts))
+            await on_posts_created(db, created)
+
+import_service = ImportService()
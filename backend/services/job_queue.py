@@ -0,0 +1,245 @@
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy import Column, DateTime, Index, Integer, JSON, String, Text, and_, func, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from config import get_settings
+from models import Base
+
+settings = get_settings()
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+class Job(Base):
+    """One unit of background work, claimed by a worker process under a lease"""
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True)
+    kind = Column(String, nullable=False)
+    payload = Column(JSON, nullable=False, default=dict)
+    # Enqueueing twice with the same key is a no-op, even across processes
+    idempotency_key = Column(String, nullable=True, unique=True)
+    status = Column(String, nullable=False, default=QUEUED)
+    run_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=5)
+    stage = Column(String, nullable=True)  # last checkpoint the handler reached
+    locked_by = Column(String, nullable=True)
+    lease_token = Column(String, nullable=True, index=True)
+    lease_expires_at = Column(DateTime, nullable=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_jobs_status_run_at", "status", "run_at"),
+    )
+
+class Leadership(Base):
+    """Which worker process runs the loops that must run once per deployment"""
+    __tablename__ = "job_leaders"
+
+    name = Column(String, primary_key=True)
+    holder = Column(String, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+
+class JobQueue:
+    """Durable job queue on the application database.
+
+    claim() takes due jobs with a single UPDATE over a
+    SELECT ... FOR UPDATE SKIP LOCKED, so concurrent workers on PostgreSQL
+    never wait on or double-claim each other's rows; SQLite serializes
+    writers anyway and ignores the locking clause. A claimed job holds a
+    lease; if its worker dies, the lease runs out and the job is claimed
+    again, unless that was its last attempt: reap() fails those. complete(),
+    fail() and checkpoint() only touch a job while the caller still holds
+    its lease.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def enqueue(
+        self,
+        kind: str,
+        payload: Optional[Dict] = None,
+        run_at: Optional[datetime] = None,
+        idempotency_key: Optional[str] = None,
+        max_attempts: Optional[int] = None
+    ) -> bool:
+        """Add a job and return whether it was new; the caller commits"""
+        values = {
+            "kind": kind,
+            "payload": payload or {},
+            "idempotency_key": idempotency_key,
+            "status": QUEUED,
+            "run_at": run_at or datetime.utcnow(),
+            "attempts": 0,
+            "max_attempts": max_attempts or settings.JOB_MAX_ATTEMPTS,
+            "created_at": datetime.utcnow()
+        }
+        insert = postgresql.insert if self.db.get_bind().dialect.name == "postgresql" else sqlite.insert
+        statement = insert(Job).values(**values).on_conflict_do_nothing(index_elements=["idempotency_key"])
+        return self.db.execute(statement).rowcount > 0
+
+    def claim(self, worker: str, kinds: Iterable[str], limit: int, lease: Optional[float] = None) -> List[Job]:
+        """Lease up to limit due jobs of the given kinds to worker and commit.
+
+        The jobs come back detached, so their lease_token stays the one this
+        claim took even after another worker takes over an expired lease.
+        """
+        now = datetime.utcnow()
+        token = uuid.uuid4().hex
+        claimable = select(Job.id).where(
+            Job.kind.in_(list(kinds)),
+            or_(
+                and_(Job.status == QUEUED, Job.run_at <= now),
+                # The worker holding it died or hung, and the job has attempts left
+                and_(Job.status == RUNNING, Job.lease_expires_at < now, Job.attempts < Job.max_attempts)
+            )
+        ).order_by(Job.run_at).limit(limit).with_for_update(skip_locked=True)
+
+        self.db.execute(
+            update(Job).where(Job.id.in_(claimable)).values(
+                status=RUNNING,
+                locked_by=worker,
+                lease_token=token,
+                lease_expires_at=now + timedelta(seconds=lease or settings.JOB_LEASE_SECONDS),
+                attempts=Job.attempts + 1
+            ).execution_options(synchronize_session=False)
+        )
+        self.db.commit()
+        jobs = self.db.query(Job).filter(Job.lease_token == token).order_by(Job.run_at).all()
+        for job in jobs:
+            self.db.expunge(job)
+        return jobs
+
+    def reap(self, kinds: Iterable[str]) -> List[Job]:
+        """Fail jobs whose lease ran out on their last attempt, commit and return them detached.
+
+        A job that kills its worker every time would otherwise be reclaimed forever.
+        """
+        now = datetime.utcnow()
+        token = uuid.uuid4().hex
+        exhausted = select(Job.id).where(
+            Job.kind.in_(list(kinds)),
+            Job.status == RUNNING,
+            Job.lease_expires_at < now,
+            Job.attempts >= Job.max_attempts
+        ).with_for_update(skip_locked=True)
+
+        self.db.execute(
+            update(Job).where(Job.id.in_(exhausted)).values(
+                status=FAILED,
+                locked_by=None,
+                lease_token=token,
+                lease_expires_at=None,
+                last_error="Lease expired on the last attempt",
+                finished_at=now
+            ).execution_options(synchronize_session=False)
+        )
+        self.db.commit()
+        jobs = self.db.query(Job).filter(Job.lease_token == token).all()
+        for job in jobs:
+            self.db.expunge(job)
+        if jobs:
+            self.db.execute(
+                update(Job).where(Job.lease_token == token).values(lease_token=None)
+                .execution_options(synchronize_session=False)
+            )
+            self.db.commit()
+        return jobs
+
+    def lead(self, name: str, holder: str, lease: Optional[float] = None) -> bool:
+        """Take or keep the named leadership for holder and commit; False while another holder's lease runs"""
+        now = datetime.utcnow()
+        expires_at = now + timedelta(seconds=lease or settings.JOB_LEASE_SECONDS)
+        insert = postgresql.insert if self.db.get_bind().dialect.name == "postgresql" else sqlite.insert
+        self.db.execute(
+            insert(Leadership).values(name=name, holder=holder, expires_at=expires_at)
+            .on_conflict_do_nothing(index_elements=["name"])
+        )
+        result = self.db.execute(
+            update(Leadership).where(
+                Leadership.name == name,
+                or_(Leadership.holder == holder, Leadership.expires_at < now)
+            ).values(holder=holder, expires_at=expires_at).execution_options(synchronize_session=False)
+        )
+        self.db.commit()
+        return result.rowcount > 0
+
+    def resign(self, name: str, holder: str):
+        """Give up the named leadership so another process takes over without waiting out the lease"""
+        self.db.execute(
+            update(Leadership).where(Leadership.name == name, Leadership.holder == holder)
+            .values(expires_at=datetime.utcnow()).execution_options(synchronize_session=False)
+        )
+        self.db.commit()
+
+    def extend(self, lease_tokens: List[str], lease: Optional[float] = None) -> int:
+        """Push back the lease of jobs still being worked on and commit"""
+        if not lease_tokens:
+            return 0
+        result = self.db.execute(
+            update(Job).where(Job.lease_token.in_(lease_tokens), Job.status == RUNNING).values(
+                lease_expires_at=datetime.utcnow() + timedelta(seconds=lease or settings.JOB_LEASE_SECONDS)
+            ).execution_options(synchronize_session=False)
+        )
+        self.db.commit()
+        return result.rowcount
+
+    def _finish(self, job: Job, **values) -> bool:
+        result = self.db.execute(
+            update(Job).where(Job.id == job.id, Job.lease_token == job.lease_token).values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        self.db.commit()
+        return result.rowcount > 0
+
+    def checkpoint(self, job: Job, stage: str) -> bool:
+        """Record how far a handler got before a step that must not be repeated"""
+        return self._finish(job, stage=stage)
+
+    def complete(self, job: Job) -> bool:
+        return self._finish(
+            job, status=DONE, lease_token=None, lease_expires_at=None, last_error=None,
+            finished_at=datetime.utcnow()
+        )
+
+    def fail(self, job: Job, error: str, retry: bool = True) -> bool:
+        """Retry the job with exponential backoff, or give up after max_attempts.
+
+        The stage is kept, so a retried handler knows how far the last attempt got.
+        """
+        if not retry or job.attempts >= job.max_attempts:
+            return self._finish(
+                job, status=FAILED, lease_token=None, lease_expires_at=None, last_error=error,
+                finished_at=datetime.utcnow()
+            )
+        delay = min(settings.JOB_RETRY_DELAY * 2 ** (job.attempts - 1), settings.JOB_RETRY_MAX_DELAY)
+        return self._finish(
+            job, status=QUEUED, lease_token=None, lease_expires_at=None, last_error=error,
+            run_at=datetime.utcnow() + timedelta(seconds=delay)
+        )
+
+    def counts(self) -> Dict[str, Dict[str, int]]:
+        """Number of jobs per kind and status"""
+        counts: Dict[str, Dict[str, int]] = {}
+        for kind, status, count in self.db.execute(
+            select(Job.kind, Job.status, func.count()).group_by(Job.kind, Job.status)
+        ):
+            counts.setdefault(kind, {})[status] = count
+        return counts
+
+    def prune(self, older_than: timedelta) -> int:
+        """Delete finished jobs; done idempotency keys stop protecting after this"""
+        cutoff = datetime.utcnow() - older_than
+        result = self.db.query(Job).filter(
+            Job.status.in_([DONE, FAILED]), Job.finished_at < cutoff
+        ).delete(synchronize_session=False)
+        self.db.commit()
+        return result
\ No newline at end of file
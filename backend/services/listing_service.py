@@ -0,0 +1,99 @@
+from datetime import datetime
+from typing import List, Optional, Tuple
+from sqlalchemy import Index, and_, or_, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncSession
+from utils.pagination import decode_cursor, encode_cursor
+import models
+
+# Composite indexes backing the keyset queries below
+POST_INDEXES = [
+    Index(
+        "ix_posts_account_subreddit_created",
+        models.Post.account_id, models.Post.subreddit, models.Post.created_at
+    ),
+    Index(
+        "ix_posts_is_posted_scheduled",
+        models.Post.is_posted, models.Post.scheduled_time
+    ),
+]
+
+def ensure_indexes(engine: Engine):
+    """Create the listing indexes on databases whose tables already exist"""
+    for index in POST_INDEXES:
+        index.create(bind=engine, checkfirst=True)
+
+class ListingService:
+    """Keyset-paginated post listings.
+
+    Pages are addressed by the (timestamp, id) of the last row returned, so
+    fetching page 5,000 costs the same index seek as page 1.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def _page(self, stmt, time_column, cursor: Optional[str], limit: int, descending: bool):
+        if cursor:
+            # The plain range on time_column is redundant but lets the planner seek the index;
+            # the OR alone makes it scan every row before the cursor
+            moment, row_id = decode_cursor(cursor)
+            if descending:
+                stmt = stmt.where(time_column <= moment, or_(
+                    time_column < moment,
+                    and_(time_column == moment, models.Post.id < row_id)
+                ))
+            else:
+                stmt = stmt.where(time_column >= moment, or_(
+                    time_column > moment,
+                    and_(time_column == moment, models.Post.id > row_id)
+                ))
+
+        if descending:
+            stmt = stmt.order_by(time_column.desc(), models.Post.id.desc())
+        else:
+            stmt = stmt.order_by(time_column, models.Post.id)
+
+        # One extra row tells us whether another page exists
+        rows = (await self.db.scalars(stmt.limit(limit + 1))).all()
+        if len(rows) <= limit:
+            return rows, None
+
+        rows = rows[:limit]
+        last = rows[-1]
+        return rows, encode_cursor(getattr(last, time_column.key), last.id)
+
+    async def list_posts(
+        self,
+        account_id: Optional[int] = None,
+        subreddit: Optional[str] = None,
+        cursor: Optional[str] = None,
+        limit: int = 100
+    ) -> Tuple[List[models.Post], Optional[str]]:
+        """Newest posts first, keyed on (created_at, id)"""
+        stmt = select(models.Post)
+        if account_id is not None:
+            stmt = stmt.where(models.Post.account_id == account_id)
+        if subreddit is not None:
+            stmt = stmt.where(models.Post.subreddit == subreddit)
+        return await self._page(stmt, models.Post.created_at, cursor, limit, descending=True)
+
+    async def list_scheduled(
+        self,
+        account_id: int,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        cursor: Optional[str] = None,
+        limit: int = 100
+    ) -> Tuple[List[models.Post], Optional[str]]:
+        """Unpublished posts in scheduled order, keyed on (scheduled_time, id)"""
+        stmt = select(models.Post).where(
+            models.Post.account_id == account_id,
+            models.Post.is_posted == False,
+            models.Post.scheduled_time.isnot(None)
+        )
+        if start is not None:
+            stmt = stmt.where(models.Post.scheduled_time >= start)
+        if end is not None:
+            stmt = stmt.where(models.Post.scheduled_time < end)
+        return await self._page(stmt, models.Post.scheduled_time, cursor, limit, descending=False)
@@ -0,0 +1,147 @@
+import asyncio
+import hashlib
+import json
+import mimetypes
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional
+from config import get_settings
+
+settings = get_settings()
+
+IMAGE_TYPES = ("image/jpeg", "image/png", "image/gif", "image/webp")
+VIDEO_TYPES = ("video/mp4", "video/quicktime", "video/webm")
+
+class MediaTooLarge(ValueError):
+    pass
+
+def _write_chunk(f, digest, chunk: bytes):
+    digest.update(chunk)
+    f.write(chunk)
+
+def _read_sidecar(path: str) -> Optional[Dict]:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def _write_sidecar(path: str, media: Dict):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(media, f)
+    os.replace(tmp_path, path)
+
+def inspect_media(path: str, thumbnail_path: str, content_type: str) -> Dict:
+    """Check an upload and render its thumbnail; runs in the media process pool"""
+    info = {"size": os.path.getsize(path), "width": None, "height": None, "thumbnail": False}
+    if content_type not in IMAGE_TYPES:
+        return info
+
+    from PIL import Image, UnidentifiedImageError
+
+    try:
+        image = Image.open(path)
+    except UnidentifiedImageError:
+        raise ValueError("File is not a valid image")
+
+    with image:
+        info["width"], info["height"] = image.size
+        if info["width"] * info["height"] > settings.MEDIA_MAX_PIXELS:
+            raise MediaTooLarge(f"Image exceeds {settings.MEDIA_MAX_PIXELS} pixels")
+
+        # draft() lets JPEG decode at reduced scale instead of full resolution
+        image.draft("RGB", (settings.MEDIA_THUMBNAIL_SIZE, settings.MEDIA_THUMBNAIL_SIZE))
+        image.thumbnail((settings.MEDIA_THUMBNAIL_SIZE, settings.MEDIA_THUMBNAIL_SIZE))
+        os.makedirs(os.path.dirname(thumbnail_path), exist_ok=True)
+        image.convert("RGB").save(thumbnail_path, "JPEG", quality=85)
+        info["thumbnail"] = True
+    return info
+
+class MediaService:
+    """Content-addressed store for uploaded media.
+
+    Uploads are streamed to a temporary file in MEDIA_CHUNK_SIZE pieces and
+    hashed while they are written, then moved to a path derived from their
+    SHA-256 next to a JSON sidecar with its metadata. An identical upload
+    finds the sidecar already there and is dropped, so the same image is
+    stored once however often it is sent.
+    Image decoding happens in a process pool, away from the event loop.
+    """
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = root or settings.MEDIA_ROOT
+        self.tmp_dir = os.path.join(self.root, "tmp")
+        self.executor: Optional[ProcessPoolExecutor] = None
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=settings.MEDIA_PROCESS_WORKERS)
+        return self.executor
+
+    def _paths(self, sha256: str, extension: str):
+        relative = os.path.join(sha256[:2], sha256[2:4], sha256 + extension)
+        thumbnail = os.path.join("thumbs", sha256[:2], sha256[2:4], sha256 + ".jpg")
+        return relative, thumbnail
+
+    def _url(self, relative: str) -> str:
+        return f"{settings.MEDIA_BASE_URL.rstrip('/')}/{relative.replace(os.sep, '/')}"
+
+    async def store_upload(self, upload) -> Dict:
+        """Stream an UploadFile into the store and describe the stored media"""
+        content_type = upload.content_type or mimetypes.guess_type(upload.filename or "")[0] or ""
+        if content_type not in IMAGE_TYPES + VIDEO_TYPES:
+            raise ValueError(f"Unsupported media type: {content_type or 'unknown'}")
+        extension = mimetypes.guess_extension(content_type) or ""
+
+        os.makedirs(self.tmp_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.tmp_dir, prefix="upload-")
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            with os.fdopen(fd, "wb") as f:
+                while chunk := await upload.read(settings.MEDIA_CHUNK_SIZE):
+                    size += len(chunk)
+                    if size > settings.MEDIA_MAX_BYTES:
+                        raise MediaTooLarge(f"Media exceeds {settings.MEDIA_MAX_BYTES} bytes")
+                    await asyncio.to_thread(_write_chunk, f, digest, chunk)
+
+            sha256 = digest.hexdigest()
+            relative, thumbnail = self._paths(sha256, extension)
+            path = os.path.join(self.root, relative)
+            sidecar = path + ".json"
+
+            media = await asyncio.to_thread(_read_sidecar, sidecar)
+            deduplicated = media is not None
+            if media is None:
+                loop = asyncio.get_running_loop()
+                info = await loop.run_in_executor(
+                    self._pool(), inspect_media, tmp_path, os.path.join(self.root, thumbnail), content_type
+                )
+                media = {
+                    "sha256": sha256,
+                    "content_type": content_type,
+                    "size": info["size"],
+                    "width": info["width"],
+                    "height": info["height"],
+                    "media_url": self._url(relative),
+                    "thumbnail_url": self._url(thumbnail) if info["thumbnail"] else None
+                }
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(tmp_path, path)
+                # Written last, so a sidecar only exists for a complete file
+                await asyncio.to_thread(_write_sidecar, sidecar, media)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        # media_url goes on the post, the rest under post metadata["media"]
+        return {**media, "deduplicated": deduplicated, "metadata": {"media": media}}
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+media_service = MediaService()
\ No newline at end of file
@@ -0,0 +1,72 @@
+from functools import wraps
+from types import SimpleNamespace
+from typing import List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from services.trend_index_service import TrendIndexService
+from tasks.timeline import post_timeline
+from utils.cache import get_response_cache
+from utils.logger import app_logger
+import models
+
+def after_commit(hook):
+    """The services commit before their hooks run, so a failing hook is logged instead of failing a saved request"""
+    @wraps(hook)
+    async def run(db: AsyncSession, *args):
+        try:
+            await hook(db, *args)
+        except Exception:
+            await db.rollback()
+            app_logger.exception("Post hook %s failed after the post was saved; the trend index misses this change", hook.__name__)
+    return run
+
+@after_commit
+async def on_posts_created(db: AsyncSession, posts: List):
+    """Update the in-process indexes that follow newly created posts"""
+    cache = get_response_cache()
+    for post in posts:
+        post_timeline.schedule(post.id, post.scheduled_time)
+        await cache.invalidate(subreddit=post.subreddit, account_id=post.account_id)
+
+    await db.run_sync(lambda session: TrendIndexService(session).index_posts(posts))
+    await db.commit()
+
+# What the hooks read of a post as it was before an edit or delete
+SNAPSHOT_COLUMNS = ("id", "post_id", "account_id", "subreddit", "title", "content", "created_at")
+
+async def load_before_change(db: AsyncSession, post_id: int) -> Optional[SimpleNamespace]:
+    """Copy of a post before an edit or delete; the session's own instance is overwritten by the change"""
+    post = await db.get(models.Post, post_id)
+    if post is None:
+        return None
+    return SimpleNamespace(**{column: getattr(post, column) for column in SNAPSHOT_COLUMNS})
+
+@after_commit
+async def on_post_updated(db: AsyncSession, before: Optional[SimpleNamespace], post):
+    """Move an edited post on the timeline and reindex its terms if its text changed"""
+    if not post.is_posted:
+        post_timeline.schedule(post.id, post.scheduled_time)
+    cache = get_response_cache()
+    await cache.invalidate(subreddit=post.subreddit, account_id=post.account_id)
+    if before is None:
+        return
+    if before.subreddit != post.subreddit:
+        await cache.invalidate(subreddit=before.subreddit, account_id=before.account_id)
+
+    if (before.subreddit.lower(), before.title, before.content) != (post.subreddit.lower(), post.title, post.content):
+        def reindex(session):
+            trend_index = TrendIndexService(session)
+            trend_index.unindex_posts([before])
+            trend_index.index_posts([post])
+
+        await db.run_sync(reindex)
+        await db.commit()
+
+@after_commit
+async def on_post_deleted(db: AsyncSession, before: Optional[SimpleNamespace], post_id: int):
+    """Forget a deleted post in the timeline and the trend index"""
+    post_timeline.remove(post_id)
+    if before is None:
+        return
+    await get_response_cache().invalidate(subreddit=before.subreddit, account_id=before.account_id)
+    await db.run_sync(lambda session: TrendIndexService(session).unindex_posts([before]))
+    await db.commit()
\ No newline at end of file
@@ -0,0 +1,62 @@
+from datetime import datetime
+from sqlalchemy import Column, DateTime, Integer, Text
+from sqlalchemy.orm import Session
+from models import Base
+import models
+
+class PublishFailure(Base):
+    """Failed publish attempts of a post at one scheduled_time.
+
+    While retry_at is set the publisher tries again then; once the post has
+    failed PUBLISH_MAX_ATTEMPTS times retry_at is cleared and the post
+    unscheduled.
+    """
+    __tablename__ = "publish_failures"
+
+    post_id = Column(Integer, primary_key=True)
+    attempts = Column(Integer, nullable=False)
+    last_error = Column(Text, nullable=True)
+    scheduled_time = Column(DateTime, nullable=True)  # when the post was due when the attempts were made
+    retry_at = Column(DateTime, nullable=True)
+    failed_at = Column(DateTime, default=datetime.utcnow)
+
+class PublishFailureService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def attempts(self, post: models.Post) -> int:
+        """Failed attempts so far at the post's current scheduled_time"""
+        failure = self.db.get(PublishFailure, post.id)
+        if failure is None or failure.scheduled_time != post.scheduled_time:
+            return 0  # Never failed, or rescheduled since
+        return failure.attempts
+
+    def retry(self, post: models.Post, attempts: int, error: str, retry_at: datetime):
+        """Keep a failed attempt and when to try again, so a restart resumes the count; the caller commits"""
+        failure = self._failure(post, attempts, error)
+        failure.retry_at = retry_at
+
+    def record(self, post: models.Post, attempts: int, error: str):
+        """Unschedule a post that keeps failing and keep why; the caller commits.
+
+        Rescheduling the post puts it back on the timeline with a fresh
+        attempt count.
+        """
+        failure = self._failure(post, attempts, error)
+        failure.retry_at = None
+        post.scheduled_time = None
+
+    def clear(self, post_id: int):
+        """Forget the failed attempts of a post that went out; the caller commits"""
+        self.db.query(PublishFailure).filter(PublishFailure.post_id == post_id).delete(synchronize_session=False)
+
+    def _failure(self, post: models.Post, attempts: int, error: str) -> PublishFailure:
+        failure = self.db.get(PublishFailure, post.id)
+        if failure is None:
+            failure = PublishFailure(post_id=post.id)
+            self.db.add(failure)
+        failure.attempts = attempts
+        failure.last_error = error
+        failure.scheduled_time = post.scheduled_time
+        failure.failed_at = datetime.utcnow()
+        return failure
\ No newline at end of file
@@ -0,0 +1,319 @@
+import argparse
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from sqlalchemy import Column, Integer, Float, String, DateTime, select
+from sqlalchemy.orm import Session
+from models import Base
+import models
+
+class PostRollup(Base):
+    """Latest known stats for each tracked post"""
+    __tablename__ = "analytics_rollup_post"
+
+    post_id = Column(String, primary_key=True)
+    account_id = Column(Integer, index=True, nullable=False)
+    subreddit = Column(String, nullable=False)
+    created_at = Column(DateTime, index=True, nullable=False)
+    score = Column(Integer, default=0, nullable=False)
+    upvote_ratio = Column(Float, default=0.0, nullable=False)
+    num_comments = Column(Integer, default=0, nullable=False)
+
+class HourlyRollup(Base):
+    """Per account and subreddit totals for posts created in each hour"""
+    __tablename__ = "analytics_rollup_hourly"
+
+    account_id = Column(Integer, primary_key=True)
+    subreddit = Column(String, primary_key=True)
+    bucket = Column(DateTime, primary_key=True)
+    posts = Column(Integer, default=0, nullable=False)
+    score = Column(Integer, default=0, nullable=False)
+    num_comments = Column(Integer, default=0, nullable=False)
+
+class DailyRollup(Base):
+    """Per account and subreddit totals for posts created on each day"""
+    __tablename__ = "analytics_rollup_daily"
+
+    account_id = Column(Integer, primary_key=True)
+    subreddit = Column(String, primary_key=True)
+    bucket = Column(DateTime, primary_key=True)
+    posts = Column(Integer, default=0, nullable=False)
+    score = Column(Integer, default=0, nullable=False)
+    num_comments = Column(Integer, default=0, nullable=False)
+
+def parse_timeframe(timeframe: str) -> timedelta:
+    """Parse timeframes such as '24h', '7d' or '90d'"""
+    try:
+        value = int(timeframe[:-1])
+    except (ValueError, IndexError):
+        raise ValueError(f"Invalid timeframe: {timeframe}")
+
+    if timeframe.endswith("h"):
+        return timedelta(hours=value)
+    if timeframe.endswith("d"):
+        return timedelta(days=value)
+    raise ValueError(f"Invalid timeframe: {timeframe}")
+
+def _hour(moment: datetime) -> datetime:
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+def _day(moment: datetime) -> datetime:
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+class RollupService:
+    """Maintains hourly and daily analytics rollups and serves the overview from them.
+
+    get_overview runs on the request's AsyncSession; the maintenance methods
+    run on a regular Session from background tasks and the CLI.
+    """
+
+    BUCKET_TABLES = ((HourlyRollup, _hour), (DailyRollup, _day))
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def apply(self, snapshots: List[Dict]) -> List[Dict]:
+        """Fold new analytics snapshots into the rollups.
+
+        Each snapshot needs post_id, account_id, subreddit, created_at, score,
+        upvote_ratio and num_comments. Only the difference from the post's
+        previous snapshot is added to its buckets. The caller commits.
+        Returns each post's previous and current values for downstream indexes.
+        """
+        if not snapshots:
+            return []
+
+        latest = {}
+        for snapshot in snapshots:
+            latest[snapshot["post_id"]] = snapshot
+
+        existing = {
+            row.post_id: row
+            for row in self.db.query(PostRollup).filter(PostRollup.post_id.in_(list(latest)))
+        }
+
+        deltas = defaultdict(lambda: [0, 0, 0])
+        changes = []
+        for post_id, snapshot in latest.items():
+            row = existing.get(post_id)
+            if row is None:
+                row = PostRollup(
+                    post_id=post_id,
+                    account_id=snapshot["account_id"],
+                    subreddit=snapshot["subreddit"],
+                    created_at=snapshot["created_at"],
+                    score=0,
+                    upvote_ratio=0.0,
+                    num_comments=0
+                )
+                self.db.add(row)
+                new_posts = 1
+            else:
+                new_posts = 0
+
+            delta = deltas[(row.account_id, row.subreddit, row.created_at)]
+            delta[0] += new_posts
+            delta[1] += snapshot["score"] - row.score
+            delta[2] += snapshot["num_comments"] - row.num_comments
+
+            changes.append({
+                "post_id": post_id,
+                "subreddit": row.subreddit,
+                "created_at": row.created_at,
+                "new_post": bool(new_posts),
+                "old_score": row.score,
+                "score": snapshot["score"],
+                "old_comments": row.num_comments,
+                "num_comments": snapshot["num_comments"]
+            })
+            row.score = snapshot["score"]
+            row.upvote_ratio = snapshot["upvote_ratio"]
+            row.num_comments = snapshot["num_comments"]
+
+        for table, truncate in self.BUCKET_TABLES:
+            self._add_to_buckets(table, truncate, deltas)
+        return changes
+
+    def _add_to_buckets(self, table, truncate, deltas: Dict):
+        bucket_deltas = defaultdict(lambda: [0, 0, 0])
+        for (account_id, subreddit, created_at), (posts, score, comments) in deltas.items():
+            delta = bucket_deltas[(account_id, subreddit, truncate(created_at))]
+            delta[0] += posts
+            delta[1] += score
+            delta[2] += comments
+
+        for (account_id, subreddit, bucket), (posts, score, comments) in bucket_deltas.items():
+            row = self.db.get(table, (account_id, subreddit, bucket))
+            if row is None:
+                row = table(
+                    account_id=account_id,
+                    subreddit=subreddit,
+                    bucket=bucket,
+                    posts=0,
+                    score=0,
+                    num_comments=0
+                )
+                self.db.add(row)
+            row.posts += posts
+            row.score += score
+            row.num_comments += comments
+
+    async def get_overview(self, account_id: int, timeframe: str = "30d") -> Dict:
+        """Build the analytics overview for an account from rollup rows"""
+        window = parse_timeframe(timeframe)
+        now = datetime.utcnow()
+
+        # Daily buckets are enough past two days; shorter windows need hourly precision
+        if window > timedelta(days=2):
+            table, since = DailyRollup, _day(now - window)
+        else:
+            table, since = HourlyRollup, _hour(now - window)
+
+        rows = (await self.db.scalars(
+            select(table).where(
+                table.account_id == account_id,
+                table.bucket >= since
+            ).order_by(table.bucket)
+        )).all()
+
+        total_posts = sum(row.posts for row in rows)
+        total_karma = sum(row.score for row in rows)
+        total_comments = sum(row.num_comments for row in rows)
+
+        by_subreddit = defaultdict(lambda: {"posts": 0, "score": 0, "comments": 0})
+        by_bucket = defaultdict(lambda: {"posts": 0, "score": 0, "comments": 0})
+        for row in rows:
+            for totals in (by_subreddit[row.subreddit], by_bucket[row.bucket]):
+                totals["posts"] += row.posts
+                totals["score"] += row.score
+                totals["comments"] += row.num_comments
+
+        for totals in by_subreddit.values():
+            totals["avg_score"] = totals["score"] / totals["posts"] if totals["posts"] else 0.0
+
+        best_posts = (await self.db.scalars(
+            select(models.Post).join(
+                PostRollup, PostRollup.post_id == models.Post.post_id
+            ).where(
+                PostRollup.account_id == account_id,
+                PostRollup.created_at >= now - window
+            ).order_by(PostRollup.score.desc()).limit(5)
+        )).all()
+
+        return {
+            "total_posts": total_posts,
+            "total_karma": total_karma,
+            "avg_score": total_karma / total_posts if total_posts else 0.0,
+            "avg_comments": total_comments / total_posts if total_posts else 0.0,
+            "engagement_rate": total_comments / total_karma if total_karma else 0.0,
+            "best_performing_posts": best_posts,
+            "performance_by_subreddit": dict(by_subreddit),
+            "growth_trends": {
+                "interval": "day" if table is DailyRollup else "hour",
+                "series": [
+                    {"bucket": bucket.isoformat(), **totals}
+                    for bucket, totals in sorted(by_bucket.items())
+                ]
+            }
+        }
+
+    def _raw_latest(self, account_id: Optional[int] = None):
+        """Latest stored analytics snapshot of every published post"""
+        from services.analytics_store import AnalyticsStore
+
+        query = self.db.query(models.Post.post_id, models.Post.account_id).filter(models.Post.post_id.isnot(None))
+        if account_id is not None:
+            query = query.filter(models.Post.account_id == account_id)
+        owners = dict(query.all())
+
+        post_ids = list(owners)
+        store = AnalyticsStore(self.db)
+        for start in range(0, len(post_ids), 1000):
+            for post_id, snapshot in store.latest(post_ids[start:start + 1000]).items():
+                yield snapshot, owners[post_id]
+
+    def rebuild(self, account_id: Optional[int] = None) -> int:
+        """Recompute rollups from stored analytics snapshots and return the post count"""
+        for table in (PostRollup, HourlyRollup, DailyRollup):
+            query = self.db.query(table)
+            if account_id is not None:
+                query = query.filter(table.account_id == account_id)
+            query.delete(synchronize_session=False)
+        self.db.flush()
+
+        count = 0
+        batch = []
+        for snapshot, owner_id in self._raw_latest(account_id):
+            batch.append({
+                "post_id": snapshot["post_id"],
+                "account_id": owner_id,
+                "subreddit": snapshot["subreddit"],
+                "created_at": snapshot["created_at"],
+                "score": snapshot["score"],
+                "upvote_ratio": snapshot["upvote_ratio"],
+                "num_comments": snapshot["num_comments"]
+            })
+            if len(batch) >= 1000:
+                self.apply(batch)
+                self.db.flush()
+                count += len(batch)
+                batch = []
+
+        self.apply(batch)
+        count += len(batch)
+        self.db.commit()
+        return count
+
+    def check_consistency(self, account_id: Optional[int] = None) -> List[Dict]:
+        """Compare daily rollups with totals recomputed from stored analytics snapshots"""
+        expected = defaultdict(lambda: [0, 0, 0])
+        for snapshot, owner_id in self._raw_latest(account_id):
+            totals = expected[(owner_id, snapshot["subreddit"], _day(snapshot["created_at"]))]
+            totals[0] += 1
+            totals[1] += snapshot["score"]
+            totals[2] += snapshot["num_comments"]
+
+        query = self.db.query(DailyRollup)
+        if account_id is not None:
+            query = query.filter(DailyRollup.account_id == account_id)
+        actual = {
+            (row.account_id, row.subreddit, row.bucket): [row.posts, row.score, row.num_comments]
+            for row in query
+        }
+
+        mismatches = []
+        for key in set(expected) | set(actual):
+            want = expected.get(key, [0, 0, 0])
+            have = actual.get(key, [0, 0, 0])
+            if want != have:
+                mismatches.append({
+                    "account_id": key[0],
+                    "subreddit": key[1],
+                    "bucket": key[2].isoformat(),
+                    "expected": dict(zip(("posts", "score", "num_comments"), want)),
+                    "actual": dict(zip(("posts", "score", "num_comments"), have))
+                })
+        return mismatches
+
+if __name__ == "__main__":
+    from database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Maintain analytics rollup tables")
+    parser.add_argument("command", choices=["rebuild", "check"])
+    parser.add_argument("--account-id", type=int, default=None)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        service = RollupService(db)
+        if args.command == "rebuild":
+            count = service.rebuild(args.account_id)
+            print(f"Rebuilt rollups from {count} posts")
+        else:
+            mismatches = service.check_consistency(args.account_id)
+            for mismatch in mismatches:
+                print(mismatch)
+            print(f"{len(mismatches)} inconsistent buckets")
+            raise SystemExit(1 if mismatches else 0)
+    finally:
+        db.close()
@@ -0,0 +1,220 @@
+from bisect import bisect_left
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from config import get_settings
+from services.best_times_service import best_times_engine
+import schemas
+import models
+
+settings = get_settings()
+
+def _epoch(moment: datetime) -> float:
+    # Naive datetimes are UTC throughout the backend; aware ones keep their offset
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.astimezone(timezone.utc).timestamp()
+
+def _naive(seconds: float) -> datetime:
+    return datetime.fromtimestamp(seconds, timezone.utc).replace(tzinfo=None)
+
+class _Runs:
+    """Union-find over neighbours with no room for another post between them.
+
+    Used for post times closer than twice the gap and for consecutive full
+    days. Links point in one direction only (later for forward runs, earlier
+    for backward ones), and adding a post only ever fills space, so runs
+    merge but never split. find() returns the far end of a run, next to
+    which the first free slot lies, in amortized constant time.
+    """
+
+    def __init__(self):
+        self.parent: Dict[float, float] = {}
+
+    def link(self, moment: float, neighbour: float):
+        self.parent[moment] = neighbour
+
+    def find(self, moment: float) -> float:
+        root = moment
+        while root in self.parent:
+            root = self.parent[root]
+        while moment != root:
+            self.parent[moment], moment = root, self.parent[moment]
+        return root
+
+class AccountTimeline:
+    """Sorted post times and per-day counts of one account; days are local ordinals"""
+
+    def __init__(self, gap: float, max_per_day: int, tz: ZoneInfo):
+        self.gap = gap
+        self.max_per_day = max_per_day
+        self.tz = tz
+        self.times: List[float] = []
+        self.per_day: Dict[int, int] = defaultdict(int)
+        # Runs of tightly packed posts and of full days
+        self.forward = _Runs()
+        self.backward = _Runs()
+        self.full_forward = _Runs()
+        self.full_backward = _Runs()
+
+    def _day(self, moment: float) -> int:
+        return datetime.fromtimestamp(moment, self.tz).date().toordinal()
+
+    def _day_start(self, day: int) -> float:
+        return datetime.combine(date.fromordinal(day), datetime.min.time(), self.tz).timestamp()
+
+    def add(self, moment: float):
+        day = self._day(moment)
+        self.per_day[day] += 1
+        if self.per_day[day] >= self.max_per_day:
+            self.full_forward.link(day, day + 1)
+            self.full_backward.link(day, day - 1)
+
+        index = bisect_left(self.times, moment)
+        if index < len(self.times) and self.times[index] == moment:
+            # Already occupied, e.g. two existing posts at the same minute
+            return
+        if index > 0 and moment - self.times[index - 1] < 2 * self.gap:
+            self.forward.link(self.times[index - 1], moment)
+            self.backward.link(moment, self.times[index - 1])
+        if index < len(self.times) and self.times[index] - moment < 2 * self.gap:
+            self.forward.link(moment, self.times[index])
+            self.backward.link(self.times[index], moment)
+        self.times.insert(index, moment)
+
+    def _conflicts(self, moment: float) -> Tuple[Optional[float], Optional[float]]:
+        """Neighbours closer than the gap on either side, if any"""
+        index = bisect_left(self.times, moment)
+        prev = self.times[index - 1] if index > 0 and moment - self.times[index - 1] < self.gap else None
+        nxt = self.times[index] if index < len(self.times) and self.times[index] - moment < self.gap else None
+        return prev, nxt
+
+    def next_free(self, moment: float) -> float:
+        """Earliest valid time at or after moment"""
+        while True:
+            day = self._day(moment)
+            free_day = self.full_forward.find(day)
+            if free_day != day:
+                # Skip every full day in one step
+                moment = self._day_start(free_day)
+                continue
+
+            prev, nxt = self._conflicts(moment)
+            if nxt is not None:
+                # Skip the whole run of tightly packed posts in one step
+                moment = self.forward.find(nxt) + self.gap
+            elif prev is not None:
+                moment = prev + self.gap
+            else:
+                return moment
+
+    def previous_free(self, moment: float, earliest: float) -> Optional[float]:
+        """Latest valid time at or before moment and not before earliest"""
+        while moment >= earliest:
+            day = self._day(moment)
+            free_day = self.full_backward.find(day)
+            if free_day != day:
+                moment = self._day_start(free_day + 1) - 1
+                continue
+
+            prev, nxt = self._conflicts(moment)
+            if prev is not None:
+                moment = self.backward.find(prev) - self.gap
+            elif nxt is not None:
+                moment = nxt - self.gap
+            else:
+                return moment
+        return None
+
+    def nearest_free(self, moment: float, earliest: float) -> float:
+        after = self.next_free(moment)
+        if after == moment:
+            return after
+        before = self.previous_free(moment, earliest)
+        if before is not None and moment - before < after - moment:
+            return before
+        return after
+
+class ScheduleSolver:
+    """Places a batch of posts on their accounts' timelines in one pass.
+
+    Each account's existing schedule is loaded once into a sorted index, so
+    checking MIN_SCHEDULING_INTERVAL is a binary search and MAX_POSTS_PER_DAY
+    a dict lookup. Posts keep their requested time when it is free and
+    otherwise move to the nearest free time; posts without one go to the
+    subreddit's next best-time slot, or the earliest free time without
+    best-time data.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self.gap = settings.MIN_SCHEDULING_INTERVAL * 60
+        self.tz = ZoneInfo(settings.SCHEDULING_TIMEZONE)
+
+    async def _load(self, account_ids: List[int], now: datetime) -> Dict[int, AccountTimeline]:
+        timelines = {
+            account_id: AccountTimeline(self.gap, settings.MAX_POSTS_PER_DAY, self.tz)
+            for account_id in account_ids
+        }
+        # Everything from the start of today counts towards today's limit
+        local_today = now.replace(tzinfo=timezone.utc).astimezone(self.tz).date()
+        since = datetime.combine(local_today, datetime.min.time(), self.tz).astimezone(timezone.utc).replace(tzinfo=None)
+        rows = await self.db.execute(
+            select(models.Post.account_id, models.Post.scheduled_time).where(
+                models.Post.account_id.in_(account_ids),
+                models.Post.scheduled_time >= since - timedelta(seconds=self.gap)
+            ).order_by(models.Post.scheduled_time)
+        )
+        for account_id, scheduled_time in rows:
+            timelines[account_id].add(_epoch(scheduled_time))
+        return timelines
+
+    async def solve(self, posts: List[schemas.PostCreate], use_best_times: bool = True) -> List[Dict]:
+        """Conflict-free placement for every post, in input order"""
+        now = datetime.utcnow()
+        earliest = _epoch(now)
+        timelines = await self._load(sorted({post.account_id for post in posts}), now)
+
+        # Requested times are honoured in time order; the rest fill in afterwards
+        order = sorted(
+            range(len(posts)),
+            # Compared as epochs, since requests may mix naive and aware times
+            key=lambda index: (
+                posts[index].scheduled_time is None,
+                _epoch(posts[index].scheduled_time) if posts[index].scheduled_time else earliest
+            )
+        )
+        placements: List[Optional[Dict]] = [None] * len(posts)
+        best_slots: Dict[str, Optional[datetime]] = {}
+
+        for index in order:
+            post = posts[index]
+            target = post.scheduled_time
+            if target is None and use_best_times:
+                if post.subreddit not in best_slots:
+                    best_slots[post.subreddit] = await best_times_engine.next_best_slot(self.db, post.subreddit, now)
+                target = best_slots[post.subreddit]
+
+            wanted = max(_epoch(target), earliest) if target else earliest
+            timeline = timelines[post.account_id]
+            placed = timeline.nearest_free(wanted, earliest)
+            timeline.add(placed)
+
+            if post.scheduled_time is None:
+                reason = "best_time" if target else "earliest_free"
+            elif placed == _epoch(post.scheduled_time):
+                reason = "requested"
+            else:
+                reason = "moved"
+            placements[index] = {
+                "index": index,
+                "account_id": post.account_id,
+                "subreddit": post.subreddit,
+                "requested_time": post.scheduled_time,
+                "scheduled_time": _naive(placed),
+                "status": reason
+            }
+        return placements
\ No newline at end of file
@@ -0,0 +1,37 @@
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Tuple
+from sqlalchemy import Column, Integer, String, Float, DateTime
+from sqlalchemy.orm import Session
+from models import Base
+
+class StreamCursor(Base):
+    """High-water mark of one ingestion stream of an account"""
+    __tablename__ = "stream_cursors"
+
+    account_id = Column(Integer, primary_key=True)
+    stream = Column(String, primary_key=True)  # 'inbox' or 'comments'
+    last_fullname = Column(String, nullable=True)
+    last_created_utc = Column(Float, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class StreamCursorService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def load(self, account_ids: Iterable[int]) -> Dict[Tuple[int, str], StreamCursor]:
+        """Cursors of the given accounts keyed by (account_id, stream)"""
+        return {
+            (cursor.account_id, cursor.stream): cursor
+            for cursor in self.db.query(StreamCursor).filter(
+                StreamCursor.account_id.in_(list(account_ids))
+            )
+        }
+
+    def save(self, account_id: int, stream: str, fullname: str, created_utc: Optional[float]):
+        """Move a stream's high-water mark; the caller commits"""
+        cursor = self.db.get(StreamCursor, (account_id, stream))
+        if cursor is None:
+            cursor = StreamCursor(account_id=account_id, stream=stream)
+            self.db.add(cursor)
+        cursor.last_fullname = fullname
+        cursor.last_created_utc = created_utc
\ No newline at end of file
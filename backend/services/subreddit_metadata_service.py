@@ -0,0 +1,217 @@
+import asyncio
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+from sqlalchemy import Column, DateTime, JSON, String, select
+from async_database import AsyncSessionLocal
+from config import get_settings
+from models import Base
+from utils.logger import app_logger
+from utils.reddit_clients import reddit_clients
+
+settings = get_settings()
+
+FIELDS = ("flairs", "rules", "stats")
+
+class SubredditMetadata(Base):
+    """Cached Reddit metadata of a subreddit, each field with its own fetch time"""
+    __tablename__ = "subreddit_metadata"
+
+    subreddit = Column(String, primary_key=True)
+    flairs = Column(JSON, nullable=True)
+    flairs_fetched_at = Column(DateTime, nullable=True)
+    rules = Column(JSON, nullable=True)
+    rules_fetched_at = Column(DateTime, nullable=True)
+    stats = Column(JSON, nullable=True)
+    stats_fetched_at = Column(DateTime, nullable=True)
+
+def fetch_flairs(subreddit: str) -> Dict:
+    reddit = reddit_clients.get_app()
+    templates = reddit.request(method="GET", path=f"/r/{subreddit}/api/link_flair_v2")
+    requirements = reddit.request(method="GET", path=f"/api/v1/{subreddit}/post_requirements")
+    return {
+        "required": bool(requirements.get("is_flair_required")),
+        "templates": [
+            {
+                "id": template["id"],
+                "text": template.get("text") or "",
+                "text_editable": bool(template.get("text_editable")),
+                "background_color": template.get("background_color"),
+                "text_color": template.get("text_color")
+            }
+            for template in templates
+        ]
+    }
+
+def fetch_rules(subreddit: str) -> List[Dict]:
+    rules = reddit_clients.get_app().request(method="GET", path=f"/r/{subreddit}/about/rules")
+    return [
+        {
+            "name": rule.get("short_name"),
+            "description": rule.get("description"),
+            "kind": rule.get("kind")
+        }
+        for rule in rules.get("rules", [])
+    ]
+
+def fetch_stats(subreddit: str) -> Dict:
+    about = reddit_clients.get_app().request(method="GET", path=f"/r/{subreddit}/about")["data"]
+    return {
+        "subscriber_count": about.get("subscribers") or 0,
+        "active_users": about.get("active_user_count") or about.get("accounts_active") or 0,
+        "over18": bool(about.get("over18")),
+        "submission_type": about.get("submission_type")
+    }
+
+FETCHERS: Dict[str, Callable[[str], object]] = {
+    "flairs": fetch_flairs,
+    "rules": fetch_rules,
+    "stats": fetch_stats
+}
+
+def check_flair(flairs: Optional[Dict], flair: Optional[str], subreddit: str) -> Optional[str]:
+    """Server-side counterpart of validateFlair in frontend/src/lib/flair-validation.js"""
+    if not flairs:
+        return None  # Flairs unknown, e.g. the subreddit hides them
+
+    if not flair:
+        return f"r/{subreddit} requires a post flair" if flairs["required"] else None
+
+    wanted = flair.strip().lower()
+    templates = flairs["templates"]
+    if any(template["id"] == flair or template["text"].lower() == wanted for template in templates):
+        return None
+    if any(template["text_editable"] for template in templates):
+        return None
+    return f"This flair is not allowed in r/{subreddit}"
+
+class SubredditMetadataService:
+    """Flairs, rules and subscriber stats per subreddit, cached in memory and the database.
+
+    Each field has its own TTL. A field past its TTL is still served while a
+    background task fetches a fresh copy (stale-while-revalidate); only a
+    field never fetched, or older than SUBREDDIT_METADATA_MAX_STALE, makes
+    the caller wait for Reddit.
+    """
+
+    def __init__(self):
+        self.ttls = {
+            "flairs": timedelta(seconds=settings.SUBREDDIT_FLAIRS_TTL),
+            "rules": timedelta(seconds=settings.SUBREDDIT_RULES_TTL),
+            "stats": timedelta(seconds=settings.SUBREDDIT_STATS_TTL)
+        }
+        self.max_stale = timedelta(seconds=settings.SUBREDDIT_METADATA_MAX_STALE)
+        # Least recently used subreddits are evicted first; they reload from the database
+        self.max_entries = settings.SUBREDDIT_METADATA_MAX_ENTRIES
+        self.entries: "OrderedDict[str, Dict[str, Tuple[object, datetime]]]" = OrderedDict()
+        self.inflight: Dict[Tuple[str, str], asyncio.Task] = {}
+        self.background: Set[asyncio.Task] = set()
+        self._fetch_limit = asyncio.Semaphore(settings.SUBREDDIT_METADATA_CONCURRENCY)
+        self._store_lock = asyncio.Lock()  # fields of one subreddit share a row
+
+    def _entry(self, subreddit: str) -> Dict[str, Tuple[object, datetime]]:
+        entry = self.entries.get(subreddit)
+        if entry is None:
+            entry = self.entries[subreddit] = {}
+        self.entries.move_to_end(subreddit)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return entry
+
+    async def _load(self, subreddits: List[str]):
+        """Fill the memory layer from the database for subreddits not seen yet"""
+        missing = [subreddit for subreddit in subreddits if subreddit not in self.entries]
+        if not missing:
+            return
+        async with AsyncSessionLocal() as db:
+            rows = (await db.scalars(
+                select(SubredditMetadata).where(SubredditMetadata.subreddit.in_(missing))
+            )).all()
+        loaded = {row.subreddit: row for row in rows}
+        for subreddit in missing:
+            entry = self._entry(subreddit)
+            row = loaded.get(subreddit)
+            if row is None:
+                continue
+            for field in FIELDS:
+                fetched_at = getattr(row, f"{field}_fetched_at")
+                if fetched_at is not None and field not in entry:
+                    entry[field] = (getattr(row, field), fetched_at)
+
+    async def _fetch(self, subreddit: str, field: str):
+        """Fetch one field from Reddit and store it; concurrent callers share the fetch"""
+        key = (subreddit, field)
+        task = self.inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._fetch_and_store(subreddit, field))
+            self.inflight[key] = task
+            task.add_done_callback(lambda _: self.inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _fetch_and_store(self, subreddit: str, field: str):
+        async with self._fetch_limit:
+            value = await asyncio.to_thread(FETCHERS[field], subreddit)
+        fetched_at = datetime.utcnow()
+        self._entry(subreddit)[field] = (value, fetched_at)
+
+        async with self._store_lock, AsyncSessionLocal() as db:
+            row = await db.get(SubredditMetadata, subreddit)
+            if row is None:
+                row = SubredditMetadata(subreddit=subreddit)
+                db.add(row)
+            setattr(row, field, value)
+            setattr(row, f"{field}_fetched_at", fetched_at)
+            await db.commit()
+        return value
+
+    async def _revalidate(self, subreddit: str, field: str):
+        try:
+            await self._fetch(subreddit, field)
+        except Exception as e:
+            app_logger.warning("Failed to refresh %s of r/%s: %s", field, subreddit, e)
+
+    async def _field(self, subreddit: str, field: str):
+        entry = self.entries.get(subreddit)
+        if entry is not None:
+            self.entries.move_to_end(subreddit)
+        cached = entry.get(field) if entry is not None else None
+        now = datetime.utcnow()
+        if cached is not None:
+            value, fetched_at = cached
+            age = now - fetched_at
+            if age <= self.ttls[field]:
+                return value
+            if age <= self.max_stale:
+                if (subreddit, field) not in self.inflight:
+                    task = asyncio.create_task(self._revalidate(subreddit, field))
+                    self.background.add(task)
+                    task.add_done_callback(self.background.discard)
+                return value
+        try:
+            return await self._fetch(subreddit, field)
+        except Exception as e:
+            app_logger.warning("Failed to fetch %s of r/%s: %s", field, subreddit, e)
+            # An outdated copy beats none when Reddit is unavailable
+            return cached[0] if cached is not None else None
+
+    async def get(self, subreddit: str, fields: Iterable[str] = FIELDS) -> Dict:
+        """Requested metadata fields of a subreddit; a field is None if it could not be fetched"""
+        subreddit = subreddit.lower()
+        await self._load([subreddit])
+        fields = list(fields)
+        values = await asyncio.gather(*(self._field(subreddit, field) for field in fields))
+        return {"subreddit": subreddit, **dict(zip(fields, values))}
+
+    async def validate_flairs(self, rows: List[Tuple[str, Optional[str]]]) -> List[Optional[str]]:
+        """Flair error per (subreddit, flair) row, fetching each subreddit's flairs at most once"""
+        subreddits: Set[str] = {subreddit.lower() for subreddit, _ in rows if subreddit}
+        await self._load(list(subreddits))
+        flairs = dict(zip(subreddits, await asyncio.gather(
+            *(self._field(subreddit, "flairs") for subreddit in subreddits)
+        )))
+        return [
+            check_flair(flairs.get(subreddit.lower()), flair, subreddit) if subreddit else None
+            for subreddit, flair in rows
+        ]
+
+subreddit_metadata = SubredditMetadataService()
\ No newline at end of file
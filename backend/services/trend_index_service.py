@@ -0,0 +1,226 @@
+import math
+import re
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Set, Tuple
+from sqlalchemy import Column, Integer, String, DateTime, case, func, select, and_
+from config import get_settings
+from models import Base
+from services.rollup_service import PostRollup, parse_timeframe
+import models
+
+settings = get_settings()
+
+TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9'+#-]*[a-z0-9+#]|[a-z0-9]")
+MIN_TERM_LENGTH = 3
+STOPWORDS = frozenset("""
+a about above after again against all am an and any are aren't as at be because been before being
+below between both but by can can't cannot could couldn't did didn't do does doesn't doing don't down
+during each few for from further had hadn't has hasn't have haven't having he her here hers herself him
+himself his how i i'm if in into is isn't it it's its itself just let's me more most my myself no nor not
+now of off on once only or other our ours ourselves out over own same she should so some such than that
+that's the their theirs them themselves then there these they this those through to too under until up
+very was wasn't we were weren't what when where which while who whom why will with won't would you your
+yours yourself yourselves get got new one like
+""".split())
+
+class TrendTermBucket(Base):
+    """Daily document frequency and score of a term in a subreddit"""
+    __tablename__ = "trend_term_buckets"
+
+    subreddit = Column(String, primary_key=True)
+    day = Column(DateTime, primary_key=True)
+    term = Column(String, primary_key=True)
+    kind = Column(String, nullable=False)  # 'keyword' or 'topic'
+    posts = Column(Integer, default=0, nullable=False)
+    score = Column(Integer, default=0, nullable=False)
+
+def extract_terms(*texts: str) -> Set[Tuple[str, str]]:
+    """Distinct keywords and two-word topics of a post"""
+    terms = set()
+    for text in texts:
+        if not text:
+            continue
+        words = [
+            word for word in TOKEN_RE.findall(text.lower())
+            if len(word) >= MIN_TERM_LENGTH and word not in STOPWORDS
+        ]
+        terms.update(("keyword", word) for word in words)
+        terms.update(("topic", f"{first} {second}") for first, second in zip(words, words[1:]))
+    return terms
+
+def _day(moment: datetime) -> datetime:
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+class TrendIndexService:
+    """Per-subreddit term index with daily buckets behind /analytics/trends.
+
+    Posts are tokenized once when they are created and their score is added
+    as analytics arrive. A trend query compares two windows of bucket sums
+    and never reads post text.
+    """
+
+    def __init__(self, db):
+        self.db = db
+
+    def _add(self, increments: Dict[Tuple[str, datetime, str, str], List[int]]):
+        """Add (posts, score) increments to buckets; runs on a regular Session"""
+        keys_by_bucket = defaultdict(list)
+        for subreddit, day, kind, term in increments:
+            keys_by_bucket[(subreddit, day)].append((kind, term))
+
+        for (subreddit, day), keys in keys_by_bucket.items():
+            existing = {
+                row.term: row
+                for row in self.db.query(TrendTermBucket).filter(
+                    TrendTermBucket.subreddit == subreddit,
+                    TrendTermBucket.day == day,
+                    TrendTermBucket.term.in_([term for _, term in keys])
+                )
+            }
+            for kind, term in keys:
+                posts, score = increments[(subreddit, day, kind, term)]
+                row = existing.get(term)
+                if row is None and posts < 0:
+                    continue  # pruned already
+                if row is None:
+                    row = TrendTermBucket(subreddit=subreddit, day=day, term=term, kind=kind, posts=0, score=0)
+                    self.db.add(row)
+                row.posts += posts
+                row.score += score
+
+    def _post_increments(self, posts: List, sign: int) -> Dict[Tuple[str, datetime, str, str], List[int]]:
+        post_ids = [post.post_id for post in posts if post.post_id]
+        scores = dict(
+            self.db.query(PostRollup.post_id, PostRollup.score).filter(PostRollup.post_id.in_(post_ids))
+        ) if post_ids else {}
+
+        increments = defaultdict(lambda: [0, 0])
+        for post in posts:
+            day = _day(post.created_at or datetime.utcnow())
+            score = scores.get(post.post_id, 0)
+            for kind, term in extract_terms(post.title, post.content):
+                increment = increments[(post.subreddit.lower(), day, kind, term)]
+                increment[0] += sign
+                increment[1] += sign * score
+        return increments
+
+    def index_posts(self, posts: Iterable):
+        """Count the terms of new or edited posts; the caller commits"""
+        self._add(self._post_increments(list(posts), 1))
+
+    def unindex_posts(self, posts: Iterable):
+        """Take the terms and score of edited or deleted posts back out; the caller commits"""
+        self._add(self._post_increments(list(posts), -1))
+
+    def record_engagement(self, changes: List[Dict]):
+        """Add score changes reported by RollupService.apply to the posts' terms"""
+        score_deltas = {
+            change["post_id"]: change["score"] - change["old_score"]
+            for change in changes
+            if change["score"] != change["old_score"]
+        }
+        if not score_deltas:
+            return
+
+        increments = defaultdict(lambda: [0, 0])
+        posts = self.db.query(
+            models.Post.post_id, models.Post.subreddit, models.Post.created_at,
+            models.Post.title, models.Post.content
+        ).filter(models.Post.post_id.in_(list(score_deltas)))
+        for post_id, subreddit, created_at, title, content in posts:
+            day = _day(created_at)
+            for kind, term in extract_terms(title, content):
+                increments[(subreddit.lower(), day, kind, term)][1] += score_deltas[post_id]
+        self._add(increments)
+
+    def prune(self, min_posts: int = 2, grace_days: int = 7) -> int:
+        """Drop buckets past retention and one-off terms older than the grace period"""
+        now = datetime.utcnow()
+        expired = self.db.query(TrendTermBucket).filter(
+            TrendTermBucket.day < _day(now - timedelta(days=settings.ANALYTICS_RETENTION_DAYS))
+        ).delete(synchronize_session=False)
+
+        # A term seen in fewer than min_posts posts across the whole window is noise
+        rare_terms = self.db.query(TrendTermBucket.subreddit, TrendTermBucket.term).group_by(
+            TrendTermBucket.subreddit, TrendTermBucket.term
+        ).having(
+            func.sum(TrendTermBucket.posts) < min_posts,
+            func.max(TrendTermBucket.day) < _day(now - timedelta(days=grace_days))
+        ).all()
+
+        pruned = 0
+        by_subreddit = defaultdict(list)
+        for subreddit, term in rare_terms:
+            by_subreddit[subreddit].append(term)
+        for subreddit, terms in by_subreddit.items():
+            for start in range(0, len(terms), 500):
+                pruned += self.db.query(TrendTermBucket).filter(
+                    TrendTermBucket.subreddit == subreddit,
+                    TrendTermBucket.term.in_(terms[start:start + 500])
+                ).delete(synchronize_session=False)
+
+        self.db.commit()
+        return expired + pruned
+
+    async def _window_counts(self, subreddit: str, since: datetime, split: datetime):
+        recent = TrendTermBucket.day >= split
+        rows = await self.db.execute(
+            select(
+                TrendTermBucket.kind,
+                TrendTermBucket.term,
+                func.sum(case((recent, TrendTermBucket.posts), else_=0)),
+                func.sum(case((recent, 0), else_=TrendTermBucket.posts)),
+                func.sum(case((recent, TrendTermBucket.score), else_=0))
+            ).where(and_(
+                TrendTermBucket.subreddit == subreddit,
+                TrendTermBucket.day >= since
+            )).group_by(TrendTermBucket.kind, TrendTermBucket.term)
+        )
+        return rows.all()
+
+    async def analyze_trends(self, subreddit: str, timeframe: str = "30d", limit: int = 20) -> Dict:
+        """Trending keywords and topics from bucket sums; needs an AsyncSession.
+
+        The last quarter of the timeframe (at least one day) is compared with
+        the rest. A term's burst score is how far its recent count exceeds
+        the count expected from its baseline rate, in Poisson standard
+        deviations.
+        """
+        window_days = max(parse_timeframe(timeframe).days, 2)
+        recent_days = max(window_days // 4, 1)
+        baseline_days = window_days - recent_days
+        today = _day(datetime.utcnow())
+        since = today - timedelta(days=window_days - 1)
+        split = today - timedelta(days=recent_days - 1)
+
+        trends = {"keyword": [], "topic": []}
+        for kind, term, recent, baseline, score in await self._window_counts(subreddit.lower(), since, split):
+            expected = baseline * recent_days / baseline_days
+            burst = (recent - expected) / math.sqrt(expected + 1)
+            trends[kind].append({
+                "term": term,
+                "recent_posts": int(recent),
+                "baseline_posts": int(baseline),
+                "recent_score": int(score),
+                "burst_score": round(burst, 3)
+            })
+
+        for kind in trends:
+            trends[kind].sort(key=lambda item: item["burst_score"], reverse=True)
+
+        rising = [item for item in trends["keyword"] if item["burst_score"] > 0][:limit]
+        return {
+            "keyword_trends": trends["keyword"][:limit],
+            "topic_trends": trends["topic"][:limit],
+            "engagement_patterns": {
+                "window_days": window_days,
+                "recent_days": recent_days,
+                "top_scoring_terms": sorted(
+                    trends["keyword"], key=lambda item: item["recent_score"], reverse=True
+                )[:limit]
+            },
+            "predictions": {
+                "rising_keywords": [item["term"] for item in rising]
+            }
+        }
@@ -0,0 +1,168 @@
+import asyncio
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Dict, List
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from config import get_settings
+from services.analytics_store import AnalyticsStore
+from services.rollup_service import RollupService
+from services.best_times_service import best_times_engine
+from services.trend_index_service import TrendIndexService
+from utils.cache import get_response_cache
+from utils.reddit_clients import reddit_clients
+import models
+
+if TYPE_CHECKING:
+    import praw
+
+settings = get_settings()
+
+# Reddit's /api/info accepts at most 100 fullnames per call
+INFO_BATCH_SIZE = 100
+
+# (post age, multiple of ANALYTICS_UPDATE_INTERVAL between refreshes)
+REFRESH_TIERS = [
+    (timedelta(hours=24), 1),
+    (timedelta(days=3), 6),
+    (timedelta(days=7), 36),
+]
+REFRESH_TIER_OLD = 288
+
+class TrackedPost:
+    __slots__ = ("account_id", "subreddit", "created_at", "checked_at", "score", "upvote_ratio", "num_comments")
+
+    def __init__(self, account_id: int, subreddit: str, created_at: datetime):
+        self.account_id = account_id
+        self.subreddit = subreddit
+        self.created_at = created_at
+        self.checked_at = None
+        self.score = None
+        self.upvote_ratio = None
+        self.num_comments = None
+
+class AnalyticsRefresher:
+    """Incremental analytics refresh for published posts.
+
+    Posts are fetched through /api/info in batches of 100 fullnames, young
+    posts are refreshed every ANALYTICS_UPDATE_INTERVAL and older ones
+    progressively less often, and a snapshot row is only written when the
+    score, upvote ratio or comment count actually changed.
+    """
+
+    def __init__(self):
+        self.tracked: Dict[str, TrackedPost] = {}
+        self.base_interval = timedelta(minutes=settings.ANALYTICS_UPDATE_INTERVAL)
+        self.retention = timedelta(days=settings.ANALYTICS_RETENTION_DAYS)
+
+    def _client(self) -> "praw.Reddit":
+        return reddit_clients.get_app()
+
+    def refresh_interval(self, age: timedelta) -> timedelta:
+        for max_age, multiplier in REFRESH_TIERS:
+            if age < max_age:
+                return self.base_interval * multiplier
+        return self.base_interval * REFRESH_TIER_OLD
+
+    def _sync_tracked(self, db: Session, now: datetime):
+        """Track every published post still inside the retention window"""
+        cutoff = now - self.retention
+        published_at = func.coalesce(models.Post.scheduled_time, models.Post.created_at)
+        rows = db.query(
+            models.Post.post_id, models.Post.account_id, models.Post.subreddit, published_at
+        ).filter(
+            models.Post.is_posted == True,
+            models.Post.post_id.isnot(None),
+            published_at >= cutoff
+        ).all()
+
+        current = {}
+        new_ids = []
+        for post_id, account_id, subreddit, created_at in rows:
+            tracked = self.tracked.get(post_id)
+            if tracked is None:
+                tracked = TrackedPost(account_id, subreddit, created_at)
+                new_ids.append(post_id)
+            current[post_id] = tracked
+        self.tracked = current
+
+        if new_ids:
+            self._load_last_snapshots(db, new_ids)
+
+    def _load_last_snapshots(self, db: Session, post_ids: List[str]):
+        """Seed change detection from the latest stored row of each post"""
+        for post_id, snapshot in AnalyticsStore(db).latest(post_ids).items():
+            tracked = self.tracked[post_id]
+            tracked.checked_at = snapshot["tracked_at"]
+            tracked.score = snapshot["score"]
+            tracked.upvote_ratio = snapshot["upvote_ratio"]
+            tracked.num_comments = snapshot["num_comments"]
+
+    def _due_fullnames(self, now: datetime) -> List[str]:
+        due = []
+        for post_id, tracked in self.tracked.items():
+            if tracked.checked_at is None or now - tracked.checked_at >= self.refresh_interval(now - tracked.created_at):
+                due.append(f"t3_{post_id}")
+        return due
+
+    async def refresh(self, db: Session) -> int:
+        """Refresh due posts and return the number of snapshot rows written"""
+        now = datetime.utcnow()
+        self._sync_tracked(db, now)
+        due = self._due_fullnames(now)
+        if not due:
+            return 0
+
+        reddit = self._client()
+        rows = []
+        for start in range(0, len(due), INFO_BATCH_SIZE):
+            batch = due[start:start + INFO_BATCH_SIZE]
+            submissions = await asyncio.to_thread(
+                lambda fullnames: list(reddit.info(fullnames=fullnames)), batch
+            )
+
+            checked_at = datetime.utcnow()
+            # Deleted or removed posts are missing from the response; they still
+            # count as checked so they follow the decaying schedule instead of every pass
+            for fullname in batch:
+                self.tracked[fullname[3:]].checked_at = checked_at
+
+            for submission in submissions:
+                tracked = self.tracked.get(submission.id)
+                if tracked is None:
+                    continue
+
+                if (submission.score == tracked.score
+                        and submission.upvote_ratio == tracked.upvote_ratio
+                        and submission.num_comments == tracked.num_comments):
+                    continue
+
+                tracked.score = submission.score
+                tracked.upvote_ratio = submission.upvote_ratio
+                tracked.num_comments = submission.num_comments
+                rows.append({
+                    "post_id": submission.id,
+                    "subreddit": tracked.subreddit,
+                    "score": submission.score,
+                    "upvote_ratio": submission.upvote_ratio,
+                    "num_comments": submission.num_comments,
+                    "created_at": tracked.created_at,
+                    "tracked_at": checked_at
+                })
+
+        if rows:
+            AnalyticsStore(db).write(rows)
+            if settings.ANALYTICS_LEGACY_WRITES:
+                # AnalyticsService's post performance and subreddit analysis still read this table
+                db.bulk_insert_mappings(models.Analytics, rows)
+            changes = RollupService(db).apply([
+                {**row, "account_id": self.tracked[row["post_id"]].account_id}
+                for row in rows
+            ])
+            TrendIndexService(db).record_engagement(changes)
+            db.commit()
+            best_times_engine.observe(rows)
+
+            cache = get_response_cache()
+            for subreddit, account_id in {(row["subreddit"], self.tracked[row["post_id"]].account_id) for row in rows}:
+                await cache.invalidate(subreddit=subreddit, account_id=account_id)
+        return len(rows)
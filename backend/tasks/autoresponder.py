@@ -0,0 +1,16 @@
+from sqlalchemy.orm import Session
+from services.autoresponder_service import AutoresponderService
+from .inbox_stream import InboxStreamer
+
+class AutoresponderTasks:
+    def __init__(self):
+        self.streamer = InboxStreamer()
+
+    async def process_responses(self, db: Session) -> float:
+        """Process autoresponder rules"""
+        await AutoresponderService(db).process_pending_responses()
+        return 30  # Check every 30 seconds
+
+    async def stream_responses(self, db: Session) -> float:
+        """Poll due inbox and comment streams and queue new items for responses"""
+        return await self.streamer.step(db)
\ No newline at end of file
@@ -0,0 +1,330 @@
+import asyncio
+import time
+from collections import OrderedDict, defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import TYPE_CHECKING, Callable, Deque, Dict, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from config import get_settings
+from database import SessionLocal
+from services.autoresponder_engine import RuleMatcher, matcher_cache
+from services.stream_cursor_service import StreamCursor, StreamCursorService
+from utils.logger import app_logger
+from utils.reddit_clients import reddit_clients
+from .jobs import enqueue_reply, queue_mode
+from .publisher import client_bucket
+import models
+
+if TYPE_CHECKING:
+    import praw
+
+settings = get_settings()
+
+ITEM_TYPES = {"t1": "comment", "t4": "message"}
+
+def fetch_listing(reddit: "praw.Reddit", path: str, params: Dict) -> List[Dict]:
+    """Raw listing children, oldest first; runs on a stream worker thread"""
+    listing = reddit.request(method="GET", path=path, params=params)
+    return list(reversed(listing["data"]["children"]))
+
+def send_reply(reddit: "praw.Reddit", fullname: str, text: str):
+    """Reply to a comment or message; runs on a stream worker thread"""
+    reddit.request(method="POST", path="/api/comment", data={"thing_id": fullname, "text": text})
+
+def to_item(child: Dict) -> Dict:
+    """Listing child as the dict RuleMatcher and response templates read"""
+    data = child["data"]
+    return {
+        "fullname": data["name"],
+        "type": ITEM_TYPES.get(child["kind"]),
+        "subreddit": data.get("subreddit") or "",
+        "author": data.get("author") or "",
+        "subject": data.get("subject"),
+        "title": data.get("link_title"),
+        "body": data.get("body") or "",
+        "created_utc": data.get("created_utc")
+    }
+
+class BoundedSet:
+    """Set that forgets its oldest members beyond max_items"""
+
+    def __init__(self, max_items: int):
+        self.max_items = max_items
+        self.items: "OrderedDict[str, None]" = OrderedDict()
+
+    def __contains__(self, item: str) -> bool:
+        return item in self.items
+
+    def add(self, item: str):
+        self.items[item] = None
+        self.items.move_to_end(item)
+        if len(self.items) > self.max_items:
+            self.items.popitem(last=False)
+
+class Stream:
+    """One listing followed for an account.
+
+    ``before`` is the newest item fetched and is sent as the next request's
+    ``before`` parameter, so a poll only returns items not seen yet.
+    ``committed`` advances only once every older item has been handled and
+    is what gets persisted, so a restart never skips an item that was
+    fetched but not answered.
+    """
+
+    def __init__(self, account_id: int, name: str, path: str, cursor: Optional[StreamCursor]):
+        self.account_id = account_id
+        self.name = name
+        self.path = path
+        self.before = cursor.last_fullname if cursor else None
+        self.before_created = cursor.last_created_utc if cursor else None
+        self.committed: Tuple[Optional[str], Optional[float]] = (self.before, self.before_created)
+        self.saved = self.committed
+        self.seen = BoundedSet(1000)
+        self.pending: Deque[Tuple[str, Optional[float]]] = deque()
+        self.done = set()
+        self.interval = settings.STREAM_MIN_INTERVAL
+        self.next_poll = 0.0
+        self.empty_polls = 0
+
+    def complete(self, fullname: str):
+        """Mark an item handled and advance the committed mark past finished items"""
+        self.done.add(fullname)
+        while self.pending and self.pending[0][0] in self.done:
+            fullname, created_utc = self.pending.popleft()
+            self.done.discard(fullname)
+            self.committed = (fullname, created_utc)
+
+class InboxStreamer:
+    """Streams inbox and subreddit comments into the autoresponder.
+
+    Every account with active rules gets an inbox stream, plus one combined
+    comment stream over the subreddits its comment rules name. Streams are
+    polled from their high-water mark, every STREAM_MIN_INTERVAL seconds
+    while items keep arriving and backing off to STREAM_MAX_INTERVAL while
+    quiet. An item both streams of an account return is only answered by
+    whichever stream gets it first. New items go through a bounded queue to
+    response workers; when the queue is full polling waits, so a slow
+    engine throttles ingestion instead of buffering without limit.
+    """
+
+    def __init__(
+        self,
+        queue_size: int = None,
+        response_workers: int = None,
+        client_factory: Callable[[int, Dict], "praw.Reddit"] = reddit_clients.get
+    ):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size or settings.STREAM_QUEUE_SIZE)
+        self.response_workers = response_workers or settings.STREAM_RESPONSE_WORKERS
+        self.client_factory = client_factory
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.response_workers * 2,
+            thread_name_prefix="inbox-stream"
+        )
+        self.streams: Dict[Tuple[int, str], Stream] = {}
+        self.accounts: Dict[int, Dict] = {}
+        self.matchers: Dict[int, RuleMatcher] = {}
+        self.triggered: Dict[int, datetime] = {}
+        # Replies in a subreddit with comment rules arrive in both streams of an account
+        self.handled: Dict[int, BoundedSet] = {}
+        self.consumers: List[asyncio.Task] = []
+        self.next_refresh = 0.0
+
+    def _client(self, account_id: int) -> "praw.Reddit":
+        return self.client_factory(account_id, self.accounts[account_id])
+
+    async def step(self, db: Session) -> float:
+        """Poll every due stream once and return the seconds until the next is due"""
+        if not self.consumers:
+            self.consumers = [
+                asyncio.create_task(self._consume(), name=f"autoresponder-{index}")
+                for index in range(self.response_workers)
+            ]
+
+        now = time.monotonic()
+        if now >= self.next_refresh:
+            self._refresh(db)
+            self.next_refresh = now + settings.STREAM_REFRESH_INTERVAL
+        self._save_progress(db)
+
+        due = [stream for stream in self.streams.values() if stream.next_poll <= now]
+        await asyncio.gather(*(self._poll(stream) for stream in due))
+
+        if not self.streams:
+            return settings.STREAM_REFRESH_INTERVAL
+        next_poll = min(stream.next_poll for stream in self.streams.values())
+        return min(max(next_poll - time.monotonic(), 0), self.next_refresh - time.monotonic())
+
+    def _refresh(self, db: Session):
+        """Reload accounts and rules, and start or stop streams to match"""
+        rules_by_account = defaultdict(list)
+        for rule in db.query(models.Autoresponder).filter(models.Autoresponder.is_active == True):
+            rules_by_account[rule.account_id].append(rule)
+
+        accounts = {
+            account.id: account
+            for account in db.query(models.RedditAccount).filter(
+                models.RedditAccount.id.in_(list(rules_by_account)),
+                models.RedditAccount.is_active == True
+            )
+        }
+        cursors = StreamCursorService(db).load(accounts)
+        matcher_cache.retain(accounts)
+
+        wanted = {}
+        for account_id, account in accounts.items():
+            matcher = matcher_cache.get(account_id, rules_by_account[account_id])
+            self.matchers[account_id] = matcher
+
+            self.accounts[account_id] = {
+                "client_id": account.client_id,
+                "client_secret": account.client_secret,
+                "username": account.username
+            }
+
+            wanted[(account_id, "inbox")] = "/message/inbox"
+            # Comment rules without subreddits only see replies, which arrive in the inbox
+            subreddits = sorted({
+                subreddit for item_type, subreddit in matcher.by_scope
+                if item_type == "comment" and subreddit
+            })
+            if subreddits:
+                wanted[(account_id, "comments")] = f"/r/{'+'.join(subreddits)}/comments"
+
+        for key in list(self.streams):
+            if key not in wanted:
+                del self.streams[key]
+        for key, path in wanted.items():
+            stream = self.streams.get(key)
+            if stream is None:
+                self.streams[key] = Stream(key[0], key[1], path, cursors.get(key))
+            else:
+                stream.path = path
+
+        for account_id in list(self.accounts):
+            if account_id not in accounts:
+                self.accounts.pop(account_id)
+                self.matchers.pop(account_id, None)
+                self.handled.pop(account_id, None)
+
+    def _save_progress(self, db: Session):
+        """Persist moved high-water marks and rule trigger times"""
+        service = StreamCursorService(db)
+        changed = False
+        for stream in self.streams.values():
+            if stream.committed[0] and stream.committed != stream.saved:
+                service.save(stream.account_id, stream.name, *stream.committed)
+                stream.saved = stream.committed
+                changed = True
+
+        triggered, self.triggered = self.triggered, {}
+        for rule_id, triggered_at in triggered.items():
+            db.query(models.Autoresponder).filter(models.Autoresponder.id == rule_id).update(
+                {"last_triggered": triggered_at}, synchronize_session=False
+            )
+            changed = True
+
+        if changed:
+            db.commit()
+
+    async def _poll(self, stream: Stream):
+        loop = asyncio.get_running_loop()
+        first_run = stream.before is None
+        # A `before` item that was deleted makes Reddit return nothing forever
+        resync = not first_run and stream.empty_polls >= settings.STREAM_RESYNC_POLLS
+
+        limit = 1 if first_run else settings.STREAM_BATCH_SIZE
+        params = {"limit": limit, "raw_json": 1}
+        if not first_run and not resync:
+            params["before"] = stream.before
+
+        await client_bucket(self.accounts[stream.account_id]["client_id"]).acquire()
+        try:
+            children = await loop.run_in_executor(
+                self.executor, fetch_listing, self._client(stream.account_id), stream.path, params
+            )
+        except Exception as e:
+            app_logger.error("Failed to poll %s of account %s: %s", stream.name, stream.account_id, e)
+            stream.interval = settings.STREAM_MAX_INTERVAL
+            stream.next_poll = time.monotonic() + stream.interval
+            return
+
+        items = []
+        for child in children:
+            item = to_item(child)
+            if item["fullname"] in stream.seen:
+                continue
+            if resync and (item["created_utc"] or 0) <= (stream.before_created or 0):
+                continue
+            stream.seen.add(item["fullname"])
+            items.append(item)
+
+        if resync:
+            stream.empty_polls = 0
+
+        if first_run:
+            # Start from the newest item instead of answering old history
+            if items:
+                stream.before, stream.before_created = items[-1]["fullname"], items[-1]["created_utc"]
+                stream.committed = (stream.before, stream.before_created)
+            stream.next_poll = time.monotonic() + stream.interval
+            return
+
+        if items:
+            stream.before, stream.before_created = items[-1]["fullname"], items[-1]["created_utc"]
+            stream.empty_polls = 0
+            stream.interval = settings.STREAM_MIN_INTERVAL
+
+            username = self.accounts[stream.account_id]["username"].lower()
+            handled = self.handled.setdefault(stream.account_id, BoundedSet(2000))
+            for item in items:
+                stream.pending.append((item["fullname"], item["created_utc"]))
+                if item["type"] is None or item["author"].lower() == username or item["fullname"] in handled:
+                    stream.complete(item["fullname"])
+                    continue
+                handled.add(item["fullname"])
+                # Blocks while the response workers are behind
+                await self.queue.put((stream, item))
+        else:
+            stream.empty_polls += 1
+            stream.interval = min(stream.interval * 2, settings.STREAM_MAX_INTERVAL)
+
+        # A full page means more items are waiting right behind it
+        full_page = len(children) >= limit and not resync
+        stream.next_poll = time.monotonic() + (0 if full_page else stream.interval)
+
+    async def _consume(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            stream, item = await self.queue.get()
+            try:
+                matcher = self.matchers.get(stream.account_id)
+                match = matcher.match(item) if matcher else None
+                if match is not None and queue_mode():
+                    rule, reply = match
+                    enqueue_reply(stream.account_id, item["fullname"], reply, rule.id)
+                elif match is not None:
+                    rule, reply = match
+                    await client_bucket(self.accounts[stream.account_id]["client_id"]).acquire()
+                    await loop.run_in_executor(
+                        self.executor, send_reply, self._client(stream.account_id), item["fullname"], reply
+                    )
+                    self.triggered[rule.id] = datetime.utcnow()
+            except Exception as e:
+                app_logger.error("Failed to respond to %s: %s", item["fullname"], e)
+            finally:
+                stream.complete(item["fullname"])
+                self.queue.task_done()
+
+    async def shutdown(self):
+        """Stop the response workers and persist how far the streams got"""
+        for consumer in self.consumers:
+            consumer.cancel()
+        await asyncio.gather(*self.consumers, return_exceptions=True)
+        self.consumers = []
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+        db = SessionLocal()
+        try:
+            self._save_progress(db)
+        finally:
+            db.close()
\ No newline at end of file
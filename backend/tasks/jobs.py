@@ -0,0 +1,78 @@
+import time
+from datetime import datetime
+from typing import Dict, List
+from sqlalchemy.orm import Session
+from config import get_settings
+from database import SessionLocal
+from services.job_queue import JobQueue
+import models
+
+settings = get_settings()
+
+# Job kinds handled by tasks.worker
+PUBLISH_POST = "publish_post"
+AUTORESPONDER_REPLY = "autoresponder_reply"
+REFRESH_ANALYTICS = "refresh_analytics"
+COMPACT_ANALYTICS = "compact_analytics"
+PRUNE_TREND_INDEX = "prune_trend_index"
+PRUNE_JOBS = "prune_jobs"
+
+# Kinds enqueued once per interval (seconds) by whichever API process gets there first
+PERIODIC_JOBS: Dict[str, int] = {
+    REFRESH_ANALYTICS: settings.ANALYTICS_UPDATE_INTERVAL * 60,
+    COMPACT_ANALYTICS: settings.ANALYTICS_COMPACTION_INTERVAL * 60,
+    PRUNE_TREND_INDEX: 24 * 60 * 60,
+    PRUNE_JOBS: 60 * 60
+}
+
+def queue_mode() -> bool:
+    return settings.BACKGROUND_MODE == "queue"
+
+def enqueue_publish(db: Session, post_ids: List[int]) -> int:
+    """Queue due posts for publishing; a post gets one publish job per scheduled time"""
+    queue = JobQueue(db)
+    # Posts unscheduled since the timeline saw them, e.g. after a failed publish, are skipped
+    posts = db.query(models.Post.id, models.Post.scheduled_time).filter(
+        models.Post.id.in_(post_ids),
+        models.Post.is_posted == False,
+        models.Post.scheduled_time.isnot(None)
+    )
+    added = sum(
+        queue.enqueue(
+            PUBLISH_POST,
+            {"post_id": post_id},
+            # Rescheduling a post whose job failed gives it a new job
+            idempotency_key=f"{PUBLISH_POST}:{post_id}:{scheduled_time:%Y%m%dT%H%M%S}"
+        )
+        for post_id, scheduled_time in posts
+    )
+    db.commit()
+    return added
+
+def enqueue_reply(account_id: int, fullname: str, text: str, rule_id: int) -> bool:
+    """Queue an autoresponder reply; API processes streaming the same inbox queue it once"""
+    db = SessionLocal()
+    try:
+        added = JobQueue(db).enqueue(
+            AUTORESPONDER_REPLY,
+            {"account_id": account_id, "fullname": fullname, "text": text, "rule_id": rule_id},
+            idempotency_key=f"{AUTORESPONDER_REPLY}:{account_id}:{fullname}"
+        )
+        db.commit()
+        return added
+    finally:
+        db.close()
+
+def enqueue_periodic(db: Session) -> float:
+    """Queue the current slot of every periodic job and return the seconds until the next slot"""
+    now = time.time()
+    queue = JobQueue(db)
+    next_slot = None
+    for kind, interval in PERIODIC_JOBS.items():
+        slot = int(now // interval)
+        # Missed slots are not worth repeating, so periodic jobs never retry
+        queue.enqueue(kind, run_at=datetime.utcnow(), idempotency_key=f"{kind}:{slot}", max_attempts=1)
+        slot_end = (slot + 1) * interval
+        next_slot = slot_end if next_slot is None else min(next_slot, slot_end)
+    db.commit()
+    return max(next_slot - time.time(), 0)
\ No newline at end of file
@@ -0,0 +1,242 @@
+import asyncio
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+from sqlalchemy.orm import Session
+from config import get_settings
+from database import SessionLocal
+from services.publish_failure_service import PublishFailureService
+from utils.logger import app_logger
+from utils.cache import get_response_cache
+from utils.reddit_clients import reddit_clients
+from .timeline import post_timeline
+import models
+
+settings = get_settings()
+
+class TokenBucket:
+    """Token bucket refilled continuously at rate tokens per second"""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, tokens: int = 1):
+        """Wait until the bucket holds enough tokens, then take them"""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self.tokens) / self.rate)
+
+# Reddit's quota is per OAuth client, so every caller shares one bucket per client_id
+_client_buckets: Dict[str, TokenBucket] = {}
+
+def client_bucket(client_id: str) -> TokenBucket:
+    bucket = _client_buckets.get(client_id)
+    if bucket is None:
+        rate = settings.REDDIT_REQUESTS_PER_MINUTE / 60
+        bucket = TokenBucket(rate, settings.REDDIT_REQUESTS_PER_MINUTE)
+        _client_buckets[client_id] = bucket
+    return bucket
+
+def submit_post(job: Dict) -> str:
+    """Submit a single post to Reddit; runs on a publisher worker thread"""
+    reddit = reddit_clients.get(job["account_id"], job["credentials"])
+    subreddit = reddit.subreddit(job["subreddit"])
+
+    if job["media_url"]:
+        submission = subreddit.submit(
+            job["title"],
+            url=job["media_url"],
+            nsfw=job["is_nsfw"],
+            spoiler=job["is_spoiler"],
+            flair_text=job["flair"]
+        )
+    else:
+        submission = subreddit.submit(
+            job["title"],
+            selftext=job["content"] or "",
+            nsfw=job["is_nsfw"],
+            spoiler=job["is_spoiler"],
+            flair_text=job["flair"]
+        )
+    return submission.id
+
+class PublishPipeline:
+    """Publishes due posts with one ordered lane per account.
+
+    Each lane is a task of its own on a bounded thread pool, since PRAW is
+    blocking, with its own session; publish() hands posts to the lanes and
+    returns, so an account waiting on its token bucket holds up nobody
+    else. A post that fails is retried on its own after
+    PUBLISH_RETRY_DELAY and unscheduled once it has failed
+    PUBLISH_MAX_ATTEMPTS times; the attempts are kept in publish_failures
+    so restarts and timeline resyncs resume them. Each OAuth client gets a
+    token bucket sized to Reddit's per-client request quota, shared by
+    every account using it.
+    """
+
+    def __init__(self, max_workers: int = None):
+        self.max_workers = max_workers or settings.PUBLISH_WORKERS
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix="publisher"
+        )
+        self.retry_delay = timedelta(seconds=settings.PUBLISH_RETRY_DELAY)
+        self.lanes: Dict[int, asyncio.Task] = {}  # running lane by account id
+        self.pending: Dict[int, List[int]] = {}  # post ids waiting for their account's lane
+
+    def _load_lanes(self, db: Session, post_ids: List[int]) -> Dict[int, List[int]]:
+        rows = db.query(models.Post.id, models.Post.account_id).filter(
+            models.Post.id.in_(post_ids),
+            models.Post.is_posted == False
+        ).order_by(models.Post.scheduled_time, models.Post.id).all()
+
+        lanes = defaultdict(list)
+        for post_id, account_id in rows:
+            lanes[account_id].append(post_id)
+        return lanes
+
+    async def publish(self, db: Session, post_ids: List[int]):
+        """Hand the given posts to their account's lane without waiting for them to go out"""
+        if not post_ids:
+            return
+
+        for account_id, lane in self._load_lanes(db, post_ids).items():
+            self.pending.setdefault(account_id, []).extend(lane)
+            if account_id not in self.lanes:
+                self.lanes[account_id] = asyncio.create_task(
+                    self._run_lane(account_id), name=f"publish-lane-{account_id}"
+                )
+
+    async def _run_lane(self, account_id: int):
+        """Publish an account's posts until none are pending, then end the lane"""
+        try:
+            while True:
+                post_ids = self.pending.pop(account_id, None)
+                if not post_ids:
+                    return  # No await since the check, so publish() cannot slip posts in unseen
+                try:
+                    await self._publish_lane(account_id, post_ids)
+                except Exception:
+                    app_logger.exception("Publish lane of account %s failed", account_id)
+        finally:
+            self.lanes.pop(account_id, None)
+
+    async def drain(self, timeout: float):
+        """Wait for running lanes to finish, cancelling them after timeout"""
+        lanes = list(self.lanes.values())
+        if not lanes:
+            return
+        _, unfinished = await asyncio.wait(lanes, timeout=timeout)
+        for lane in unfinished:
+            lane.cancel()
+        if unfinished:
+            app_logger.warning("%d publish lanes did not drain in %ss", len(unfinished), timeout)
+
+    async def _publish_lane(self, account_id: int, post_ids: List[int]):
+        """Publish one account's posts in scheduled order on a session of the lane's own"""
+        db = SessionLocal()
+        try:
+            account = db.get(models.RedditAccount, account_id)
+            if account is None:
+                return
+            posts = db.query(models.Post).filter(
+                models.Post.id.in_(post_ids),
+                models.Post.is_posted == False
+            ).order_by(models.Post.scheduled_time, models.Post.id).all()
+
+            for post in posts:
+                try:
+                    await self._submit(db, account, post)
+                except Exception as e:
+                    db.rollback()
+                    await self._retry_or_give_up(db, post, str(e))
+        finally:
+            db.close()
+
+    async def _retry_or_give_up(self, db: Session, post: models.Post, error: str):
+        """Retry only the failed post later, or unschedule it after PUBLISH_MAX_ATTEMPTS"""
+        failures = PublishFailureService(db)
+        attempts = failures.attempts(post) + 1
+        if attempts < settings.PUBLISH_MAX_ATTEMPTS:
+            retry_at = datetime.utcnow() + self.retry_delay
+            app_logger.warning("Failed to publish post %s (attempt %d), retrying: %s", post.id, attempts, error)
+            failures.retry(post, attempts, error, retry_at)
+            await asyncio.to_thread(db.commit)
+            post_timeline.schedule(post.id, retry_at)
+            return
+
+        app_logger.error("Giving up on post %s after %d attempts: %s", post.id, attempts, error)
+        post_timeline.remove(post.id)
+        failures.record(post, attempts, error)
+        await asyncio.to_thread(db.commit)
+
+    async def _submit(
+        self,
+        db: Session,
+        account: models.RedditAccount,
+        post: models.Post,
+        before_submit: Optional[Callable[[], None]] = None
+    ):
+        """Submit one post and mark it published; raises if Reddit rejects it"""
+        job = {
+            "account_id": account.id,
+            "credentials": {
+                "client_id": account.client_id,
+                "client_secret": account.client_secret,
+                "username": account.username
+            },
+            "subreddit": post.subreddit,
+            "title": post.title,
+            "content": post.content,
+            "media_url": str(post.media_url) if post.media_url else None,
+            "is_nsfw": post.is_nsfw,
+            "is_spoiler": post.is_spoiler,
+            "flair": post.flair
+        }
+
+        await client_bucket(account.client_id).acquire()
+        if before_submit:
+            before_submit()
+        submission_id = await asyncio.get_running_loop().run_in_executor(self.executor, submit_post, job)
+
+        post.post_id = submission_id
+        post.is_posted = True
+
+        def commit_published():
+            PublishFailureService(db).clear(post.id)
+            db.commit()
+
+        # Off the event loop, so lanes never wait on each other's commits
+        await asyncio.to_thread(commit_published)
+        await get_response_cache().invalidate(subreddit=post.subreddit, account_id=post.account_id)
+
+    async def publish_one(self, db: Session, post_id: int, before_submit: Optional[Callable[[], None]] = None) -> bool:
+        """Publish a single post for the job queue, raising on failure.
+
+        before_submit runs right before the post is sent to Reddit; a failure
+        after it may have published the post anyway.
+        """
+        post = db.get(models.Post, post_id)
+        if post is None or post.is_posted:
+            return False
+        account = db.get(models.RedditAccount, post.account_id)
+        if account is None:
+            return False
+        await self._submit(db, account, post, before_submit)
+        return True
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -1,84 +1,64 @@
-from fastapi import BackgroundTasks
 from sqlalchemy.orm import Session
-from datetime import datetime
-import asyncio
-from services.scheduling_service import SchedulingService
-from services.analytics_service import AnalyticsService
+from datetime import datetime, timedelta
+from config import get_settings
+from utils.logger import app_logger
+from .timeline import post_timeline
+from .publisher import PublishPipeline
+from .analytics_refresh import AnalyticsRefresher
+from .jobs import enqueue_periodic, enqueue_publish, queue_mode
+from services.trend_index_service import TrendIndexService
+from services.analytics_store import AnalyticsStore
 
-class SchedulerTasks:
-    def __init__(self, db: Session):
-        self.db = db
-        self.scheduling_service = SchedulingService(db)
-        self.analytics_service = AnalyticsService(db)
+settings = get_settings()
 
-    async def process_scheduled_posts(self):
-        """Process posts that are due for publishing"""
-        while True:
-            try:
-                await self.scheduling_service.process_due_posts()
-            except Exception as e:
-                print(f"Error processing scheduled posts: {str(e)}")
-            
-            await asyncio.sleep(60)  # Check every minute
+class SchedulerTasks:
+    """Single iterations of the scheduling loops; each gets a fresh session"""
 
-    async def update_post_analytics(self):
-        """Update analytics for recent posts"""
-        while True:
-            try:
-                await self.analytics_service.update_recent_posts()
-            except Exception as e:
-                print(f"Error updating analytics: {str(e)}")
-            
-            await asyncio.sleep(300)  # Update every 5 minutes
+    def __init__(self):
+        self.timeline = post_timeline
+        self.publisher = PublishPipeline()
+        self.analytics_refresher = AnalyticsRefresher()
+        self.resync_interval = timedelta(minutes=settings.SCHEDULER_RESYNC_INTERVAL)
+        self.next_resync = datetime.utcnow()
 
-# /app/backend/tasks/autoresponder.py
-from fastapi import BackgroundTasks
-from sqlalchemy.orm import Session
-import asyncio
-from services.autoresponder_service import AutoresponderService
+    async def process_scheduled_posts(self, db: Session) -> float:
+        """Publish due posts and return the seconds until the next one is due"""
+        now = datetime.utcnow()
+        if now >= self.next_resync:
+            # Catch posts scheduled outside the API, e.g. by direct DB edits
+            self.timeline.load(db)
+            self.next_resync = now + self.resync_interval
 
-class AutoresponderTasks:
-    def __init__(self, db: Session):
-        self.db = db
-        self.autoresponder_service = AutoresponderService(db)
+        due = self.timeline.pop_due(now)
+        if due and queue_mode():
+            # Worker processes publish; other API processes enqueue the same ids harmlessly
+            enqueue_publish(db, due)
+        elif due:
+            await self.publisher.publish(db, due)
 
-    async def process_responses(self):
-        """Process autoresponder rules"""
-        while True:
-            try:
-                await self.autoresponder_service.process_pending_responses()
-            except Exception as e:
-                print(f"Error processing autoresponders: {str(e)}")
-            
-            await asyncio.sleep(30)  # Check every 30 seconds
+        wake_at = self.next_resync
+        next_due = self.timeline.next_due()
+        if next_due is not None and next_due < wake_at:
+            wake_at = next_due
+        return max((wake_at - datetime.utcnow()).total_seconds(), 0)
 
-# /app/backend/tasks/task_manager.py
-from fastapi import BackgroundTasks
-from sqlalchemy.orm import Session
-import asyncio
-from .scheduler import SchedulerTasks
-from .autoresponder import AutoresponderTasks
+    async def update_post_analytics(self, db: Session) -> float:
+        """Update analytics for recent posts"""
+        await self.analytics_refresher.refresh(db)
+        return settings.ANALYTICS_UPDATE_INTERVAL * 60
 
-class TaskManager:
-    def __init__(self, db: Session):
-        self.scheduler_tasks = SchedulerTasks(db)
-        self.autoresponder_tasks = AutoresponderTasks(db)
-        self.tasks = []
+    async def compact_analytics(self, db: Session) -> float:
+        """Downsample old analytics partitions and drop expired ones"""
+        counts = AnalyticsStore(db).compact()
+        if any(counts.values()):
+            app_logger.info("Compacted analytics partitions: %s", counts)
+        return settings.ANALYTICS_COMPACTION_INTERVAL * 60
 
-    async def start_all_tasks(self):
-        """Start all background tasks"""
-        self.tasks = [
-            asyncio.create_task(self.scheduler_tasks.process_scheduled_posts()),
-            asyncio.create_task(self.scheduler_tasks.update_post_analytics()),
-            asyncio.create_task(self.autoresponder_tasks.process_responses())
-        ]
-        
-        await asyncio.gather(*self.tasks)
+    async def enqueue_periodic_jobs(self, db: Session) -> float:
+        """Queue analytics and maintenance jobs for worker processes"""
+        return enqueue_periodic(db)
 
-    async def stop_all_tasks(self):
-        """Stop all background tasks"""
-        for task in self.tasks:
-            task.cancel()
-        
-        await asyncio.gather(*self.tasks, return_exceptions=True)
-        self.tasks = []
\ No newline at end of file
+    async def prune_trend_index(self, db: Session) -> float:
+        """Keep the trend vocabulary bounded"""
+        TrendIndexService(db).prune()
+        return 24 * 60 * 60
@@ -0,0 +1,177 @@
+import asyncio
+import time
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional
+from sqlalchemy.orm import Session
+from config import get_settings
+from database import SessionLocal
+from utils.logger import app_logger
+from utils.reddit_clients import reddit_clients
+from .scheduler import SchedulerTasks
+from .autoresponder import AutoresponderTasks
+from .jobs import queue_mode
+from .timeline import post_timeline
+
+settings = get_settings()
+
+class SupervisedWorker:
+    """Runs one background step in a loop under supervision.
+
+    Every iteration gets its own short-lived session, so no identity map
+    outlives a single run. A failing step is retried with exponential
+    backoff instead of killing the loop, and the worker keeps enough state
+    to report its health.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        step: Callable[[Session], Awaitable[float]],
+        wait: Optional[Callable[[float], Awaitable[None]]] = None,
+        backoff_base: float = 1.0,
+        backoff_max: float = 300.0
+    ):
+        self.name = name
+        self.step = step
+        self.wait = wait or asyncio.sleep
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.task: Optional[asyncio.Task] = None
+        self.stopping = asyncio.Event()
+
+        self.state = "idle"
+        self.runs = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.last_run_at: Optional[datetime] = None
+        self.last_duration: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    def start(self):
+        self.stopping.clear()
+        self.task = asyncio.create_task(self._run(), name=self.name)
+
+    async def _run(self):
+        while not self.stopping.is_set():
+            self.state = "running"
+            self.last_run_at = datetime.utcnow()
+            started = time.perf_counter()
+
+            db = SessionLocal()
+            try:
+                delay = await self.step(db)
+                self.consecutive_failures = 0
+                self.last_error = None
+            except Exception as e:
+                self.failures += 1
+                self.consecutive_failures += 1
+                self.last_error = str(e)
+                app_logger.exception("Background worker %s failed", self.name)
+                delay = min(self.backoff_base * 2 ** (self.consecutive_failures - 1), self.backoff_max)
+            finally:
+                db.close()
+                self.runs += 1
+                self.last_duration = time.perf_counter() - started
+
+            self.state = "backoff" if self.consecutive_failures else "sleeping"
+            await self._sleep(delay)
+
+        self.state = "stopped"
+
+    async def _sleep(self, delay: float):
+        """Sleep for delay seconds, or less if the worker is asked to stop"""
+        stop_waiter = asyncio.ensure_future(self.stopping.wait())
+        sleeper = asyncio.ensure_future(self.wait(delay))
+        try:
+            await asyncio.wait([stop_waiter, sleeper], return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            stop_waiter.cancel()
+            sleeper.cancel()
+
+    async def stop(self, timeout: float):
+        """Let the current iteration finish, cancelling it after timeout"""
+        if self.task is None:
+            return
+        self.stopping.set()
+        try:
+            await asyncio.wait_for(self.task, timeout=timeout)
+        except asyncio.TimeoutError:
+            app_logger.warning("Background worker %s did not drain in %ss", self.name, timeout)
+        except Exception:
+            pass
+        self.task = None
+        self.state = "stopped"
+
+    def health(self) -> Dict:
+        return {
+            "name": self.name,
+            "state": self.state,
+            "healthy": self.task is not None and not self.task.done() and self.consecutive_failures == 0,
+            "runs": self.runs,
+            "failures": self.failures,
+            "consecutive_failures": self.consecutive_failures,
+            "last_run_at": self.last_run_at.isoformat() if self.last_run_at else None,
+            "last_duration": self.last_duration,
+            "last_error": self.last_error
+        }
+
+class TaskManager:
+    def __init__(self, drain_timeout: float = 30.0):
+        if not queue_mode() and settings.WEB_CONCURRENCY > 1:
+            # Every process would keep its own timeline and publish the same posts
+            raise RuntimeError(
+                f"BACKGROUND_MODE=inprocess publishes from every API process, so WEB_CONCURRENCY="
+                f"{settings.WEB_CONCURRENCY} would publish posts more than once; set BACKGROUND_MODE=queue "
+                "and run `python -m tasks.worker`, or run a single API process"
+            )
+        self.scheduler_tasks = SchedulerTasks()
+        self.autoresponder_tasks = AutoresponderTasks()
+        self.drain_timeout = drain_timeout
+        self.workers: List[SupervisedWorker] = [
+            SupervisedWorker(
+                "scheduled_posts",
+                self.scheduler_tasks.process_scheduled_posts,
+                wait=post_timeline.wait
+            ),
+            SupervisedWorker("reddit_tokens", self.refresh_reddit_tokens)
+        ]
+        if queue_mode():
+            # Publishing, analytics, replies, inbox streams and periodic jobs run in
+            # `python -m tasks.worker` processes, the last two in just one of them
+            if settings.CACHE_BACKEND != "redis":
+                app_logger.warning(
+                    "BACKGROUND_MODE=queue without CACHE_BACKEND=redis: cache invalidations from workers "
+                    "never reach API processes, so responses stay stale until CACHE_TTL"
+                )
+        else:
+            self.workers.extend([
+                SupervisedWorker(
+                    "autoresponder",
+                    self.autoresponder_tasks.stream_responses
+                    if settings.AUTORESPONDER_MODE == "stream"
+                    else self.autoresponder_tasks.process_responses
+                ),
+                SupervisedWorker("post_analytics", self.scheduler_tasks.update_post_analytics),
+                SupervisedWorker("trend_index_prune", self.scheduler_tasks.prune_trend_index),
+                SupervisedWorker("analytics_compaction", self.scheduler_tasks.compact_analytics)
+            ])
+
+    async def refresh_reddit_tokens(self, db: Session) -> float:
+        """Renew OAuth tokens of cached Reddit clients before they expire"""
+        await asyncio.to_thread(reddit_clients.refresh_tokens)
+        return settings.REDDIT_TOKEN_CHECK_INTERVAL
+
+    async def start_all_tasks(self):
+        """Start all background workers without waiting on them"""
+        for worker in self.workers:
+            worker.start()
+
+    async def stop_all_tasks(self):
+        """Stop all background workers, letting in-flight iterations drain"""
+        await asyncio.gather(*(worker.stop(self.drain_timeout) for worker in self.workers))
+        await self.scheduler_tasks.publisher.drain(self.drain_timeout)
+        self.scheduler_tasks.publisher.shutdown()
+        await self.autoresponder_tasks.streamer.shutdown()
+
+    def health(self) -> List[Dict]:
+        return [worker.health() for worker in self.workers]
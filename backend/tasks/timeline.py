@@ -0,0 +1,93 @@
+import heapq
+import asyncio
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import and_, func
+from sqlalchemy.orm import Session
+from services.publish_failure_service import PublishFailure
+import models
+
+class PostTimeline:
+    """Min-heap of upcoming scheduled_time values for unpublished posts.
+
+    Entries are never removed from the heap in place; rescheduling or
+    deleting a post only updates ``_due_times`` and stale heap entries are
+    discarded lazily when they reach the top.
+    """
+
+    def __init__(self):
+        self._heap: List[Tuple[datetime, int]] = []
+        self._due_times: Dict[int, datetime] = {}
+        self._changed = asyncio.Event()
+
+    def __len__(self):
+        return len(self._due_times)
+
+    def load(self, db: Session):
+        """Rebuild the timeline from all unpublished scheduled posts, failed ones at their retry time"""
+        rows = db.query(
+            models.Post.id, func.coalesce(PublishFailure.retry_at, models.Post.scheduled_time)
+        ).outerjoin(
+            PublishFailure,
+            and_(PublishFailure.post_id == models.Post.id, PublishFailure.scheduled_time == models.Post.scheduled_time)
+        ).filter(
+            models.Post.is_posted == False,
+            models.Post.scheduled_time.isnot(None)
+        ).all()
+
+        self._due_times = {post_id: scheduled_time for post_id, scheduled_time in rows}
+        self._heap = [(scheduled_time, post_id) for post_id, scheduled_time in rows]
+        heapq.heapify(self._heap)
+        self._changed.set()
+
+    def schedule(self, post_id: int, scheduled_time: Optional[datetime]):
+        """Add or move a post; a missing scheduled_time removes it"""
+        if scheduled_time is None:
+            self.remove(post_id)
+            return
+
+        current = self.next_due()
+        self._due_times[post_id] = scheduled_time
+        heapq.heappush(self._heap, (scheduled_time, post_id))
+
+        # Only the head of the timeline decides how long the loop sleeps
+        if current is None or scheduled_time < current:
+            self._changed.set()
+
+    def remove(self, post_id: int):
+        """Forget a post that was deleted, published or unscheduled"""
+        if self._due_times.pop(post_id, None) is not None:
+            self._changed.set()
+
+    def next_due(self) -> Optional[datetime]:
+        """Earliest scheduled_time still on the timeline"""
+        self._discard_stale()
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: datetime) -> List[int]:
+        """Remove and return the ids of all posts due at or before now"""
+        # Changes from here on must cut the caller's next wait short
+        self._changed.clear()
+        due = []
+        while True:
+            self._discard_stale()
+            if not self._heap or self._heap[0][0] > now:
+                return due
+            _, post_id = heapq.heappop(self._heap)
+            del self._due_times[post_id]
+            due.append(post_id)
+
+    async def wait(self, timeout: Optional[float]):
+        """Sleep until timeout elapses or the timeline changes after pop_due"""
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def _discard_stale(self):
+        heap = self._heap
+        while heap and self._due_times.get(heap[0][1]) != heap[0][0]:
+            heapq.heappop(heap)
+
+# Shared by the scheduler loop and the routers that change scheduled posts
+post_timeline = PostTimeline()
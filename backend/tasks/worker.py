@@ -0,0 +1,316 @@
+import argparse
+import asyncio
+import multiprocessing
+import os
+import signal
+import socket
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional
+from sqlalchemy.orm import Session
+from config import get_settings
+from database import SessionLocal
+from services.job_queue import Job, JobQueue
+from services.publish_failure_service import PublishFailureService
+from utils.logger import app_logger
+from utils.reddit_clients import reddit_clients
+from .autoresponder import AutoresponderTasks
+from .inbox_stream import send_reply
+from .jobs import (
+    AUTORESPONDER_REPLY, COMPACT_ANALYTICS, PRUNE_JOBS, PRUNE_TREND_INDEX, PUBLISH_POST, REFRESH_ANALYTICS
+)
+from .publisher import client_bucket
+from .scheduler import SchedulerTasks
+from .task_manager import SupervisedWorker
+import models
+
+settings = get_settings()
+
+SUBMITTING = "submitting"
+
+# Leadership whose holder runs the inbox streams and periodic-job enqueuing for the deployment
+SINGLETONS = "singletons"
+
+class JobAbandoned(Exception):
+    """A job that must not be retried automatically"""
+
+class JobHandlers:
+    """What each job kind does; handlers raise to have the job retried"""
+
+    def __init__(self):
+        self.scheduler_tasks = SchedulerTasks()
+        self.registry: Dict[str, Callable[[Session, JobQueue, Job], Awaitable[None]]] = {
+            PUBLISH_POST: self.publish_post,
+            AUTORESPONDER_REPLY: self.send_autoresponder_reply,
+            REFRESH_ANALYTICS: self.refresh_analytics,
+            COMPACT_ANALYTICS: self.compact_analytics,
+            PRUNE_TREND_INDEX: self.prune_trend_index,
+            PRUNE_JOBS: self.prune_jobs
+        }
+        # Cleanup once a job of the kind has failed for good
+        self.on_failed: Dict[str, Callable[[Session, Job, str], None]] = {
+            PUBLISH_POST: self.publish_post_failed
+        }
+
+    def failed(self, db: Session, job: Job, error: str):
+        handler = self.on_failed.get(job.kind)
+        if handler is None:
+            return
+        try:
+            handler(db, job, error)
+        except Exception:
+            db.rollback()
+            app_logger.exception("Cleanup after job %s (%s) failed", job.id, job.kind)
+
+    async def publish_post(self, db: Session, queue: JobQueue, job: Job):
+        post_id = job.payload["post_id"]
+        if job.stage == SUBMITTING:
+            # The last attempt died mid-submit; the post may be live already
+            self._unschedule(db, post_id, job.attempts, "Needs reconciliation: Interrupted while submitting")
+            raise JobAbandoned("Interrupted while submitting; check Reddit before rescheduling")
+
+        submitting = False
+
+        def mark_submitting():
+            nonlocal submitting
+            queue.checkpoint(job, SUBMITTING)
+            submitting = True
+
+        try:
+            await self.scheduler_tasks.publisher.publish_one(db, post_id, before_submit=mark_submitting)
+        except Exception as e:
+            if not submitting:
+                raise  # Nothing reached Reddit, so a retry is safe
+            db.rollback()
+            self._unschedule(db, post_id, job.attempts, f"Needs reconciliation: {str(e)}")
+            raise JobAbandoned(f"Failed while submitting, check Reddit before rescheduling: {str(e)}") from e
+
+    def publish_post_failed(self, db: Session, job: Job, error: str):
+        if job.stage == SUBMITTING:
+            error = f"Needs reconciliation: {error}"
+        self._unschedule(db, job.payload["post_id"], job.attempts, error)
+
+    @staticmethod
+    def _unschedule(db: Session, post_id: int, attempts: int, error: str):
+        """Record a post's publish failure and unschedule it, so nothing publishes it again on its own"""
+        post = db.get(models.Post, post_id)
+        if post is None or post.is_posted:
+            return
+        PublishFailureService(db).record(post, attempts, error)
+        db.commit()
+
+    async def send_autoresponder_reply(self, db: Session, queue: JobQueue, job: Job):
+        payload = job.payload
+        account = db.get(models.RedditAccount, payload["account_id"])
+        if account is None or not account.is_active:
+            return
+        reddit = reddit_clients.get(account.id, {
+            "client_id": account.client_id,
+            "client_secret": account.client_secret,
+            "username": account.username
+        })
+        await client_bucket(account.client_id).acquire()
+        await asyncio.to_thread(send_reply, reddit, payload["fullname"], payload["text"])
+
+        db.query(models.Autoresponder).filter(models.Autoresponder.id == payload["rule_id"]).update(
+            {"last_triggered": datetime.utcnow()}, synchronize_session=False
+        )
+        db.commit()
+
+    async def refresh_analytics(self, db: Session, queue: JobQueue, job: Job):
+        await self.scheduler_tasks.update_post_analytics(db)
+
+    async def compact_analytics(self, db: Session, queue: JobQueue, job: Job):
+        await self.scheduler_tasks.compact_analytics(db)
+
+    async def prune_trend_index(self, db: Session, queue: JobQueue, job: Job):
+        await self.scheduler_tasks.prune_trend_index(db)
+
+    async def prune_jobs(self, db: Session, queue: JobQueue, job: Job):
+        queue.prune(timedelta(days=settings.JOB_RETENTION_DAYS))
+
+class JobWorker:
+    """Claims jobs and runs up to JOB_WORKER_CONCURRENCY of them at once in one process.
+
+    Leases of running jobs are renewed every third of JOB_LEASE_SECONDS,
+    so only a worker that died or hung loses its jobs to another one. The
+    one worker holding the SINGLETONS leadership also streams inboxes and
+    enqueues periodic jobs, so their polling does not grow with the number
+    of processes.
+    """
+
+    def __init__(self, name: str, kinds: Optional[List[str]] = None, concurrency: int = None):
+        self.name = name
+        self.handlers = JobHandlers()
+        self.kinds = kinds or list(self.handlers.registry)
+        self.concurrency = concurrency or settings.JOB_WORKER_CONCURRENCY
+        self.running: Dict[str, asyncio.Task] = {}  # by lease token
+        self.stopping: Optional[asyncio.Event] = None
+        self.leading = False
+        self.autoresponder_tasks = AutoresponderTasks()
+        self.singletons = [
+            SupervisedWorker(
+                "autoresponder",
+                self.autoresponder_tasks.stream_responses
+                if settings.AUTORESPONDER_MODE == "stream"
+                else self.autoresponder_tasks.process_responses
+            ),
+            SupervisedWorker("periodic_jobs", self.handlers.scheduler_tasks.enqueue_periodic_jobs)
+        ]
+
+    async def run(self):
+        self.stopping = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, self.stopping.set)
+
+        tokens = SupervisedWorker("reddit_tokens", self._refresh_reddit_tokens)
+        tokens.start()
+        leadership = SupervisedWorker("leadership", self._lead)
+        leadership.start()
+        heartbeat = asyncio.create_task(self._heartbeat())
+        app_logger.info("Job worker %s started for %s", self.name, ", ".join(self.kinds))
+        try:
+            while not self.stopping.is_set():
+                if self._claim() and len(self.running) < self.concurrency:
+                    continue  # A full batch suggests more is due right away
+
+                # Wait for a free slot, the next poll or shutdown
+                stop_waiter = asyncio.ensure_future(self.stopping.wait())
+                try:
+                    await asyncio.wait(
+                        [stop_waiter, *self.running.values()],
+                        timeout=settings.JOB_POLL_INTERVAL,
+                        return_when=asyncio.FIRST_COMPLETED
+                    )
+                finally:
+                    stop_waiter.cancel()
+        finally:
+            # Let running jobs finish; their leases keep being renewed until then
+            await asyncio.gather(*self.running.values(), return_exceptions=True)
+            heartbeat.cancel()
+            await leadership.stop(timeout=5)
+            await self._step_down()
+            await tokens.stop(timeout=5)
+            self.handlers.scheduler_tasks.publisher.shutdown()
+            await self.autoresponder_tasks.streamer.shutdown()
+            app_logger.info("Job worker %s stopped", self.name)
+
+    def _claim(self) -> int:
+        free = self.concurrency - len(self.running)
+        if free <= 0:
+            return 0
+        db = SessionLocal()
+        try:
+            queue = JobQueue(db)
+            for job in queue.reap(self.kinds):
+                app_logger.error("Job %s (%s) lost its worker on its last attempt", job.id, job.kind)
+                self.handlers.failed(db, job, f"Worker died on attempt {job.attempts}")
+            jobs = queue.claim(self.name, self.kinds, free)
+        finally:
+            db.close()
+        for job in jobs:
+            self.running[job.lease_token] = asyncio.create_task(self._run_job(job), name=f"job-{job.id}")
+        return len(jobs)
+
+    async def _run_job(self, job: Job):
+        db = SessionLocal()
+        queue = JobQueue(db)
+        try:
+            await self.handlers.registry[job.kind](db, queue, job)
+            queue.complete(job)
+        except Exception as e:
+            db.rollback()
+            app_logger.error("Job %s (%s) failed on attempt %d: %s", job.id, job.kind, job.attempts, e)
+            retry = not isinstance(e, JobAbandoned)  # abandoning handlers clean up themselves
+            if queue.fail(job, str(e), retry=retry) and retry and job.attempts >= job.max_attempts:
+                self.handlers.failed(db, job, str(e))
+        finally:
+            db.close()
+            self.running.pop(job.lease_token, None)
+
+    async def _heartbeat(self):
+        while True:
+            await asyncio.sleep(settings.JOB_LEASE_SECONDS / 3)
+            db = SessionLocal()
+            try:
+                JobQueue(db).extend(list(self.running))
+            except Exception as e:
+                app_logger.error("Failed to renew job leases of %s: %s", self.name, e)
+            finally:
+                db.close()
+
+    async def _lead(self, db: Session) -> float:
+        """Run the singleton loops while this process holds the leadership"""
+        try:
+            leading = JobQueue(db).lead(SINGLETONS, self.name)
+        except Exception:
+            await self._stop_singletons()  # Its lease may run out before the next try
+            raise
+        if leading and not self.leading:
+            app_logger.info("Job worker %s took over inbox streams and periodic jobs", self.name)
+            for worker in self.singletons:
+                worker.start()
+        elif not leading and self.leading:
+            app_logger.warning("Job worker %s lost leadership", self.name)
+            await self._stop_singletons()
+        self.leading = leading
+        return settings.JOB_LEASE_SECONDS / 3
+
+    async def _stop_singletons(self):
+        if self.leading:
+            await asyncio.gather(*(worker.stop(timeout=5) for worker in self.singletons))
+            self.leading = False
+
+    async def _step_down(self):
+        if not self.leading:
+            return
+        await self._stop_singletons()
+        db = SessionLocal()
+        try:
+            JobQueue(db).resign(SINGLETONS, self.name)
+        except Exception as e:
+            app_logger.error("Failed to resign leadership of %s: %s", self.name, e)
+        finally:
+            db.close()
+
+    async def _refresh_reddit_tokens(self, db: Session) -> float:
+        await asyncio.to_thread(reddit_clients.refresh_tokens)
+        return settings.REDDIT_TOKEN_CHECK_INTERVAL
+
+def run_process(kinds: Optional[List[str]]):
+    asyncio.run(JobWorker(f"{socket.gethostname()}:{os.getpid()}", kinds).run())
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run background job worker processes")
+    parser.add_argument("--processes", type=int, default=settings.JOB_WORKER_PROCESSES)
+    parser.add_argument("--kinds", nargs="*", help="Only claim these job kinds")
+    parser.add_argument("--status", action="store_true", help="Print job counts and exit")
+    args = parser.parse_args()
+
+    if args.status:
+        db = SessionLocal()
+        try:
+            for kind, counts in sorted(JobQueue(db).counts().items()):
+                print(kind, counts)
+        finally:
+            db.close()
+    elif args.processes <= 1:
+        run_process(args.kinds)
+    else:
+        context = multiprocessing.get_context("spawn")
+        processes = [
+            context.Process(target=run_process, args=(args.kinds,))
+            for _ in range(args.processes)
+        ]
+        for process in processes:
+            process.start()
+
+        def forward(signum, frame):
+            for process in processes:
+                if process.is_alive():
+                    os.kill(process.pid, signal.SIGTERM)
+
+        signal.signal(signal.SIGTERM, forward)
+        signal.signal(signal.SIGINT, forward)
+        for process in processes:
+            process.join()
\ No newline at end of file
@@ -0,0 +1,11 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Settings the app requires, and a database outside the source tree
+os.environ.setdefault("JWT_SECRET_KEY", "test-secret")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{Path(tempfile.mkdtemp()) / 'reddit_pulse_test.db'}")
+
+# Tests import backend modules the way the app does, e.g. `from config import get_settings`
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
\ No newline at end of file
@@ -0,0 +1,54 @@
+import asyncio
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+import pytest
+
+pytest.importorskip("models")
+analytics_refresh = pytest.importorskip("tasks.analytics_refresh")
+
+from tasks.analytics_refresh import INFO_BATCH_SIZE, AnalyticsRefresher, TrackedPost
+
+class FakeReddit:
+    """/api/info that knows only some posts, as after deletions"""
+
+    def __init__(self, known):
+        self.known = known
+        self.calls = []
+
+    def info(self, fullnames):
+        self.calls.append(list(fullnames))
+        return [self.known[name[3:]] for name in fullnames if name[3:] in self.known]
+
+def submission(post_id, score=1):
+    return SimpleNamespace(id=post_id, score=score, upvote_ratio=1.0, num_comments=0)
+
+@pytest.fixture
+def refresher(monkeypatch):
+    refresher = AnalyticsRefresher()
+    monkeypatch.setattr(refresher, "_sync_tracked", lambda db, now: None)
+    created = datetime.utcnow() - timedelta(hours=1)
+    for number in range(250):
+        post = TrackedPost(1, "python", created)
+        post.score, post.upvote_ratio, post.num_comments = 1, 1.0, 0
+        refresher.tracked[f"p{number}"] = post
+    return refresher
+
+def test_refresh_interval_decays_with_age(refresher):
+    base = refresher.base_interval
+    assert refresher.refresh_interval(timedelta(hours=1)) == base
+    assert refresher.refresh_interval(timedelta(days=2)) == base * 6
+    assert refresher.refresh_interval(timedelta(days=30)) == base * 288
+
+def test_missing_and_unchanged_posts_are_not_refetched_until_due(refresher, monkeypatch):
+    # Only even posts still exist, and none of them changed
+    reddit = FakeReddit({post_id: submission(post_id) for post_id in refresher.tracked if int(post_id[1:]) % 2 == 0})
+    monkeypatch.setattr(refresher, "_client", lambda: reddit)
+
+    assert asyncio.run(refresher.refresh(db=None)) == 0
+    assert [len(call) for call in reddit.calls] == [INFO_BATCH_SIZE, INFO_BATCH_SIZE, 50]
+    assert all(post.checked_at is not None for post in refresher.tracked.values())
+
+    # Nothing is due again within the interval, deleted posts included
+    assert refresher._due_fullnames(datetime.utcnow()) == []
+    later = datetime.utcnow() + refresher.base_interval
+    assert len(refresher._due_fullnames(later)) == 250
\ No newline at end of file
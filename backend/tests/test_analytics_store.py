@@ -0,0 +1,66 @@
+from datetime import datetime, timedelta
+import pytest
+
+models = pytest.importorskip("models")
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from services import analytics_store
+from services.analytics_store import AnalyticsStore
+
+NOW = datetime(2026, 6, 1, 12)
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    models.Base.metadata.create_all(engine, tables=[models.Analytics.__table__])
+    analytics_store.catalog.forget()
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    analytics_store.catalog.forget()
+    analytics_store.partition_metadata.clear()
+    engine.dispose()
+
+def snapshot(post_id, tracked_at, score=1):
+    return {
+        "post_id": post_id, "subreddit": "python", "score": score, "upvote_ratio": 1.0,
+        "num_comments": 0, "created_at": tracked_at, "tracked_at": tracked_at
+    }
+
+def test_writes_skip_schema_checks_once_partitions_are_known(db):
+    statements = []
+    event.listen(db.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+    store = AnalyticsStore(db)
+    for minute in range(50):
+        store.write([snapshot("a", NOW + timedelta(minutes=minute), score=minute)])
+    db.commit()
+
+    # One inspection and one CREATE for the day, then only inserts
+    schema = [sql for sql in statements if "sqlite_master" in sql or sql.lstrip().startswith(("CREATE", "PRAGMA"))]
+    assert len(schema) < 10
+    assert sum(sql.lstrip().startswith("INSERT") for sql in statements) == 50
+    assert [row["score"] for row in store.history("a")] == list(range(50))
+
+def test_compact_downsamples_and_expires(db):
+    store = AnalyticsStore(db)
+    store.write([snapshot("a", NOW - timedelta(days=3, minutes=minute), score=minute) for minute in range(0, 120, 10)])
+    store.write([snapshot("a", NOW - timedelta(days=400))])
+    db.commit()
+
+    counts = store.compact(now=NOW)
+    assert counts["hourly"] == 1 and counts["dropped"] == 1
+    assert store.partitions() == ["analytics_hourly_20260529"]
+    # 10:10-12:00 collapses to the last snapshot of hours 10, 11 and 12
+    assert [row["score"] for row in store.history("a")] == [70, 10, 0]
+
+def test_compact_prunes_legacy_rows_past_retention(db, monkeypatch):
+    monkeypatch.setattr(analytics_store.settings, "ANALYTICS_LEGACY_WRITES", True)
+    monkeypatch.setattr(analytics_store, "LEGACY_PRUNE_BATCH", 3)
+    db.bulk_insert_mappings(models.Analytics, [snapshot("a", NOW - timedelta(days=400, hours=hour)) for hour in range(7)])
+    db.bulk_insert_mappings(models.Analytics, [snapshot("a", NOW - timedelta(days=1))])
+    db.commit()
+
+    assert AnalyticsStore(db).compact(now=NOW)["legacy_deleted"] == 7
+    assert db.query(models.Analytics).count() == 1
\ No newline at end of file
@@ -0,0 +1,89 @@
+import asyncio
+import time
+from sqlalchemy import Column, Integer, MetaData, String, Table, event, insert, select
+from async_database import AsyncSessionLocal, async_engine, engine_options, get_async_db, run_sync_service
+from config import get_settings
+
+settings = get_settings()
+metadata = MetaData()
+notes = Table("load_test_notes", metadata, Column("id", Integer, primary_key=True), Column("body", String))
+
+CLIENTS = 200
+MAX_LOOP_LAG = 0.25  # seconds
+
+class NoteService:
+    """Stands in for a service still written against a sync Session"""
+    def __init__(self, db):
+        self.db = db
+
+    async def add(self, body: str) -> int:
+        self.db.execute(insert(notes).values(body=body))
+        await asyncio.sleep(0)
+        note_id = self.db.execute(select(notes.c.id).where(notes.c.body == body)).scalar_one()
+        self.db.commit()
+        return note_id
+
+def test_engine_options_size_only_queue_pools():
+    file_options = engine_options("sqlite+aiosqlite:///./pulse.db")
+    assert file_options["pool_size"] == settings.DB_POOL_SIZE
+    assert file_options["max_overflow"] == settings.DB_MAX_OVERFLOW
+    assert engine_options("sqlite+aiosqlite://") == {"pool_pre_ping": True}
+
+def test_run_sync_service_uses_the_request_session():
+    async def scenario():
+        async with async_engine.begin() as conn:
+            await conn.run_sync(metadata.create_all)
+        async with AsyncSessionLocal() as db:
+            note_id = await run_sync_service(db, lambda session: NoteService(session).add("single"))
+            assert (await db.execute(select(notes.c.body).where(notes.c.id == note_id))).scalar_one() == "single"
+
+    asyncio.run(scenario())
+
+def test_200_concurrent_clients_share_the_pool_without_blocking_the_loop():
+    checked_out = {"now": 0, "peak": 0, "total": 0}
+
+    def on_checkout(*args):
+        checked_out["now"] += 1
+        checked_out["total"] += 1
+        checked_out["peak"] = max(checked_out["peak"], checked_out["now"])
+
+    def on_checkin(*args):
+        checked_out["now"] -= 1
+
+    async def client(number: int) -> int:
+        # what FastAPI does with the single session dependency of a mutating endpoint
+        sessions = get_async_db()
+        db = await sessions.__anext__()
+        try:
+            return await run_sync_service(db, lambda session: NoteService(session).add(f"client-{number}"))
+        finally:
+            await sessions.aclose()
+
+    async def heartbeat(stop: asyncio.Event, lags: list):
+        while not stop.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(0.01)
+            lags.append(time.perf_counter() - started - 0.01)
+
+    async def scenario():
+        async with async_engine.begin() as conn:
+            await conn.run_sync(metadata.create_all)
+        await async_engine.dispose()
+        event.listen(async_engine.sync_engine, "checkout", on_checkout)
+        event.listen(async_engine.sync_engine, "checkin", on_checkin)
+        stop, lags = asyncio.Event(), []
+        beat = asyncio.create_task(heartbeat(stop, lags))
+        try:
+            ids = await asyncio.gather(*(client(number) for number in range(CLIENTS)))
+        finally:
+            stop.set()
+            await beat
+            event.remove(async_engine.sync_engine, "checkout", on_checkout)
+            event.remove(async_engine.sync_engine, "checkin", on_checkin)
+        return ids, lags
+
+    ids, lags = asyncio.run(scenario())
+    assert len(set(ids)) == CLIENTS
+    assert checked_out["total"] == CLIENTS  # one connection per request, not one sync and one async
+    assert checked_out["peak"] <= settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW
+    assert max(lags) < MAX_LOOP_LAG, f"event loop stalled for {max(lags):.3f}s"
\ No newline at end of file
@@ -0,0 +1,83 @@
+import random
+import time
+from types import SimpleNamespace
+from services.autoresponder_engine import MatcherCache, RuleMatcher
+
+def rule(rule_id, type="message", template="reply {author}", is_active=True, **conditions):
+    return SimpleNamespace(
+        id=rule_id, account_id=1, type=type, template=template, conditions=conditions, is_active=is_active
+    )
+
+def item(body, type="message", author="alice", subreddit=None, subject=None):
+    return {"type": type, "author": author, "subreddit": subreddit, "subject": subject, "body": body}
+
+def test_first_matching_rule_in_id_order_wins():
+    matcher = RuleMatcher([
+        rule(3, keywords=["price"], template="third"),
+        rule(2, keywords=["how much", "price"], exclude_keywords=["refund"], template="second"),
+        rule(1, keywords=["shipping"], authors=["bob"], template="first"),
+    ])
+    assert matcher.match(item("what is the price?"))[1] == "second"
+    assert matcher.match(item("How much does it cost"))[1] == "second"
+    # Excluded from rule 2, so rule 3 answers
+    assert matcher.match(item("price of a refund"))[1] == "third"
+    assert matcher.match(item("shipping?")) is None
+    assert matcher.match(item("shipping?", author="Bob"))[1] == "first"
+
+def test_subreddit_regex_and_template_fields():
+    matcher = RuleMatcher([
+        rule(1, type="comment", subreddits=["Python"], regex=r"\bpip\b", template="Hi {author}, see {missing}"),
+    ])
+    assert matcher.match(item("use pip", type="comment", subreddit="rust")) is None
+    assert matcher.match(item("use pipx", type="comment", subreddit="python")) is None
+    compiled, reply = matcher.match(item("use pip", type="comment", subreddit="python"))
+    assert (compiled.id, reply) == (1, "Hi alice, see {missing}")
+
+def test_cache_rebuilds_on_changed_rules_and_drops_idle_accounts():
+    cache = MatcherCache()
+    rules = [rule(1, keywords=["price"])]
+    first = cache.get(1, rules)
+    assert cache.get(1, rules) is first
+    rules[0].template = "changed"
+    assert cache.get(1, rules) is not first
+    cache.get(2, rules)
+    cache.retain([2])
+    assert list(cache.matchers) == [2]
+
+def test_10k_messages_against_1k_rules():
+    rng = random.Random(3)
+    vocabulary = [f"word{number}" for number in range(20_000)]
+    subreddits = [f"sub{number}" for number in range(50)]
+    rules = []
+    for rule_id in range(1, 1001):
+        kind = rule_id % 4
+        conditions = {"keywords": rng.sample(vocabulary, 3) + [" ".join(rng.sample(vocabulary, 2))]}
+        if kind == 1:
+            conditions["subreddits"] = rng.sample(subreddits, 2)
+        elif kind == 2:
+            conditions["exclude_keywords"] = rng.sample(vocabulary, 2)
+        elif kind == 3:
+            conditions["regex"] = rf"\b{rng.choice(vocabulary)}\b"
+        rules.append(rule(rule_id, type=rng.choice(["message", "comment"]), **conditions))
+
+    messages = [
+        item(
+            " ".join(rng.choices(vocabulary, k=30)),
+            type=rng.choice(["message", "comment"]),
+            author=f"user{rng.randrange(1000)}",
+            subreddit=rng.choice(subreddits),
+            subject="Re: question"
+        )
+        for _ in range(10_000)
+    ]
+
+    started = time.perf_counter()
+    matcher = RuleMatcher(rules)
+    compiled = time.perf_counter() - started
+    started = time.perf_counter()
+    matched = sum(matcher.match(message) is not None for message in messages)
+    elapsed = time.perf_counter() - started
+
+    assert matched > 0
+    assert compiled < 0.5, f"compiling 1k rules took {compiled:.2f}s"
+    assert elapsed < 1.0, f"10k messages took {elapsed:.2f}s"
\ No newline at end of file
@@ -0,0 +1,98 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+import pytest
+
+np = pytest.importorskip("numpy")
+models = pytest.importorskip("models")
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from services import analytics_store
+from services.analytics_store import AnalyticsStore
+from services.best_times_service import BestTimesEngine, EngagementMatrix
+
+MONDAY = datetime(2026, 6, 1)  # a Monday
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    analytics_store.catalog.forget()
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    analytics_store.catalog.forget()
+    analytics_store.partition_metadata.clear()
+    engine.dispose()
+
+def snapshot(created_at, tracked_at, score, subreddit="python"):
+    return {
+        "post_id": f"{created_at:%d%H}", "subreddit": subreddit, "score": score, "upvote_ratio": 1.0,
+        "num_comments": 0, "created_at": created_at, "tracked_at": tracked_at
+    }
+
+def anchor(moment: datetime) -> float:
+    return (moment - datetime(1970, 1, 1)).total_seconds()
+
+def test_loads_every_snapshot_from_the_store(db):
+    rows = []
+    for week in range(3):
+        for hour in (9, 10, 11):
+            created = MONDAY - timedelta(weeks=week) + timedelta(hours=hour)
+            # Two snapshots per post; posts made at 10:00 do best
+            rows.append(snapshot(created, created + timedelta(hours=1), 10))
+            rows.append(snapshot(created, created + timedelta(hours=6), 500 if hour == 10 else 50))
+    AnalyticsStore(db).write(rows)
+    db.commit()
+
+    engine = BestTimesEngine("UTC")
+    matrix = engine._load(db, "python", anchor(MONDAY + timedelta(days=1)))
+    assert int(matrix.count.sum()) == len(rows)
+    assert int(matrix.count[10]) == 6
+
+    engine._remember("python", matrix)
+    best = asyncio.run(engine.get_best_times(None, "python", limit=1))
+    assert (best[0]["weekday"], best[0]["hour"], best[0]["samples"]) == ("Monday", 10, 6)
+
+def test_observe_folds_new_snapshots_into_loaded_subreddits_only():
+    engine = BestTimesEngine("UTC")
+    engine._remember("python", EngagementMatrix(anchor(MONDAY)))
+    created = MONDAY + timedelta(hours=10)
+    engine.observe([snapshot(created, created, 5), snapshot(created, created, 5, subreddit="rust")])
+    assert int(engine.matrices["python"].count[10]) == 1
+    assert "rust" not in engine.matrices
+
+def test_loaded_matrices_are_bounded():
+    engine = BestTimesEngine("UTC", max_subreddits=2)
+    for subreddit in ("a", "b"):
+        engine._remember(subreddit, EngagementMatrix(anchor(MONDAY)))
+    # Querying "a" makes "b" the least recently used
+    asyncio.run(engine.get_best_times(None, "a"))
+    engine._remember("c", EngagementMatrix(anchor(MONDAY)))
+    assert list(engine.matrices) == ["a", "c"]
+
+def test_answers_in_milliseconds_for_a_million_snapshots():
+    rows = 1_000_000
+    rng = np.random.default_rng(7)
+    start = np.datetime64("2026-01-01T00:00:00")
+    created = start + rng.integers(0, 150 * 86400, rows).astype("timedelta64[s]")
+    tracked = created + rng.integers(3600, 7 * 86400, rows).astype("timedelta64[s]")
+    scores = rng.poisson(40, rows)
+    comments = rng.poisson(5, rows)
+
+    engine = BestTimesEngine("America/New_York")
+    matrix = EngagementMatrix(anchor(datetime(2026, 6, 1)))
+    started = time.perf_counter()
+    engine._add(matrix, created, tracked, scores, comments)
+    load = time.perf_counter() - started
+    engine._remember("python", matrix)
+
+    timings = []
+    for _ in range(20):
+        started = time.perf_counter()
+        best = asyncio.run(engine.get_best_times(None, "python"))
+        timings.append(time.perf_counter() - started)
+
+    assert int(matrix.count.sum()) == rows and len(best) == 5
+    assert load < 3, f"binning 1M snapshots took {load:.2f}s"
+    assert min(timings) < 0.005, f"best times took {min(timings) * 1000:.2f} ms"
\ No newline at end of file
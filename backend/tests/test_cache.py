@@ -0,0 +1,126 @@
+import asyncio
+import pytest
+
+pytest.importorskip("fastapi")
+
+from utils.cache import MemoryBackend, RedisBackend, ResponseCache
+
+class FakeRedis:
+    """The redis.asyncio calls RedisBackend makes, on a clock the test moves"""
+    def __init__(self):
+        self.now = 0.0
+        self.data = {}
+        self.round_trips = 0
+
+    def _get(self, key):
+        value, expires_at = self.data.get(key, (None, None))
+        if expires_at is not None and expires_at <= self.now:
+            del self.data[key]
+            return None
+        return value
+
+    async def mget(self, keys):
+        self.round_trips += 1
+        return [self._get(key) for key in keys]
+
+    async def set(self, key, value, ex=None):
+        self.round_trips += 1
+        self.data[key] = (value, self.now + ex if ex else None)
+
+    async def incr(self, key):
+        self.round_trips += 1
+        value = int(self._get(key) or 0) + 1
+        self.data[key] = (str(value).encode(), None)
+        return value
+
+    async def delete(self, key):
+        self.round_trips += 1
+        self.data.pop(key, None)
+
+    async def scan_iter(self, match):
+        for key in list(self.data):
+            if key.startswith(match.rstrip("*")):
+                yield key
+
+class Computation:
+    def __init__(self):
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        return {"value": self.calls}
+
+def test_entries_expire_after_the_ttl():
+    redis = FakeRedis()
+    cache = ResponseCache(RedisBackend(redis), ttl=300)
+    compute = Computation()
+
+    async def scenario():
+        assert await cache.get_or_compute("trends", compute, subreddit="python") == {"value": 1}
+        redis.now = 299
+        assert await cache.get_or_compute("trends", compute, subreddit="python") == {"value": 1}
+        redis.now = 301
+        assert await cache.get_or_compute("trends", compute, subreddit="python") == {"value": 2}
+
+    asyncio.run(scenario())
+    assert (cache.hits, cache.misses) == (1, 2)
+
+@pytest.mark.parametrize("make_backend", [lambda: RedisBackend(FakeRedis()), lambda: MemoryBackend(100, 1 << 20)])
+def test_invalidating_a_tag_drops_only_its_entries(make_backend):
+    cache = ResponseCache(make_backend(), ttl=300)
+    python, rust = Computation(), Computation()
+
+    async def scenario():
+        await cache.get_or_compute("subreddit", python, subreddit="Python", account_id=1, timeframe="7d")
+        await cache.get_or_compute("subreddit", rust, subreddit="rust", account_id=2, timeframe="7d")
+
+        await cache.invalidate(subreddit="python")  # tags ignore case
+        await cache.get_or_compute("subreddit", python, subreddit="Python", account_id=1, timeframe="7d")
+        await cache.get_or_compute("subreddit", rust, subreddit="rust", account_id=2, timeframe="7d")
+        assert (python.calls, rust.calls) == (2, 1)
+
+        await cache.invalidate(account_id=2)
+        await cache.get_or_compute("subreddit", rust, subreddit="rust", account_id=2, timeframe="7d")
+        assert rust.calls == 2
+
+    asyncio.run(scenario())
+
+def test_invalidation_during_a_computation_is_not_lost():
+    cache = ResponseCache(RedisBackend(FakeRedis()), ttl=300)
+    calls = []
+
+    async def compute():
+        calls.append(len(calls))
+        if len(calls) == 1:
+            await cache.invalidate(subreddit="python")  # new analytics land meanwhile
+        return len(calls)
+
+    async def scenario():
+        assert await cache.get_or_compute("trends", compute, subreddit="python") == 1
+        assert await cache.get_or_compute("trends", compute, subreddit="python") == 2
+
+    asyncio.run(scenario())
+
+def test_a_hit_is_one_round_trip():
+    redis = FakeRedis()
+    cache = ResponseCache(RedisBackend(redis), ttl=300)
+
+    async def scenario():
+        await cache.get_or_compute("subreddit", Computation(), subreddit="python", account_id=1)
+        redis.round_trips = 0
+        await cache.get_or_compute("subreddit", Computation(), subreddit="python", account_id=1)
+
+    asyncio.run(scenario())
+    assert redis.round_trips == 1
+
+def test_memory_backend_stays_within_its_bounds():
+    backend = MemoryBackend(max_entries=2, max_bytes=1 << 20)
+    cache = ResponseCache(backend, ttl=300)
+
+    async def scenario():
+        for subreddit in ("a", "b", "c"):
+            await cache.get_or_compute("trends", Computation(), subreddit=subreddit)
+
+    asyncio.run(scenario())
+    assert cache.stats()["entries"] == 2
+    assert cache.stats()["evictions"] == 1
\ No newline at end of file
@@ -0,0 +1,69 @@
+import asyncio
+from datetime import datetime
+import pytest
+
+models = pytest.importorskip("models")
+import_service = pytest.importorskip("services.import_service")
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+from services.import_service import ImportFailure, ImportJob, ImportService, parse_timezone, row_to_post, validate_row
+
+NOW = datetime(2026, 3, 1, 12)
+
+def row(**fields):
+    return {"title": "Hello", "subreddit": "python", **fields}
+
+@pytest.mark.parametrize("value", ["nan", "inf", "-Infinity", "ten"])
+def test_non_finite_numbers_are_rejected(value):
+    assert validate_row(row(auto_delete_hours=value), NOW) == ["Auto delete hours must be a number"]
+
+def test_naive_times_are_read_in_the_uploaders_timezone():
+    zone = parse_timezone("America/New_York")
+    post = row_to_post(row(scheduled_time="2026-03-02 09:00"), 1, zone)
+    assert post.scheduled_time == datetime(2026, 3, 2, 14)
+    # An explicit offset wins over the zone
+    post = row_to_post(row(scheduled_time="2026-03-02T09:00+01:00"), 1, zone)
+    assert post.scheduled_time == datetime(2026, 3, 2, 8)
+    # 07:30 is past in UTC but still ahead in New York, where it is 12:30 UTC
+    assert validate_row(row(scheduled_time="2026-03-01 07:30"), NOW) == ["Scheduled time must be in the future"]
+    assert validate_row(row(scheduled_time="2026-03-01 07:30"), NOW, zone) == []
+    assert validate_row(row(scheduled_time="2026-03-01 06:30"), NOW, zone) == ["Scheduled time must be in the future"]
+
+def test_unknown_timezone_is_rejected():
+    with pytest.raises(ValueError):
+        parse_timezone("Mars/Olympus_Mons")
+
+def test_error_report_is_served_from_the_database(monkeypatch):
+    async def scenario():
+        engine = create_async_engine(
+            "sqlite+aiosqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+        )
+        async with engine.begin() as conn:
+            await conn.run_sync(lambda sync: models.Base.metadata.create_all(
+                sync, tables=[ImportJob.__table__, ImportFailure.__table__]
+            ))
+        monkeypatch.setattr(import_service, "AsyncSessionLocal", async_sessionmaker(engine, expire_on_commit=False))
+        monkeypatch.setattr(import_service, "REPORT_BATCH", 2)
+
+        service = ImportService()
+        job = ImportJob(id="job", account_id=1, filename="posts.csv", status="running", created_at=NOW)
+        await service._save(job)
+        await service._save_failures(job, [(index, row(title=f"post {index}"), ["Title is required"]) for index in range(5)])
+
+        # Another process answers from the same database
+        report = "".join([chunk async for chunk in ImportService().iter_report("job")])
+
+        job.finished_at = datetime(2020, 1, 1)
+        await service._save(job)
+        await service._prune()
+        async with import_service.AsyncSessionLocal() as db:
+            remaining = (await db.get(ImportJob, "job"), len((await db.scalars(import_service.select(ImportFailure))).all()))
+        await engine.dispose()
+        return report, remaining
+
+    report, remaining = asyncio.run(scenario())
+    lines = report.splitlines()
+    assert lines[0] == "row,title,errors"
+    assert lines[1:] == [f"{index + 2},post {index},Title is required" for index in range(5)]
+    assert remaining == (None, 0)
\ No newline at end of file
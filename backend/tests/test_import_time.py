@@ -0,0 +1,44 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+import pytest
+
+pytest.importorskip("fastapi")
+
+from config import get_settings
+
+BACKEND = Path(__file__).resolve().parent.parent
+
+# Modules main must leave to first use: PRAW and NumPy are slow to import, migrate pulls in every table
+DEFERRED_MODULES = ("praw", "prawcore", "numpy", "migrate")
+
+def import_times(module: str) -> dict:
+    """Cumulative import time in microseconds of every module `import module` loads"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND,
+        env=dict(os.environ, AUTO_MIGRATE="false"),
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        if cumulative.isdigit():
+            times[name] = int(cumulative)
+    return times
+
+def test_main_defers_heavy_imports():
+    times = import_times("main")
+    assert "main" in times
+    loaded = [module for module in DEFERRED_MODULES if module in times]
+    assert not loaded, f"imported at startup: {', '.join(loaded)}"
+
+def test_main_imports_within_startup_budget():
+    times = import_times("main")
+    budget = get_settings().STARTUP_BUDGET_SECONDS * 1_000_000
+    assert times["main"] < budget, f"importing main took {times['main'] / 1_000_000:.2f}s"
\ No newline at end of file
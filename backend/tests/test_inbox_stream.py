@@ -0,0 +1,142 @@
+import asyncio
+import pytest
+
+models = pytest.importorskip("models")
+inbox_stream = pytest.importorskip("tasks.inbox_stream")
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from services.stream_cursor_service import StreamCursor
+from tasks.inbox_stream import InboxStreamer
+
+INBOX = "/message/inbox"
+COMMENTS = "/r/python/comments"
+
+class FakeReddit:
+    """In-memory Reddit listings that honour limit and before like the real API"""
+
+    def __init__(self):
+        self.listings = {INBOX: [], COMMENTS: []}  # oldest first
+        self.created = 1_700_000_000.0
+        self.replies = []
+        self.deleted = set()
+
+    def post(self, kind, body, paths, author="alice"):
+        self.created += 1
+        child = {"kind": kind, "data": {
+            "name": f"{kind}_{len(self.replies)}{int(self.created)}", "subreddit": "python",
+            "author": author, "body": body, "created_utc": self.created
+        }}
+        for path in paths:
+            self.listings[path].append(child)
+        return child["data"]["name"]
+
+    def request(self, method, path, params=None, data=None):
+        if method == "POST":
+            self.replies.append((data["thing_id"], data["text"]))
+            return {}
+        children = [child for child in self.listings[path] if child["data"]["name"] not in self.deleted]
+        names = [child["data"]["name"] for child in children]
+        before = params.get("before")
+        if before is not None:
+            if before not in names:
+                # Reddit answers an unknown before with an empty page
+                return {"data": {"children": []}}
+            children = children[names.index(before) + 1:][:params["limit"]]
+        else:
+            children = children[-params["limit"]:]
+        return {"data": {"children": list(reversed(children))}}
+
+@pytest.fixture
+def sessions(monkeypatch):
+    for name in ("STREAM_MIN_INTERVAL", "STREAM_MAX_INTERVAL", "STREAM_REFRESH_INTERVAL"):
+        monkeypatch.setattr(inbox_stream.settings, name, 0)
+    monkeypatch.setattr(inbox_stream.settings, "STREAM_RESYNC_POLLS", 2)
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    models.Base.metadata.create_all(engine, tables=[
+        models.RedditAccount.__table__, models.Autoresponder.__table__, StreamCursor.__table__
+    ])
+    Session = sessionmaker(bind=engine)
+    db = Session()
+    db.add(models.RedditAccount(id=1, username="bot", client_id="stream-test", client_secret="s", is_active=True))
+    db.add(models.Autoresponder(
+        id=1, account_id=1, type="comment", template="Hi {author}", is_active=True,
+        conditions={"subreddits": ["python"], "keywords": ["help"]}
+    ))
+    db.add(models.Autoresponder(
+        id=2, account_id=1, type="message", template="Got it", is_active=True, conditions={"keywords": ["help"]}
+    ))
+    db.commit()
+    db.close()
+    yield Session
+    engine.dispose()
+
+async def poll(streamer, Session, polls=1):
+    db = Session()
+    try:
+        for _ in range(polls):
+            await streamer.step(db)
+            await streamer.queue.join()
+        # step() persists marks before polling; save what this round handled
+        streamer._save_progress(db)
+    finally:
+        db.close()
+
+def marks(Session):
+    db = Session()
+    try:
+        return {cursor.stream: cursor.last_fullname for cursor in db.query(StreamCursor)}
+    finally:
+        db.close()
+
+def test_streams_resume_from_saved_marks_and_answer_each_item_once(sessions, monkeypatch):
+    monkeypatch.setattr(inbox_stream, "SessionLocal", sessions)
+    reddit = FakeReddit()
+    old = reddit.post("t4", "help with something old", [INBOX])
+    old_comment = reddit.post("t1", "old help", [COMMENTS])
+
+    async def scenario():
+        streamer = InboxStreamer(response_workers=2, client_factory=lambda account_id, credentials: reddit)
+        # The first poll only sets the high-water marks; history is never answered
+        await poll(streamer, sessions)
+        assert reddit.replies == []
+        assert marks(sessions) == {"inbox": old, "comments": old_comment}
+
+        # A reply to the bot in r/python arrives in both the inbox and the comment stream
+        message = reddit.post("t4", "please help", [INBOX])
+        both = reddit.post("t1", "help me", [INBOX, COMMENTS])
+        own = reddit.post("t1", "help from the bot", [COMMENTS], author="Bot")
+        await poll(streamer, sessions)
+        assert sorted(reddit.replies) == sorted([(message, "Got it"), (both, "Hi alice")])
+        assert marks(sessions) == {"inbox": both, "comments": own}
+        await streamer.shutdown()
+
+        # A restarted streamer picks up after the saved marks
+        later = reddit.post("t4", "help again", [INBOX])
+        restarted = InboxStreamer(response_workers=2, client_factory=lambda account_id, credentials: reddit)
+        await poll(restarted, sessions)
+        assert reddit.replies[2:] == [(later, "Got it")]
+        assert marks(sessions)["inbox"] == later
+        await restarted.shutdown()
+
+    asyncio.run(scenario())
+
+def test_deleted_mark_resyncs_without_replaying_history(sessions, monkeypatch):
+    monkeypatch.setattr(inbox_stream, "SessionLocal", sessions)
+    reddit = FakeReddit()
+    first = reddit.post("t4", "old help", [INBOX])
+
+    async def scenario():
+        streamer = InboxStreamer(response_workers=1, client_factory=lambda account_id, credentials: reddit)
+        await poll(streamer, sessions)
+
+        # The item the mark points at is deleted, so before= returns nothing
+        reddit.deleted.add(first)
+        newer = reddit.post("t4", "help please", [INBOX])
+        await poll(streamer, sessions, polls=3)
+        assert reddit.replies == [(newer, "Got it")]
+        assert marks(sessions)["inbox"] == newer
+        await streamer.shutdown()
+
+    asyncio.run(scenario())
\ No newline at end of file
@@ -0,0 +1,136 @@
+import asyncio
+from datetime import datetime, timedelta
+import pytest
+
+# Job tables register on the app's declarative base
+models = pytest.importorskip("models")
+
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from services.job_queue import DONE, FAILED, QUEUED, RUNNING, Job, JobQueue
+
+@pytest.fixture
+def sessions():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    models.Base.metadata.create_all(engine, tables=[Job.__table__, models.Base.metadata.tables["job_leaders"]])
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+def expire_leases(db, job_ids):
+    db.execute(update(Job).where(Job.id.in_(job_ids)).values(lease_expires_at=datetime.utcnow() - timedelta(seconds=1)))
+    db.commit()
+
+def test_enqueue_is_idempotent_per_key(sessions):
+    db = sessions()
+    queue = JobQueue(db)
+    assert queue.enqueue("publish_post", {"post_id": 1}, idempotency_key="publish_post:1:20260101T120000")
+    assert not queue.enqueue("publish_post", {"post_id": 1}, idempotency_key="publish_post:1:20260101T120000")
+    assert queue.enqueue("publish_post", {"post_id": 1}, idempotency_key="publish_post:1:20260101T130000")
+    db.commit()
+    assert db.query(Job).count() == 2
+
+def test_workers_split_the_queue_without_double_claims(sessions):
+    db = sessions()
+    queue = JobQueue(db)
+    for number in range(100):
+        queue.enqueue("publish_post", {"post_id": number})
+    db.commit()
+
+    workers = [JobQueue(sessions()) for _ in range(4)]
+    claimed = {}
+    while True:
+        batch = [job for index, worker in enumerate(workers) for job in worker.claim(f"worker-{index}", ["publish_post"], 8)]
+        if not batch:
+            break
+        for job in batch:
+            assert job.id not in claimed, "claimed twice"
+            claimed[job.id] = job.locked_by
+    assert len(claimed) == 100
+    assert len(set(claimed.values())) == 4
+
+def test_expired_lease_is_reclaimed_by_another_worker(sessions):
+    db = sessions()
+    queue = JobQueue(db)
+    queue.enqueue("publish_post", {"post_id": 1}, max_attempts=3)
+    db.commit()
+
+    [first] = queue.claim("dead-worker", ["publish_post"], 1)
+    assert JobQueue(sessions()).claim("live-worker", ["publish_post"], 1) == []
+    expire_leases(db, [first.id])
+
+    [second] = JobQueue(sessions()).claim("live-worker", ["publish_post"], 1)
+    assert second.id == first.id and second.attempts == 2
+    assert not queue.complete(first), "the dead worker's lease is gone"
+    assert JobQueue(sessions()).complete(second)
+    assert db.get(Job, first.id).status == DONE
+
+def test_job_that_keeps_killing_its_worker_is_reaped(sessions):
+    db = sessions()
+    queue = JobQueue(db)
+    queue.enqueue("publish_post", {"post_id": 1}, max_attempts=2)
+    db.commit()
+
+    for _ in range(2):
+        [job] = queue.claim("worker", ["publish_post"], 1)
+        expire_leases(db, [job.id])
+    assert queue.claim("worker", ["publish_post"], 1) == []
+
+    [reaped] = queue.reap(["publish_post"])
+    assert reaped.id == job.id and reaped.status == FAILED
+    db.expire_all()
+    assert db.get(Job, job.id).status == FAILED
+    assert queue.reap(["publish_post"]) == []
+
+def test_fail_retries_until_max_attempts(sessions):
+    db = sessions()
+    queue = JobQueue(db)
+    queue.enqueue("publish_post", {"post_id": 1}, max_attempts=2)
+    db.commit()
+
+    [job] = queue.claim("worker", ["publish_post"], 1)
+    queue.fail(job, "boom")
+    db.expire_all()
+    assert db.get(Job, job.id).status == QUEUED
+    db.execute(update(Job).values(run_at=datetime.utcnow()))
+    db.commit()
+
+    [job] = queue.claim("worker", ["publish_post"], 1)
+    assert job.status == RUNNING and job.attempts == 2
+    queue.fail(job, "boom")
+    db.expire_all()
+    assert db.get(Job, job.id).status == FAILED
+
+def test_only_one_worker_leads(sessions):
+    first, second = JobQueue(sessions()), JobQueue(sessions())
+    assert first.lead("singletons", "worker-1", lease=60)
+    assert not second.lead("singletons", "worker-2", lease=60)
+    assert first.lead("singletons", "worker-1", lease=60)
+    first.resign("singletons", "worker-1")
+    assert second.lead("singletons", "worker-2", lease=60)
+    assert not first.lead("singletons", "worker-1", lease=60)
+
+def test_final_publish_failure_is_recorded(sessions, monkeypatch):
+    worker_module = pytest.importorskip("tasks.worker")
+    monkeypatch.setattr(worker_module, "SessionLocal", sessions)
+
+    db = sessions()
+    JobQueue(db).enqueue("publish_post", {"post_id": 7}, max_attempts=1)
+    db.commit()
+
+    failures = []
+    worker = worker_module.JobWorker("worker", kinds=["publish_post"])
+
+    async def publish_post(db, queue, job):
+        raise RuntimeError("Reddit said no")
+
+    worker.handlers.registry["publish_post"] = publish_post
+    worker.handlers.on_failed["publish_post"] = lambda db, job, error: failures.append((job.payload["post_id"], error))
+
+    async def scenario():
+        [job] = JobQueue(sessions()).claim("worker", ["publish_post"], 1)
+        await worker._run_job(job)
+
+    asyncio.run(scenario())
+    assert failures == [(7, "Reddit said no")]
+    assert db.query(Job).one().status == FAILED
\ No newline at end of file
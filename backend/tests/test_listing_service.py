@@ -0,0 +1,77 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+import pytest
+
+models = pytest.importorskip("models")
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from services.listing_service import ListingService, ensure_indexes
+from utils.pagination import encode_cursor
+
+ROWS = 500_000
+LIMIT = 100
+START = datetime(2026, 1, 1)
+
+@pytest.fixture(scope="module")
+def database(tmp_path_factory):
+    path = tmp_path_factory.mktemp("listing") / "posts.db"
+    engine = create_engine(f"sqlite:///{path}")
+    models.Base.metadata.create_all(engine, tables=[models.Post.__table__])
+    ensure_indexes(engine)
+    with engine.begin() as conn:
+        for offset in range(0, ROWS, 50_000):
+            conn.execute(insert(models.Post), [
+                {
+                    "id": number + 1, "account_id": 1, "subreddit": "python", "title": f"post {number}",
+                    "content": "", "is_posted": False, "created_at": START + timedelta(seconds=number)
+                }
+                for number in range(offset, offset + 50_000)
+            ])
+    engine.dispose()
+    return f"sqlite+aiosqlite:///{path}"
+
+def cursor_before(number: int) -> str:
+    """Cursor the previous page would have returned, ending just above post number"""
+    return encode_cursor(START + timedelta(seconds=number + 1), number + 2)
+
+def best_time(url, cursor, repeats=5):
+    async def scenario():
+        engine = create_async_engine(url)
+        async with engine.connect() as conn:
+            service = ListingService(AsyncSession(bind=conn))
+            timings = []
+            for _ in range(repeats):
+                started = time.perf_counter()
+                posts, next_cursor = await service.list_posts(account_id=1, subreddit="python", cursor=cursor, limit=LIMIT)
+                timings.append(time.perf_counter() - started)
+        await engine.dispose()
+        return min(timings), posts, next_cursor
+    return asyncio.run(scenario())
+
+def test_page_5000_costs_the_same_as_page_1(database):
+    first, posts, next_cursor = best_time(database, None)
+    assert [post.id for post in posts] == list(range(ROWS, ROWS - LIMIT, -1))
+    assert next_cursor
+
+    # Page 5,000 of 100 is the last page of 500k rows
+    deep, posts, next_cursor = best_time(database, cursor_before(LIMIT - 1))
+    assert [post.id for post in posts] == list(range(LIMIT, 0, -1))
+    assert next_cursor is None
+    assert deep < first * 3 + 0.002, f"page 1 {first * 1000:.1f} ms, page 5000 {deep * 1000:.1f} ms"
+
+def test_cursor_walk_has_no_gaps_or_repeats(database):
+    async def scenario():
+        engine = create_async_engine(database)
+        async with engine.connect() as conn:
+            service = ListingService(AsyncSession(bind=conn))
+            seen, cursor = [], cursor_before(1049)
+            while True:
+                posts, cursor = await service.list_posts(account_id=1, cursor=cursor, limit=LIMIT)
+                seen.extend(post.id for post in posts)
+                if cursor is None:
+                    break
+        await engine.dispose()
+        return seen
+    assert asyncio.run(scenario()) == list(range(1050, 0, -1))
\ No newline at end of file
@@ -0,0 +1,60 @@
+import logging
+import threading
+from utils import logger as log_module
+from utils.logger import setup_logger
+
+class Collect(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+def flush():
+    """Wait until the listener thread has handled everything queued so far"""
+    done = threading.Event()
+    record = logging.LogRecord("flush", logging.INFO, "", 0, "", (), None)
+    marker = Collect()
+    marker.emit = lambda record: done.set()
+    log_module.log_router.routes["flush"] = [marker]
+    log_module.queue_handler.enqueue(record)
+    assert done.wait(5)
+
+def test_loggers_share_one_listener_thread():
+    threads = threading.active_count()
+    first = setup_logger("test-first")
+    listener = log_module.log_listener
+    second = setup_logger("test-second")
+    assert log_module.log_listener is listener
+    assert threading.active_count() == threads
+
+    first_handler, second_handler = Collect(), Collect()
+    log_module.log_router.routes["test-first"] = [first_handler]
+    log_module.log_router.routes["test-second"] = [second_handler]
+    first.info("to %s", "first")
+    second.warning("to %s", "second")
+    first.getChild("child").info("from a child")
+    flush()
+
+    assert first_handler.messages == ["to first", "from a child"]
+    assert second_handler.messages == ["to second"]
+
+def test_handler_levels_apply_on_the_listener():
+    quiet = setup_logger("test-levels", level=logging.DEBUG)
+    errors_only = Collect()
+    errors_only.setLevel(logging.ERROR)
+    log_module.log_router.routes["test-levels"] = [errors_only]
+    quiet.info("skipped")
+    quiet.error("kept")
+    flush()
+    assert errors_only.messages == ["kept"]
+
+def test_log_directory_is_created_on_first_record(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    logger = setup_logger("test-lazy-file", "lazy.log")
+    assert not (tmp_path / "logs").exists()
+
+    logger.warning("first record")
+    flush()
+    assert "first record" in (tmp_path / "logs" / "lazy.log").read_text()
\ No newline at end of file
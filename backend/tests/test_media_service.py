@@ -0,0 +1,57 @@
+import asyncio
+import os
+import resource
+import time
+import pytest
+from services.media_service import MediaService, MediaTooLarge, settings
+
+class FakeUpload:
+    """Just the UploadFile surface store_upload reads"""
+
+    def __init__(self, size: int, content_type: str = "video/mp4", filename: str = "clip.mp4"):
+        self.content_type = content_type
+        self.filename = filename
+        self.remaining = size
+        self.block = bytes(range(256)) * 4096
+
+    async def read(self, size: int) -> bytes:
+        size = min(size, self.remaining, len(self.block))
+        self.remaining -= size
+        return self.block[:size]
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+@pytest.fixture
+def store(tmp_path):
+    service = MediaService(str(tmp_path))
+    yield service
+    service.shutdown()
+
+def test_200mb_upload_streams_in_bounded_memory(store):
+    size = 200 * 1024 * 1024
+    rss_before = peak_rss_mb()
+    started = time.perf_counter()
+    media = asyncio.run(store.store_upload(FakeUpload(size)))
+    elapsed = time.perf_counter() - started
+
+    assert media["size"] == size
+    assert os.path.getsize(os.path.join(store.root, media["sha256"][:2], media["sha256"][2:4], media["sha256"] + ".mp4")) == size
+    # Throughput well above a client upload link, and no whole-file buffer
+    assert size / elapsed > 50 * 1024 * 1024, f"{size / elapsed / 1024 / 1024:.0f} MB/s"
+    assert peak_rss_mb() - rss_before < 64
+
+def test_identical_upload_is_stored_once(store):
+    first = asyncio.run(store.store_upload(FakeUpload(3 * 1024 * 1024)))
+    second = asyncio.run(store.store_upload(FakeUpload(3 * 1024 * 1024)))
+    assert not first["deduplicated"] and second["deduplicated"]
+    assert second["metadata"] == {"media": first["metadata"]["media"]}
+    assert os.listdir(store.tmp_dir) == []
+
+def test_oversized_and_unknown_uploads_are_rejected(store, monkeypatch):
+    monkeypatch.setattr(settings, "MEDIA_MAX_BYTES", 2 * 1024 * 1024)
+    with pytest.raises(MediaTooLarge):
+        asyncio.run(store.store_upload(FakeUpload(3 * 1024 * 1024)))
+    with pytest.raises(ValueError):
+        asyncio.run(store.store_upload(FakeUpload(10, content_type="application/zip", filename="a.zip")))
+    assert os.listdir(store.tmp_dir) == []
\ No newline at end of file
@@ -0,0 +1,62 @@
+import time
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from utils.metrics import MetricsRegistry, _after_cursor_execute, _before_cursor_execute, request_timings
+
+def timed_request():
+    timings = {"db": 0.0, "reddit": 0.0}
+    return timings, request_timings.set(timings)
+
+def test_queries_are_charged_to_the_request():
+    engine = create_engine("sqlite://")
+    timings, token = timed_request()
+    try:
+        with engine.connect() as conn:
+            for _ in range(10):
+                conn.execute(text("select 1"))
+            with pytest.raises(OperationalError):
+                conn.execute(text("select * from missing"))
+            # The failed statement left no start behind to mismatch later queries
+            assert conn.info["query_start"] == []
+    finally:
+        request_timings.reset(token)
+    assert timings["db"] > 0
+
+def test_connection_without_a_recorded_start_is_skipped():
+    class Conn:
+        info = {}
+
+    _after_cursor_execute(Conn(), None, "select 1", (), None, False)
+    Conn.info["query_start"] = []
+    _after_cursor_execute(Conn(), None, "select 1", (), None, False)
+
+def test_instrumentation_overhead_stays_in_microseconds():
+    class Conn:
+        info = {}
+
+    timings, token = timed_request()
+    registry = MetricsRegistry()
+    rounds = 100_000
+    try:
+        started = time.perf_counter()
+        for _ in range(rounds):
+            _before_cursor_execute(Conn, None, "select 1", (), None, False)
+            _after_cursor_execute(Conn, None, "select 1", (), None, False)
+        per_query = (time.perf_counter() - started) / rounds
+
+        started = time.perf_counter()
+        for _ in range(rounds):
+            registry.observe_request("GET", "/api/v1/posts/", 200, 0.012, timings)
+        per_request = (time.perf_counter() - started) / rounds
+    finally:
+        request_timings.reset(token)
+
+    # Against millisecond queries and requests, a few microseconds is noise
+    assert per_query < 5e-6, f"{per_query * 1e6:.2f} us per query"
+    assert per_request < 10e-6, f"{per_request * 1e6:.2f} us per request"
+
+    started = time.perf_counter()
+    body = registry.render()
+    assert time.perf_counter() - started < 0.01
+    assert 'http_request_duration_seconds_count{method="GET",route="/api/v1/posts/"} 100000' in body
\ No newline at end of file
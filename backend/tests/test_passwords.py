@@ -0,0 +1,123 @@
+import asyncio
+import time
+import pytest
+
+models = pytest.importorskip("models")
+pytest.importorskip("fastapi")
+pytest.importorskip("passlib")
+
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+from auth.jwt_handler import PasswordHasher
+from services import credential_service
+from services.credential_service import AccountCredential, CredentialService
+
+STORM = 200
+MAX_P99 = 0.05  # seconds an ordinary request may wait during the storm
+
+class FakeContext:
+    """passlib's CryptContext calls, with hashes made at cost 1 due for an upgrade"""
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+
+    def hash(self, password):
+        time.sleep(self.delay)
+        return f"cost2:{password}"
+
+    def verify_and_update(self, password, hashed):
+        time.sleep(self.delay)
+        valid = hashed.split(":", 1)[1] == password
+        return valid, (f"cost2:{password}" if valid and hashed.startswith("cost1:") else None)
+
+@pytest.fixture
+def sessions(monkeypatch):
+    monkeypatch.setattr(credential_service, "password_hasher", PasswordHasher(FakeContext(), workers=2, queue_size=2))
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+
+    async def setup():
+        async with engine.begin() as conn:
+            await conn.run_sync(models.Base.metadata.create_all, tables=[
+                models.RedditAccount.__table__, AccountCredential.__table__
+            ])
+        async with async_sessionmaker(engine)() as db:
+            db.add(models.RedditAccount(id=1, username="alice", client_id="id", client_secret="secret", is_active=True))
+            db.add(AccountCredential(account_id=1, password_hash="cost1:hunter2"))
+            await db.commit()
+
+    asyncio.run(setup())
+    yield async_sessionmaker(engine, expire_on_commit=False)
+    asyncio.run(engine.dispose())
+
+def test_login_upgrades_an_outdated_hash(sessions):
+    async def scenario():
+        async with sessions() as db:
+            account = await CredentialService(db).authenticate("alice", "hunter2")
+            assert account.id == 1
+        async with sessions() as db:
+            return (await db.get(AccountCredential, 1)).password_hash
+
+    assert asyncio.run(scenario()) == "cost2:hunter2"
+
+def test_wrong_password_and_unknown_user_are_refused(sessions):
+    async def scenario():
+        async with sessions() as db:
+            service = CredentialService(db)
+            return await service.authenticate("alice", "wrong"), await service.authenticate("mallory", "hunter2")
+
+    assert asyncio.run(scenario()) == (None, None)
+
+def test_changing_a_password_needs_the_current_one(sessions):
+    async def scenario():
+        async with sessions() as db:
+            service = CredentialService(db)
+            assert not await service.change_password(1, "new")
+            assert not await service.change_password(1, "new", current_password="wrong")
+            assert await service.change_password(1, "new", current_password="hunter2")
+            assert await service.authenticate("alice", "new") is not None
+
+    asyncio.run(scenario())
+
+def test_saturated_hasher_sheds_load():
+    hasher = PasswordHasher(FakeContext(delay=0.05), workers=1, queue_size=1)
+
+    async def scenario():
+        return await asyncio.gather(*(hasher.hash("password") for _ in range(5)), return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    hasher.shutdown()
+    refused = [result for result in results if isinstance(result, HTTPException)]
+    assert len(refused) == 3 and all(error.status_code == 429 for error in refused)
+
+def test_api_p99_during_a_login_storm():
+    pytest.importorskip("bcrypt")
+    from passlib.context import CryptContext
+    context = CryptContext(schemes=["bcrypt"], bcrypt__rounds=10)
+    hashed = context.hash("hunter2")
+    hasher = PasswordHasher(context, workers=4, queue_size=32)
+
+    async def login():
+        try:
+            return (await hasher.verify("hunter2", hashed))[0]
+        except HTTPException:
+            return None
+
+    async def api_requests(stop: asyncio.Event, latencies: list):
+        while not stop.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(0.005)
+            latencies.append(time.perf_counter() - started - 0.005)
+
+    async def scenario():
+        stop, latencies = asyncio.Event(), []
+        requests = asyncio.create_task(api_requests(stop, latencies))
+        results = await asyncio.gather(*(login() for _ in range(STORM)))
+        stop.set()
+        await requests
+        return results, sorted(latencies)
+
+    results, latencies = asyncio.run(scenario())
+    hasher.shutdown()
+    assert any(results) and None in results  # served what fits, shed the rest
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    assert p99 < MAX_P99, f"p99 {p99 * 1000:.1f}ms"
\ No newline at end of file
@@ -0,0 +1,43 @@
+import asyncio
+from types import SimpleNamespace
+import pytest
+
+pytest.importorskip("models")
+post_events = pytest.importorskip("services.post_events")
+
+class FailingSession:
+    """Async session whose trend index writes fail"""
+    def __init__(self):
+        self.rolled_back = False
+
+    async def run_sync(self, call):
+        raise RuntimeError("database went away")
+
+    async def commit(self):
+        raise AssertionError("nothing to commit after a failed write")
+
+    async def rollback(self):
+        self.rolled_back = True
+
+def post(**values):
+    defaults = dict(
+        id=1, post_id=None, account_id=1, subreddit="python", title="Title", content="Body",
+        created_at=None, scheduled_time=None, is_posted=False
+    )
+    return SimpleNamespace(**{**defaults, **values})
+
+def test_failed_hook_does_not_fail_a_saved_post(monkeypatch):
+    scheduled = []
+    monkeypatch.setattr(post_events.post_timeline, "schedule", lambda post_id, when: scheduled.append(post_id))
+    db = FailingSession()
+
+    asyncio.run(post_events.on_posts_created(db, [post()]))
+    assert db.rolled_back
+    assert scheduled == [1]  # in-process state is still updated
+
+def test_failed_reindex_after_an_edit_is_logged(monkeypatch):
+    monkeypatch.setattr(post_events.post_timeline, "schedule", lambda post_id, when: None)
+    db = FailingSession()
+
+    asyncio.run(post_events.on_post_updated(db, post(title="Old"), post(title="New")))
+    assert db.rolled_back
\ No newline at end of file
@@ -0,0 +1,90 @@
+import asyncio
+from datetime import datetime, timedelta
+import pytest
+
+models = pytest.importorskip("models")
+publisher = pytest.importorskip("tasks.publisher")
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from services.publish_failure_service import PublishFailure, PublishFailureService
+from tasks.timeline import PostTimeline
+
+def test_lanes_do_not_wait_on_each_other(monkeypatch):
+    pipeline = publisher.PublishPipeline(max_workers=2)
+    released = asyncio.Event()
+    published = []
+
+    async def publish_lane(account_id, post_ids):
+        if account_id == 1:
+            await released.wait()  # e.g. an empty token bucket
+        published.extend(post_ids)
+
+    monkeypatch.setattr(pipeline, "_load_lanes", lambda db, post_ids: {1: [10], 2: [20]})
+    monkeypatch.setattr(pipeline, "_publish_lane", publish_lane)
+
+    async def scenario():
+        await asyncio.wait_for(pipeline.publish(None, [10, 20]), timeout=1)
+        await asyncio.sleep(0.01)
+        assert published == [20]
+        released.set()
+        await pipeline.drain(timeout=1)
+
+    asyncio.run(scenario())
+    assert published == [20, 10]
+    assert pipeline.lanes == {}
+    pipeline.shutdown()
+
+def test_posts_due_while_a_lane_runs_join_it_in_order(monkeypatch):
+    pipeline = publisher.PublishPipeline(max_workers=1)
+    batches = []
+    started = asyncio.Event()
+    released = asyncio.Event()
+
+    async def publish_lane(account_id, post_ids):
+        batches.append(post_ids)
+        started.set()
+        await released.wait()
+
+    lanes = iter([{1: [10]}, {1: [11, 12]}])
+    monkeypatch.setattr(pipeline, "_load_lanes", lambda db, post_ids: next(lanes))
+    monkeypatch.setattr(pipeline, "_publish_lane", publish_lane)
+
+    async def scenario():
+        await pipeline.publish(None, [10])
+        await started.wait()
+        await pipeline.publish(None, [11, 12])
+        assert len(pipeline.lanes) == 1
+        released.set()
+        await pipeline.drain(timeout=1)
+
+    asyncio.run(scenario())
+    assert batches == [[10], [11, 12]]
+    pipeline.shutdown()
+
+def test_retry_time_survives_a_timeline_resync():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    models.Base.metadata.create_all(engine, tables=[models.Post.__table__, PublishFailure.__table__])
+    db = sessionmaker(bind=engine)()
+    due = datetime(2026, 1, 1, 12, 0)
+    post = models.Post(id=1, account_id=1, subreddit="python", title="Title", scheduled_time=due, is_posted=False)
+    db.add(post)
+    db.commit()
+
+    failures = PublishFailureService(db)
+    failures.retry(post, 1, "Reddit is down", due + timedelta(minutes=5))
+    db.commit()
+
+    timeline = PostTimeline()
+    timeline.load(db)
+    assert timeline.next_due() == due + timedelta(minutes=5)
+    assert PublishFailureService(db).attempts(post) == 1
+
+    # Rescheduling starts over
+    post.scheduled_time = due + timedelta(days=1)
+    db.commit()
+    timeline.load(db)
+    assert timeline.next_due() == due + timedelta(days=1)
+    assert PublishFailureService(db).attempts(post) == 0
+    engine.dispose()
\ No newline at end of file
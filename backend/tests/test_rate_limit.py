@@ -0,0 +1,86 @@
+import asyncio
+import time
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("jose")
+
+from datetime import timedelta
+from auth.jwt_handler import create_access_token
+from config import get_settings
+from middleware.rate_limit import MemoryRateStore, RateLimitMiddleware
+
+settings = get_settings()
+
+CLIENTS = 10_000
+HITS_PER_CLIENT = 5
+MAX_OVERHEAD = 50e-6  # seconds per request
+
+async def app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+async def request(middleware, ip="10.0.0.1", token=None, path="/api/v1/posts"):
+    headers = [(b"authorization", f"Bearer {token}".encode())] if token else []
+    scope = {"type": "http", "path": path, "headers": headers, "client": (ip, 1234)}
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    await middleware(scope, None, send)
+    return sent[0]["status"]
+
+def test_refused_request_is_charged_to_no_limit():
+    store = MemoryRateStore(max_keys=100)
+
+    async def scenario():
+        assert (await store.hit([("ip:a", 10), ("account:alice", 1)], 60))[0]
+        allowed, retry_after = await store.hit([("ip:a", 10), ("account:alice", 1)], 60)
+        assert not allowed and retry_after > 0
+        ip_tat = store.tats["ip:a"]
+        await store.hit([("ip:a", 10), ("account:alice", 1)], 60)
+        assert store.tats["ip:a"] == ip_tat
+
+    asyncio.run(scenario())
+
+def test_new_tokens_share_the_account_budget(monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_ACCOUNT_REQUESTS", 2)
+    middleware = RateLimitMiddleware(app, store=MemoryRateStore(max_keys=100), routes={})
+    tokens = [create_access_token({"sub": "alice"}, expires_delta=timedelta(minutes=minutes)) for minutes in (5, 6, 7)]
+
+    async def scenario():
+        return [await request(middleware, ip=f"10.0.0.{index}", token=token) for index, token in enumerate(tokens)]
+
+    assert asyncio.run(scenario()) == [200, 200, 429]
+
+def test_invalid_token_only_counts_against_the_ip(monkeypatch):
+    middleware = RateLimitMiddleware(app, store=MemoryRateStore(max_keys=100), routes={})
+    assert asyncio.run(request(middleware, token="not-a-jwt")) == 200
+    assert set(middleware.store.tats) == {"ip:10.0.0.1"}
+
+def test_overhead_at_10k_distinct_clients(monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_REQUESTS", 1000)
+    store = MemoryRateStore(max_keys=CLIENTS)
+    middleware = RateLimitMiddleware(app, store=store, routes={"/api/v1/posts/import": 10})
+    ips = [f"10.{index // 65536}.{index // 256 % 256}.{index % 256}" for index in range(CLIENTS)]
+
+    async def baseline():
+        for _ in range(HITS_PER_CLIENT):
+            for ip in ips:
+                await request(app, ip=ip)
+
+    async def limited():
+        for _ in range(HITS_PER_CLIENT):
+            for ip in ips:
+                assert await request(middleware, ip=ip) == 200
+
+    started = time.perf_counter()
+    asyncio.run(baseline())
+    bare = time.perf_counter() - started
+    started = time.perf_counter()
+    asyncio.run(limited())
+    overhead = (time.perf_counter() - started - bare) / (CLIENTS * HITS_PER_CLIENT)
+
+    assert overhead < MAX_OVERHEAD, f"{overhead * 1e6:.1f}us per request"
+    assert len(store.tats) <= CLIENTS
\ No newline at end of file
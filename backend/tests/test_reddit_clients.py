@@ -0,0 +1,121 @@
+import threading
+import time
+from types import SimpleNamespace
+from config import get_settings
+from utils.reddit_clients import RedditClientManager, _serialize_requests
+
+MARGIN = get_settings().REDDIT_TOKEN_REFRESH_MARGIN
+
+class FakeAuthorizer:
+    """Stands in for a prawcore authorizer, which tracks expiry on time.monotonic_ns()"""
+
+    def __init__(self, expires_in: float, access_token: str = "token"):
+        self.access_token = access_token
+        self._expiration_timestamp_ns = time.monotonic_ns() + int(expires_in * 1_000_000_000)
+        self.refreshes = 0
+
+    def refresh(self):
+        self.refreshes += 1
+        self._expiration_timestamp_ns = time.monotonic_ns() + 3600 * 1_000_000_000
+
+class LegacyAuthorizer:
+    """prawcore before 2.4, which tracked expiry on time.time()"""
+
+    def __init__(self, expires_in: float):
+        self.access_token = "token"
+        self._expiration_timestamp = time.time() + expires_in
+        self.refreshes = 0
+
+    def refresh(self):
+        self.refreshes += 1
+
+def manager_with(**authorizers) -> RedditClientManager:
+    manager = RedditClientManager(session=object())
+    for key, authorizer in authorizers.items():
+        manager.clients[key] = SimpleNamespace(_core=SimpleNamespace(_authorizer=authorizer))
+    return manager
+
+def test_refreshes_tokens_expiring_within_margin():
+    expiring = FakeAuthorizer(expires_in=MARGIN / 2)
+    manager = manager_with(expiring=expiring)
+
+    assert manager.refresh_tokens() == 1
+    assert expiring.refreshes == 1
+    # The renewed token is good for an hour, so the next check leaves it alone
+    assert manager.refresh_tokens() == 0
+
+def test_refreshes_expired_tokens():
+    expired = FakeAuthorizer(expires_in=-10)
+    assert manager_with(expired=expired).refresh_tokens() == 1
+    assert expired.refreshes == 1
+
+def test_leaves_fresh_and_missing_tokens_alone():
+    fresh = FakeAuthorizer(expires_in=MARGIN * 2)
+    unused = FakeAuthorizer(expires_in=0, access_token=None)
+    manager = manager_with(fresh=fresh, unused=unused, unbuilt=None)
+
+    assert manager.refresh_tokens() == 0
+    assert fresh.refreshes == 0
+    assert unused.refreshes == 0
+
+def test_refreshes_wall_clock_authorizers():
+    legacy = LegacyAuthorizer(expires_in=MARGIN / 2)
+    assert manager_with(legacy=legacy).refresh_tokens() == 1
+    assert legacy.refreshes == 1
+
+def test_failed_refresh_counts_as_client_error():
+    class FailingAuthorizer(FakeAuthorizer):
+        def refresh(self):
+            raise RuntimeError("token endpoint unavailable")
+
+    manager = manager_with(failing=FailingAuthorizer(expires_in=0))
+    assert manager.refresh_tokens() == 0
+    assert manager.stats["failing"].errors == 1
+
+class RacyCore:
+    """prawcore Session stand-in that notices overlapping requests"""
+
+    def __init__(self):
+        self.active = 0
+        self.overlaps = 0
+        self.calls = 0
+
+    def request(self, method, path):
+        self.active += 1
+        if self.active > 1:
+            self.overlaps += 1
+        time.sleep(0.001)
+        self.calls += 1
+        self.active -= 1
+        return path
+
+def test_threads_sharing_a_client_take_turns():
+    core = RacyCore()
+    client = SimpleNamespace(_core=core, _read_only_core=core, _authorized_core=None)
+    _serialize_requests(client, threading.RLock())
+
+    threads = [
+        threading.Thread(target=lambda: [client._core.request("GET", "/api/info") for _ in range(20)])
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert core.calls == 160
+    assert core.overlaps == 0
+
+def test_refresh_waits_for_a_request_in_flight():
+    expiring = FakeAuthorizer(expires_in=0)
+    manager = manager_with(busy=expiring)
+    lock = manager.locks.setdefault("busy", threading.RLock())
+
+    with lock:
+        refresher = threading.Thread(target=manager.refresh_tokens)
+        refresher.start()
+        refresher.join(0.05)
+        assert refresher.is_alive() and expiring.refreshes == 0
+        # The request renewed the token itself while holding the lock
+        expiring.refresh()
+    refresher.join()
+    assert expiring.refreshes == 1
\ No newline at end of file
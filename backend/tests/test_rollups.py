@@ -0,0 +1,123 @@
+import asyncio
+from datetime import datetime, timedelta
+import pytest
+
+models = pytest.importorskip("models")
+pytest.importorskip("aiosqlite")
+
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from services import analytics_store
+from services.analytics_store import AnalyticsStore
+from services.rollup_service import DailyRollup, HourlyRollup, PostRollup, RollupService, parse_timeframe
+
+TABLES = [models.Post.__table__, models.Analytics.__table__, PostRollup.__table__, HourlyRollup.__table__, DailyRollup.__table__]
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    models.Base.metadata.create_all(engine, tables=TABLES)
+    analytics_store.catalog.forget()
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    analytics_store.catalog.forget()
+    analytics_store.partition_metadata.clear()
+    engine.dispose()
+
+def snapshot(post_id, created_at, score, comments=0, account_id=1, subreddit="python"):
+    return {
+        "post_id": post_id, "account_id": account_id, "subreddit": subreddit, "created_at": created_at,
+        "tracked_at": created_at + timedelta(hours=1), "score": score, "upvote_ratio": 1.0, "num_comments": comments
+    }
+
+def totals(db, table):
+    return {
+        (row.account_id, row.subreddit, row.bucket): (row.posts, row.score, row.num_comments)
+        for row in db.query(table)
+    }
+
+def test_apply_adds_only_the_change_since_the_previous_snapshot(db):
+    morning = datetime(2026, 6, 1, 9, 15)
+    service = RollupService(db)
+    service.apply([snapshot("a", morning, 5, 1), snapshot("b", morning + timedelta(hours=2), 3)])
+    changes = service.apply([snapshot("a", morning, 8, 2), snapshot("a", morning, 12, 4)])
+    db.commit()
+
+    # The later snapshot of a post in one batch wins, and "a" is counted once
+    assert changes == [{
+        "post_id": "a", "subreddit": "python", "created_at": morning, "new_post": False,
+        "old_score": 5, "score": 12, "old_comments": 1, "num_comments": 4
+    }]
+    assert totals(db, HourlyRollup) == {
+        (1, "python", datetime(2026, 6, 1, 9)): (1, 12, 4),
+        (1, "python", datetime(2026, 6, 1, 11)): (1, 3, 0)
+    }
+    assert totals(db, DailyRollup) == {(1, "python", datetime(2026, 6, 1)): (2, 15, 4)}
+
+def test_incremental_rollups_match_a_rebuild_from_stored_snapshots(db):
+    start = datetime(2026, 5, 1)
+    store = AnalyticsStore(db)
+    service = RollupService(db)
+    for number in range(60):
+        post_id = f"p{number}"
+        created_at = start + timedelta(hours=number * 7)
+        account_id = 1 + number % 2
+        subreddit = ("python", "learnpython", "django")[number % 3]
+        db.add(models.Post(post_id=post_id, account_id=account_id, subreddit=subreddit))
+        for refresh in range(3):
+            row = snapshot(post_id, created_at, number + refresh * 10, refresh, account_id, subreddit)
+            row["tracked_at"] += timedelta(hours=refresh)
+            store.write([row])
+            service.apply([row])
+    db.commit()
+
+    assert service.check_consistency() == []
+    incremental = totals(db, DailyRollup)
+    assert service.rebuild(account_id=2) == 30
+    assert service.check_consistency() == []
+    assert totals(db, DailyRollup) == incremental
+
+    # Drift is reported per bucket
+    db.query(DailyRollup).filter(DailyRollup.account_id == 1).first().score += 1
+    db.commit()
+    assert len(service.check_consistency(account_id=1)) == 1
+
+def test_overview_reads_daily_buckets_for_long_windows_and_hourly_for_short():
+    now = datetime.utcnow()
+
+    async def scenario():
+        engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+        async with engine.begin() as conn:
+            await conn.run_sync(lambda sync: models.Base.metadata.create_all(sync, tables=TABLES))
+        async with AsyncSession(engine, expire_on_commit=False) as db:
+            db.add_all([models.Post(post_id=post_id, account_id=1, subreddit="python") for post_id in ("new", "old", "other")])
+            await db.run_sync(lambda sync: RollupService(sync).apply([
+                snapshot("new", now - timedelta(hours=3), 10, 5),
+                snapshot("old", now - timedelta(days=20), 30, 1),
+                snapshot("other", now - timedelta(hours=1), 100, 0, account_id=2)
+            ]))
+            await db.commit()
+            service = RollupService(db)
+            overviews = await service.get_overview(1, "30d"), await service.get_overview(1, "24h")
+        await engine.dispose()
+        return overviews
+
+    month, day = asyncio.run(scenario())
+    assert (month["total_posts"], month["total_karma"], month["avg_comments"]) == (2, 40, 3.0)
+    assert month["growth_trends"]["interval"] == "day"
+    assert [post.post_id for post in month["best_performing_posts"]] == ["old", "new"]
+    assert month["performance_by_subreddit"]["python"]["avg_score"] == 20.0
+
+    assert (day["total_posts"], day["total_karma"]) == (1, 10)
+    assert day["growth_trends"]["interval"] == "hour"
+    assert len(day["growth_trends"]["series"]) == 1
+
+def test_parse_timeframe_rejects_unknown_units():
+    assert parse_timeframe("90d") == timedelta(days=90)
+    assert parse_timeframe("24h") == timedelta(hours=24)
+    for timeframe in ("", "7w", "d"):
+        with pytest.raises(ValueError):
+            parse_timeframe(timeframe)
\ No newline at end of file
@@ -0,0 +1,134 @@
+import asyncio
+import random
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+import pytest
+
+models = pytest.importorskip("models")
+pytest.importorskip("aiosqlite")
+
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import StaticPool
+from config import get_settings
+from services import schedule_solver
+from services.schedule_solver import AccountTimeline, ScheduleSolver
+import schemas
+
+settings = get_settings()
+
+GAP = 300
+UTC = ZoneInfo("UTC")
+DAY = datetime(2026, 6, 1, tzinfo=timezone.utc).timestamp()
+
+def at(hours, minutes=0):
+    return DAY + hours * 3600 + minutes * 60
+
+def test_conflicting_times_move_to_the_nearer_free_side():
+    timeline = AccountTimeline(GAP, 10, UTC)
+    timeline.add(at(10))
+    assert timeline.nearest_free(at(12), at(0)) == at(12)
+    assert timeline.nearest_free(at(10, 1), at(0)) == at(10, 5)
+    assert timeline.nearest_free(at(9, 59), at(0)) == at(9, 55)
+    # Never earlier than the earliest allowed time
+    assert timeline.nearest_free(at(9, 59), at(9, 58)) == at(10, 5)
+
+def test_packed_posts_and_full_days_are_skipped_in_one_step():
+    timeline = AccountTimeline(GAP, 1000, UTC)
+    for minute in range(0, 500 * 5, 5):
+        timeline.add(at(0, minute))
+    assert timeline.next_free(at(0)) == at(0, 2500)
+    assert timeline.previous_free(at(0, 2495), at(-24)) == at(0, -5)
+
+    full = AccountTimeline(GAP, 2, UTC)
+    for day in range(3):
+        full.add(at(24 * day + 8))
+        full.add(at(24 * day + 9))
+    assert full.next_free(at(12)) == at(72)
+    assert full.previous_free(at(60), at(-48)) == at(0) - 1
+
+def check_constraints(placements, existing=()):
+    by_account = defaultdict(list)
+    for account_id, moment in existing:
+        by_account[account_id].append(moment)
+    for placement in placements:
+        by_account[placement["account_id"]].append(placement["scheduled_time"])
+    for times in by_account.values():
+        times.sort()
+        assert all(later - earlier >= timedelta(seconds=GAP) for earlier, later in zip(times, times[1:]))
+        assert max(Counter(moment.date() for moment in times).values()) <= settings.MAX_POSTS_PER_DAY
+
+def solve(posts, existing=(), best_slot=None):
+    async def scenario():
+        engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+        async with engine.begin() as conn:
+            await conn.run_sync(lambda sync: models.Base.metadata.create_all(sync, tables=[models.Post.__table__]))
+        async with AsyncSession(engine) as db:
+            db.add_all([
+                models.Post(account_id=account_id, subreddit="python", title="existing", scheduled_time=moment)
+                for account_id, moment in existing
+            ])
+            await db.commit()
+            started = time.perf_counter()
+            placements = await ScheduleSolver(db).solve(posts)
+            elapsed = time.perf_counter() - started
+        await engine.dispose()
+        return placements, elapsed
+
+    return asyncio.run(scenario())
+
+@pytest.fixture
+def solver_settings(monkeypatch):
+    monkeypatch.setattr(settings, "MIN_SCHEDULING_INTERVAL", GAP // 60)
+    monkeypatch.setattr(settings, "MAX_POSTS_PER_DAY", 10)
+    monkeypatch.setattr(settings, "SCHEDULING_TIMEZONE", "UTC")
+
+def post(account_id=1, scheduled_time=None, subreddit="python"):
+    return schemas.PostCreate(title="t", subreddit=subreddit, account_id=account_id, scheduled_time=scheduled_time)
+
+def test_solve_reports_how_each_post_was_placed(solver_settings, monkeypatch):
+    tomorrow = (datetime.utcnow() + timedelta(days=1)).replace(hour=10, minute=0, second=0, microsecond=0)
+    best = tomorrow.replace(hour=18)
+
+    async def next_best_slot(db, subreddit, now):
+        return best if subreddit == "python" else None
+
+    monkeypatch.setattr(schedule_solver.best_times_engine, "next_best_slot", next_best_slot)
+    existing = [(1, tomorrow)]
+    posts = [
+        post(scheduled_time=tomorrow + timedelta(minutes=2)),
+        post(scheduled_time=tomorrow + timedelta(hours=2)),
+        post(),
+        post(subreddit="rust"),
+        post(scheduled_time=(tomorrow + timedelta(hours=3)).replace(tzinfo=timezone(timedelta(hours=2)))),
+        post(account_id=2, scheduled_time=tomorrow)
+    ]
+    placements, _ = solve(posts, existing)
+
+    assert [placement["status"] for placement in placements] == [
+        "moved", "requested", "best_time", "earliest_free", "requested", "requested"
+    ]
+    assert placements[0]["scheduled_time"] == tomorrow + timedelta(minutes=5)
+    assert placements[2]["scheduled_time"] == best
+    # Aware times are converted to naive UTC
+    assert placements[4]["scheduled_time"] == tomorrow + timedelta(hours=1)
+    assert placements[3]["scheduled_time"] <= datetime.utcnow() + timedelta(seconds=1)
+    check_constraints(placements, existing)
+
+def test_5000_posts_into_a_crowded_account(solver_settings, monkeypatch):
+    async def no_best_slot(db, subreddit, now):
+        return None
+
+    monkeypatch.setattr(schedule_solver.best_times_engine, "next_best_slot", no_best_slot)
+    rng = random.Random(7)
+    start = (datetime.utcnow() + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    existing = [
+        (1, start + timedelta(days=day, hours=hour))
+        for day in range(60) for hour in rng.sample(range(24), 6)
+    ]
+    posts = [post(scheduled_time=start + timedelta(minutes=rng.randrange(60 * 24 * 30))) for _ in range(5000)]
+    placements, elapsed = solve(posts, existing)
+
+    check_constraints(placements, existing)
+    assert elapsed < 2, f"placing 5000 posts took {elapsed:.2f}s"
\ No newline at end of file
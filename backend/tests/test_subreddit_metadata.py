@@ -0,0 +1,61 @@
+import asyncio
+import pytest
+
+pytest.importorskip("models")
+pytest.importorskip("aiosqlite")
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+from services import subreddit_metadata_service
+from services.subreddit_metadata_service import SubredditMetadata, SubredditMetadataService, check_flair
+
+FLAIRS = {"required": True, "templates": [{"id": "t1", "text": "Question", "text_editable": False}]}
+
+@pytest.fixture
+def service(monkeypatch):
+    fetched = []
+
+    def fetch_flairs(subreddit):
+        fetched.append(subreddit)
+        return FLAIRS
+
+    async def scenario():
+        engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+        async with engine.begin() as conn:
+            await conn.run_sync(SubredditMetadata.__table__.create)
+        return engine
+
+    engine = asyncio.run(scenario())
+    monkeypatch.setattr(subreddit_metadata_service, "AsyncSessionLocal", async_sessionmaker(engine, expire_on_commit=False))
+    monkeypatch.setitem(subreddit_metadata_service.FETCHERS, "flairs", fetch_flairs)
+    service = SubredditMetadataService()
+    service.max_entries = 3
+    service.fetched = fetched
+    return service
+
+def test_memory_layer_evicts_least_recently_used_subreddits(service):
+    async def scenario():
+        for subreddit in ("a", "b", "c"):
+            await service.get(subreddit, ["flairs"])
+        await service.get("a", ["flairs"])  # a becomes the most recently used
+        await service.get("d", ["flairs"])
+        assert list(service.entries) == ["c", "a", "d"]
+
+        # An evicted subreddit comes back from the database, not from Reddit
+        assert (await service.get("b", ["flairs"]))["flairs"] == FLAIRS
+        assert list(service.entries) == ["a", "d", "b"]
+
+    asyncio.run(scenario())
+    assert service.fetched == ["a", "b", "c", "d"]
+
+def test_validate_flairs_fetches_each_subreddit_once(service):
+    rows = [("Python", "question"), ("python", None), ("python", "Meme"), (None, "Meme")]
+    errors = asyncio.run(service.validate_flairs(rows))
+    assert errors == [None, "r/python requires a post flair", "This flair is not allowed in r/python", None]
+    assert service.fetched == ["python"]
+
+def test_check_flair_allows_any_text_when_a_template_is_editable():
+    editable = {"required": False, "templates": [{"id": "t2", "text": "Custom", "text_editable": True}]}
+    assert check_flair(editable, "anything", "python") is None
+    assert check_flair(None, None, "python") is None
+    assert check_flair(FLAIRS, "t1", "python") is None
\ No newline at end of file
@@ -0,0 +1,92 @@
+import asyncio
+import pytest
+
+task_manager = pytest.importorskip("tasks.task_manager")
+
+from tasks.task_manager import SupervisedWorker
+
+class FakeSession:
+    def __init__(self, opened):
+        self.closed = False
+        opened.append(self)
+
+    def close(self):
+        self.closed = True
+
+@pytest.fixture
+def sessions(monkeypatch):
+    opened = []
+    monkeypatch.setattr(task_manager, "SessionLocal", lambda: FakeSession(opened))
+    return opened
+
+def run_until(worker: SupervisedWorker, runs: int):
+    async def scenario():
+        worker.start()
+        while worker.runs < runs:
+            await asyncio.sleep(0)
+        await worker.stop(timeout=1)
+
+    asyncio.run(scenario())
+
+def test_every_iteration_gets_its_own_closed_session(sessions):
+    seen = []
+
+    async def step(db):
+        seen.append(db)
+        return 0
+
+    worker = SupervisedWorker("test", step)
+    run_until(worker, 5)
+    assert len(seen) >= 5
+    assert len({id(db) for db in seen}) == len(seen)
+    assert all(db.closed for db in sessions)
+    assert worker.health()["state"] == "stopped"
+
+def test_failures_back_off_exponentially_and_recover(sessions):
+    delays = []
+    health = []
+
+    async def wait(delay):
+        delays.append(delay)
+        health.append(worker.health())
+
+    async def step(db):
+        if worker.runs < 4:
+            raise RuntimeError(f"failure {worker.runs + 1}")
+        return 30
+
+    worker = SupervisedWorker("test", step, wait=wait, backoff_base=1, backoff_max=5)
+    run_until(worker, 5)
+
+    assert delays[:5] == [1, 2, 4, 5, 30]
+    assert [entry["state"] for entry in health[:5]] == ["backoff"] * 4 + ["sleeping"]
+    assert [entry["healthy"] for entry in health[:5]] == [False] * 4 + [True]
+    assert health[3]["last_error"] == "failure 4"
+    assert health[4]["failures"] == 4 and health[4]["last_error"] is None
+    assert all(db.closed for db in sessions)
+
+def test_stop_drains_the_running_iteration_and_cancels_after_timeout(sessions):
+    finished = []
+
+    async def slow_step(db):
+        await asyncio.sleep(0.05)
+        finished.append(db)
+        return 60
+
+    async def stuck_step(db):
+        await asyncio.Event().wait()
+
+    async def scenario():
+        draining = SupervisedWorker("draining", slow_step)
+        stuck = SupervisedWorker("stuck", stuck_step)
+        draining.start()
+        stuck.start()
+        await asyncio.sleep(0.01)
+        await asyncio.gather(draining.stop(timeout=1), stuck.stop(timeout=0.05))
+        return draining, stuck
+
+    draining, stuck = asyncio.run(scenario())
+    assert len(finished) == 1
+    assert draining.runs == 1 and draining.failures == 0
+    assert stuck.state == "stopped" and stuck.task is None
+    assert all(db.closed for db in sessions)
\ No newline at end of file
@@ -0,0 +1,25 @@
+import pytest
+
+task_manager = pytest.importorskip("tasks.task_manager")
+
+from config import get_settings
+
+settings = get_settings()
+
+def test_inprocess_mode_refuses_several_api_processes(monkeypatch):
+    monkeypatch.setattr(settings, "BACKGROUND_MODE", "inprocess")
+    monkeypatch.setattr(settings, "WEB_CONCURRENCY", 4)
+    with pytest.raises(RuntimeError, match="BACKGROUND_MODE=queue"):
+        task_manager.TaskManager()
+
+def test_queue_mode_leaves_streams_and_periodic_jobs_to_the_worker(monkeypatch):
+    monkeypatch.setattr(settings, "BACKGROUND_MODE", "queue")
+    monkeypatch.setattr(settings, "WEB_CONCURRENCY", 4)
+    names = {worker.name for worker in task_manager.TaskManager().workers}
+    assert names == {"scheduled_posts", "reddit_tokens"}
+
+def test_inprocess_mode_runs_everything_in_one_process(monkeypatch):
+    monkeypatch.setattr(settings, "BACKGROUND_MODE", "inprocess")
+    monkeypatch.setattr(settings, "WEB_CONCURRENCY", 1)
+    names = {worker.name for worker in task_manager.TaskManager().workers}
+    assert {"scheduled_posts", "autoresponder", "post_analytics"} <= names
\ No newline at end of file
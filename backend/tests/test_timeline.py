@@ -0,0 +1,101 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+import pytest
+
+models = pytest.importorskip("models")
+scheduler = pytest.importorskip("tasks.scheduler")
+
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from config import get_settings
+from services.publish_failure_service import PublishFailure
+from tasks.timeline import PostTimeline
+
+SCHEDULED_POSTS = 100_000
+DUE_SOON = 50
+MAX_JITTER = 0.05  # seconds between a post coming due and being handed to the publisher
+
+def test_pop_due_skips_moved_and_removed_posts():
+    timeline = PostTimeline()
+    start = datetime(2026, 1, 1)
+    for post_id in range(1, 6):
+        timeline.schedule(post_id, start + timedelta(minutes=post_id))
+    timeline.schedule(2, start + timedelta(hours=1))
+    timeline.remove(3)
+
+    assert timeline.pop_due(start + timedelta(minutes=10)) == [1, 4, 5]
+    assert timeline.next_due() == start + timedelta(hours=1)
+    assert len(timeline) == 1
+
+@pytest.fixture
+def database():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    models.Base.metadata.create_all(engine, tables=[
+        models.RedditAccount.__table__, models.Post.__table__, PublishFailure.__table__
+    ])
+    yield engine
+    engine.dispose()
+
+def test_100k_scheduled_posts_idle_without_queries_and_publish_on_time(database, monkeypatch):
+    far = datetime.utcnow() + timedelta(days=30)
+    with database.begin() as conn:
+        conn.execute(insert(models.Post), [
+            {"id": post_id, "account_id": 1, "subreddit": "python", "title": f"Post {post_id}",
+             "scheduled_time": far + timedelta(seconds=post_id), "is_posted": False}
+            for post_id in range(1, SCHEDULED_POSTS + 1)
+        ])
+
+    timeline = PostTimeline()
+    monkeypatch.setattr(scheduler, "post_timeline", timeline)
+    monkeypatch.setattr(get_settings(), "SCHEDULER_RESYNC_INTERVAL", 24 * 60)
+    tasks = scheduler.SchedulerTasks()
+    tasks.timeline = timeline
+
+    published = {}
+
+    async def publish(db, post_ids):
+        for post_id in post_ids:
+            published[post_id] = datetime.utcnow()
+
+    monkeypatch.setattr(tasks.publisher, "publish", publish)
+    db = sessionmaker(bind=database)()
+    queries = []
+    event.listen(database, "before_cursor_execute", lambda *args: queries.append(args[2]))
+
+    async def scenario():
+        await tasks.process_scheduled_posts(db)  # loads the timeline once
+        assert len(timeline) == SCHEDULED_POSTS
+        queries.clear()
+
+        # Idle: nothing due for a month, the loop only asks the heap
+        for _ in range(100):
+            await tasks.process_scheduled_posts(db)
+        idle_queries = len(queries)
+
+        soon = datetime.utcnow() + timedelta(seconds=0.2)
+        due_times = {}
+        for offset in range(DUE_SOON):
+            post_id = offset + 1
+            due_times[post_id] = soon + timedelta(milliseconds=10 * offset)
+            timeline.schedule(post_id, due_times[post_id])
+
+        # What SupervisedWorker does with the scheduled_posts step
+        deadline = time.monotonic() + 5
+        while True:
+            delay = await tasks.process_scheduled_posts(db)
+            remaining = deadline - time.monotonic()
+            if len(published) == DUE_SOON or remaining <= 0:
+                break
+            await timeline.wait(min(delay, remaining))
+        return idle_queries, due_times
+
+    idle_queries, due_times = asyncio.run(scenario())
+    tasks.publisher.shutdown()
+    assert idle_queries == 0
+    assert sorted(published) == sorted(due_times)
+    jitter = sorted((published[post_id] - due_times[post_id]).total_seconds() for post_id in due_times)
+    assert jitter[0] >= 0, "published early"
+    p99 = jitter[int(len(jitter) * 0.99) - 1]
+    assert p99 < MAX_JITTER, f"p99 publish jitter {p99:.3f}s"
\ No newline at end of file
@@ -0,0 +1,148 @@
+import asyncio
+import time
+import pytest
+
+models = pytest.importorskip("models")
+
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from auth import token_cache
+from auth.token_cache import PrincipalCache, VerifiedTokenCache
+
+LOOKUPS = 2000
+
+class FakePubSub:
+    def __init__(self, redis):
+        self.redis = redis
+        self.messages = asyncio.Queue()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self.redis.subscribers.discard(self)
+
+    async def subscribe(self, channel):
+        self.redis.subscribers.add(self)
+
+    async def listen(self):
+        while True:
+            yield await self.messages.get()
+
+class FakeRedis:
+    """Publish/subscribe of redis.asyncio within one event loop"""
+    def __init__(self):
+        self.subscribers = set()
+
+    def pubsub(self):
+        return FakePubSub(self)
+
+    async def publish(self, channel, data):
+        for subscriber in list(self.subscribers):
+            subscriber.messages.put_nowait({"type": "message", "channel": channel, "data": data.encode()})
+        return len(self.subscribers)
+
+def account(account_id=1, username="alice", is_active=True):
+    return models.RedditAccount(id=account_id, username=username, client_id="id", client_secret="secret", is_active=is_active)
+
+def test_verified_token_expires_with_the_token():
+    cache = VerifiedTokenCache(max_items=2)
+    cache.put("fresh", {"sub": "alice", "exp": time.time() + 60})
+    cache.put("stale", {"sub": "bob", "exp": time.time() - 1})
+    cache.put("forever", {"sub": "carol"})
+    assert cache.get("fresh")["sub"] == "alice"
+    assert cache.get("stale") is None
+    assert cache.get("forever") is None
+
+def test_principal_is_keyed_by_id_and_username():
+    cache = PrincipalCache(ttl=30, max_items=10)
+    cache.put(account())
+    assert cache.get(account_id=1, username="alice")["is_active"]
+    assert cache.get(username="alice")["id"] == 1
+    assert cache.get(account_id=1, username="mallory") is None
+
+def test_committed_account_change_drops_the_principal(monkeypatch):
+    cache = PrincipalCache(ttl=30, max_items=10)
+    monkeypatch.setattr(token_cache, "principal_cache", cache)
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    models.Base.metadata.create_all(engine, tables=[models.RedditAccount.__table__])
+    db = sessionmaker(bind=engine)()
+    db.add(account())
+    db.commit()
+    cache.put(db.get(models.RedditAccount, 1))
+
+    # Any writer, not only the accounts router
+    db.get(models.RedditAccount, 1).is_active = False
+    db.flush()
+    assert cache.get(account_id=1, username="alice") is not None, "dropped before the commit"
+    db.commit()
+    assert cache.get(account_id=1, username="alice") is None
+    engine.dispose()
+
+def test_change_in_one_process_reaches_the_others():
+    redis = FakeRedis()
+    here, there = PrincipalCache(ttl=30, max_items=10), PrincipalCache(ttl=30, max_items=10)
+
+    async def scenario():
+        await here.start(redis)
+        await there.start(redis)
+        await asyncio.sleep(0)
+        there.put(account())
+        assert there.get(account_id=1, username="alice") is not None
+
+        here.invalidate(1)
+        for _ in range(5):
+            await asyncio.sleep(0)
+        assert there.get(account_id=1, username="alice") is None
+        await here.stop()
+        await there.stop()
+
+    asyncio.run(scenario())
+
+def test_nothing_is_served_while_unsubscribed():
+    cache = PrincipalCache(ttl=30, max_items=10)
+
+    async def scenario():
+        await cache.start(FakeRedis())
+        await asyncio.sleep(0)
+        cache.put(account())
+        assert cache.get(account_id=1, username="alice") is not None
+        await cache.stop()
+        assert cache.get(account_id=1, username="alice") is None
+
+    asyncio.run(scenario())
+
+def test_cached_principal_is_much_cheaper_than_the_lookup():
+    """Dependency overhead before (token decode + account query) and after (two dict hits)"""
+    cache = PrincipalCache(ttl=30, max_items=10)
+    tokens = VerifiedTokenCache(max_items=10)
+    tokens.put("token", {"sub": "alice", "aid": 1, "exp": time.time() + 60})
+
+    async def scenario():
+        engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+        async with engine.begin() as conn:
+            await conn.run_sync(models.Base.metadata.create_all, tables=[models.RedditAccount.__table__])
+        sessions = async_sessionmaker(engine, expire_on_commit=False)
+        async with sessions() as db:
+            db.add(account())
+            await db.commit()
+
+        started = time.perf_counter()
+        for _ in range(LOOKUPS):
+            async with sessions() as db:
+                user = await db.get(models.RedditAccount, 1)
+        uncached = time.perf_counter() - started
+        cache.put(user)
+
+        started = time.perf_counter()
+        for _ in range(LOOKUPS):
+            payload = tokens.get("token")
+            assert cache.get(account_id=payload["aid"], username=payload["sub"]) is not None
+        cached = time.perf_counter() - started
+        await engine.dispose()
+        return uncached, cached
+
+    uncached, cached = asyncio.run(scenario())
+    assert cached * 10 < uncached, f"{cached / LOOKUPS * 1e6:.1f}us cached vs {uncached / LOOKUPS * 1e6:.1f}us per lookup"
\ No newline at end of file
@@ -0,0 +1,106 @@
+import asyncio
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+import pytest
+
+models = pytest.importorskip("models")
+pytest.importorskip("aiosqlite")
+
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from services.rollup_service import PostRollup
+from services.trend_index_service import TrendIndexService, TrendTermBucket, extract_terms
+
+TABLES = [models.Post.__table__, PostRollup.__table__, TrendTermBucket.__table__]
+TODAY = datetime.utcnow().replace(hour=12, minute=0, second=0, microsecond=0)
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    models.Base.metadata.create_all(engine, tables=TABLES)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+def post(post_id, title, content="", subreddit="Python", created_at=TODAY):
+    return SimpleNamespace(post_id=post_id, subreddit=subreddit, title=title, content=content, created_at=created_at)
+
+def buckets(db):
+    return {row.term: (row.posts, row.score) for row in db.query(TrendTermBucket)}
+
+def test_extract_terms_skips_stopwords_and_short_words():
+    assert extract_terms("How to use asyncio in Python", None) == {
+        ("keyword", "use"), ("keyword", "asyncio"), ("keyword", "python"),
+        ("topic", "use asyncio"), ("topic", "asyncio python")
+    }
+    # A term counts once per post however often it appears
+    assert extract_terms("C++ and c++", "c++") == {("keyword", "c++"), ("topic", "c++ c++")}
+
+def test_engagement_and_edits_keep_buckets_consistent(db):
+    service = TrendIndexService(db)
+    first, second = post("a", "Django tips"), post("b", "Django signals")
+    for item in (first, second):
+        db.add(models.Post(post_id=item.post_id, subreddit=item.subreddit, title=item.title, content="", created_at=TODAY))
+    service.index_posts([first, second])
+    db.commit()
+    assert buckets(db) == {"django": (2, 0), "tips": (1, 0), "signals": (1, 0), "django tips": (1, 0), "django signals": (1, 0)}
+
+    service.record_engagement([
+        {"post_id": "a", "old_score": 0, "score": 7},
+        {"post_id": "b", "old_score": 0, "score": 0}
+    ])
+    db.add(PostRollup(post_id="a", account_id=1, subreddit="python", created_at=TODAY, score=7))
+    db.commit()
+    assert buckets(db)["django"] == (2, 7)
+
+    # An edit takes the old terms out with their score and indexes the new title
+    service.unindex_posts([first])
+    service.index_posts([post("a", "Flask tips")])
+    db.commit()
+    assert {term: value for term, value in buckets(db).items() if value != (0, 0)} == {
+        "django": (1, 0), "signals": (1, 0), "django signals": (1, 0),
+        "flask": (1, 7), "tips": (1, 7), "flask tips": (1, 7)
+    }
+
+def test_prune_drops_expired_buckets_and_old_one_off_terms(db):
+    service = TrendIndexService(db)
+    old = TODAY - timedelta(days=10)
+    service.index_posts([
+        post("a", "rust", created_at=old),
+        post("b", "golang", created_at=old), post("c", "golang", created_at=old),
+        post("d", "zig", created_at=TODAY),
+        post("e", "cobol", created_at=TODAY - timedelta(days=5000))
+    ])
+    db.commit()
+    assert service.prune(min_posts=2, grace_days=7) == 2
+    assert set(buckets(db)) == {"golang", "zig"}
+
+def test_analyze_trends_ranks_bursting_terms_first():
+    async def scenario():
+        engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+        async with engine.begin() as conn:
+            await conn.run_sync(lambda sync: models.Base.metadata.create_all(sync, tables=TABLES))
+        async with AsyncSession(engine) as db:
+            posts = []
+            for day in range(28):
+                created_at = TODAY - timedelta(days=day)
+                posts.append(post(f"steady{day}", "pandas dataframe", created_at=created_at))
+                if day < 7:
+                    posts += [post(f"burst{day}-{n}", "polars", created_at=created_at) for n in range(3)]
+            await db.run_sync(lambda sync: TrendIndexService(sync).index_posts(posts))
+            await db.commit()
+            result = await TrendIndexService(db).analyze_trends("python", "28d", limit=5)
+        await engine.dispose()
+        return result
+
+    result = asyncio.run(scenario())
+    keywords = {item["term"]: item for item in result["keyword_trends"]}
+    assert result["keyword_trends"][0]["term"] == "polars"
+    assert (keywords["polars"]["recent_posts"], keywords["polars"]["baseline_posts"]) == (21, 0)
+    assert (keywords["pandas"]["recent_posts"], keywords["pandas"]["baseline_posts"]) == (7, 21)
+    assert keywords["pandas"]["burst_score"] == 0
+    assert result["predictions"]["rising_keywords"] == ["polars"]
+    assert result["topic_trends"][0]["term"] == "pandas dataframe"
\ No newline at end of file
@@ -0,0 +1,171 @@
+import json
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from fastapi.encoders import jsonable_encoder
+from config import get_settings
+
+settings = get_settings()
+
+class MemoryBackend:
+    """In-process LRU store bounded by entry count and total payload bytes"""
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.counters: Dict[str, int] = {}
+        self.size = 0
+        self.evictions = 0
+
+    async def lookup(self, key: str, tags: List[str]) -> Tuple[Optional[bytes], List[int]]:
+        """The entry under key and the current version of each tag"""
+        return self._get(key), [self.counters.get(tag, 0) for tag in tags]
+
+    def _get(self, key: str) -> Optional[bytes]:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            self._delete(key)
+            return None
+        self.entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: int):
+        if len(value) > self.max_bytes:
+            return
+        self._delete(key)
+        self.entries[key] = (time.monotonic() + ttl, value)
+        self.size += len(value)
+
+        while len(self.entries) > self.max_entries or self.size > self.max_bytes:
+            _, (_, evicted) = self.entries.popitem(last=False)
+            self.size -= len(evicted)
+            self.evictions += 1
+
+    def _delete(self, key: str):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.size -= len(entry[1])
+
+    async def delete(self, key: str):
+        self._delete(key)
+
+    async def incr(self, tag: str):
+        self.counters[tag] = self.counters.get(tag, 0) + 1
+
+    async def clear(self):
+        self.entries.clear()
+        self.size = 0
+
+    def info(self) -> Dict:
+        return {"entries": len(self.entries), "bytes": self.size, "evictions": self.evictions}
+
+class RedisBackend:
+    """Shared store for several workers; takes any redis.asyncio compatible client"""
+
+    def __init__(self, client, prefix: str = "cache:"):
+        self.client = client
+        self.prefix = prefix
+
+    async def lookup(self, key: str, tags: List[str]) -> Tuple[Optional[bytes], List[int]]:
+        """The entry under key and the current version of each tag, in one round trip"""
+        value, *versions = await self.client.mget(
+            [self.prefix + key, *(self.prefix + "tag:" + tag for tag in tags)]
+        )
+        return value, [int(version) if version is not None else 0 for version in versions]
+
+    async def set(self, key: str, value: bytes, ttl: int):
+        await self.client.set(self.prefix + key, value, ex=ttl)
+
+    async def delete(self, key: str):
+        await self.client.delete(self.prefix + key)
+
+    async def incr(self, tag: str):
+        await self.client.incr(self.prefix + "tag:" + tag)
+
+    async def clear(self):
+        async for key in self.client.scan_iter(match=self.prefix + "*"):
+            await self.client.delete(key)
+
+    def info(self) -> Dict:
+        return {}
+
+class ResponseCache:
+    """TTL cache for computed API responses.
+
+    Entries are tagged with the subreddit and account they were computed for
+    and stored with the tag versions they were computed at. Invalidating a
+    tag bumps its version, so an entry whose versions no longer match is
+    never returned and is overwritten by the next computation. A lookup
+    reads the entry and the versions together, one round trip on Redis.
+    """
+
+    def __init__(self, backend, ttl: int):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _tags(subreddit: Optional[str], account_id: Optional[int]) -> List[str]:
+        tags = []
+        if subreddit is not None:
+            tags.append(f"subreddit:{subreddit.lower()}")
+        if account_id is not None:
+            tags.append(f"account:{account_id}")
+        return tags
+
+    @staticmethod
+    def _key(endpoint: str, subreddit, account_id, timeframe) -> str:
+        return "|".join([endpoint, str(subreddit), str(account_id), str(timeframe)])
+
+    async def get_or_compute(
+        self,
+        endpoint: str,
+        compute: Callable[[], Awaitable[Any]],
+        subreddit: Optional[str] = None,
+        account_id: Optional[int] = None,
+        timeframe: Optional[str] = None
+    ) -> Any:
+        """Return the cached response for these parameters or compute and store it"""
+        key = self._key(endpoint, subreddit, account_id, timeframe)
+        cached, versions = await self.backend.lookup(key, self._tags(subreddit, account_id))
+        if cached is not None:
+            entry = json.loads(cached)
+            if entry["versions"] == versions:
+                self.hits += 1
+                return entry["value"]
+
+        self.misses += 1
+        value = jsonable_encoder(await compute())
+        # Versions from before computing: an invalidation meanwhile makes this entry stale at once
+        await self.backend.set(key, json.dumps({"versions": versions, "value": value}).encode(), self.ttl)
+        return value
+
+    async def invalidate(self, subreddit: Optional[str] = None, account_id: Optional[int] = None):
+        """Drop every entry computed for this subreddit and/or account"""
+        for tag in self._tags(subreddit, account_id):
+            await self.backend.incr(tag)
+
+    def stats(self) -> Dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            **self.backend.info()
+        }
+
+@lru_cache()
+def get_response_cache() -> ResponseCache:
+    """Get the process-wide response cache"""
+    if settings.CACHE_BACKEND == "redis":
+        import redis.asyncio as redis
+        backend = RedisBackend(redis.from_url(settings.CACHE_REDIS_URL))
+    else:
+        backend = MemoryBackend(settings.CACHE_MAX_ENTRIES, settings.CACHE_MAX_BYTES)
+    return ResponseCache(backend, settings.CACHE_TTL)
@@ -27,14 +27,14 @@ async def error_handler(request: Request, exc: Exception) -> JSONResponse:
     """Global error handler for all exceptions"""
     
     if isinstance(exc, HTTPException):
-        app_logger.warning(f"HTTP Exception: {exc.detail}")
+        app_logger.warning("HTTP Exception: %s", exc.detail)
         return JSONResponse(
             status_code=exc.status_code,
             content={"error": exc.detail}
         )
 
     if isinstance(exc, PRAWException):
-        app_logger.error(f"Reddit API Error: {str(exc)}")
+        app_logger.error("Reddit API Error: %s", exc)
         return JSONResponse(
             status_code=503,
             content={
@@ -44,7 +44,7 @@ async def error_handler(request: Request, exc: Exception) -> JSONResponse:
         )
 
     if isinstance(exc, SQLAlchemyError):
-        app_logger.error(f"Database Error: {str(exc)}")
+        app_logger.error("Database Error: %s", exc)
         return JSONResponse(
             status_code=500,
             content={
@@ -54,7 +54,7 @@ async def error_handler(request: Request, exc: Exception) -> JSONResponse:
         )
 
     if isinstance(exc, BotError):
-        app_logger.error(f"Bot Error: {exc.message} (Code: {exc.error_code})")
+        app_logger.error("Bot Error: %s (Code: %s)", exc.message, exc.error_code)
         return JSONResponse(
             status_code=400,
             content={
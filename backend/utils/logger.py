@@ -1,12 +1,26 @@
+import atexit
+import json
 import logging
+import queue
 import sys
-from datetime import datetime
+from contextvars import ContextVar
+from datetime import datetime, timezone
 from pathlib import Path
-from logging.handlers import RotatingFileHandler
+from typing import Dict, List, Optional
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from config import get_settings
+
+settings = get_settings()
+
+# Id of the HTTP request being handled, set by ErrorHandlingMiddleware
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+# Attributes every LogRecord has; anything else came in through extra=
+RECORD_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id"}
 
 class CustomFormatter(logging.Formatter):
     """Custom formatter with colors for console output"""
-    
+
     grey = "\x1b[38;21m"
     blue = "\x1b[38;5;39m"
     yellow = "\x1b[38;5;226m"
@@ -14,7 +28,7 @@ class CustomFormatter(logging.Formatter):
     bold_red = "\x1b[31;1m"
     reset = "\x1b[0m"
 
-    format_str = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    format_str = settings.LOG_FORMAT
 
     FORMATS = {
         logging.DEBUG: grey + format_str + reset,
@@ -24,39 +38,134 @@ class CustomFormatter(logging.Formatter):
         logging.CRITICAL: bold_red + format_str + reset
     }
 
+    def __init__(self):
+        super().__init__(self.format_str)
+        # Built once instead of per record
+        self.formatters = {level: logging.Formatter(log_fmt) for level, log_fmt in self.FORMATS.items()}
+
     def format(self, record):
-        log_fmt = self.FORMATS.get(record.levelno)
-        formatter = logging.Formatter(log_fmt)
-        return formatter.format(record)
+        formatter = self.formatters.get(record.levelno)
+        return formatter.format(record) if formatter else super().format(record)
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with the request id and any extra= fields"""
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        request_id = getattr(record, "request_id", None)
+        if request_id:
+            entry["request_id"] = request_id
+        for key, value in record.__dict__.items():
+            if key not in RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+class NonBlockingQueueHandler(QueueHandler):
+    """QueueHandler that never waits on the listener.
+
+    Only the request id is captured on the calling thread; message
+    arguments are merged and formatted on the listener thread. When the
+    queue is full the record is dropped and counted rather than blocking
+    the event loop behind slow disk I/O.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # The context variable is only visible here, not on the listener thread
+        record.request_id = request_id_var.get()
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+class LazyRotatingFileHandler(RotatingFileHandler):
+    """RotatingFileHandler that creates the file and its directory on the first record"""
+
+    def __init__(self, filename, **kwargs):
+        super().__init__(filename, delay=True, **kwargs)
+
+    def _open(self):
+        Path(self.baseFilename).parent.mkdir(parents=True, exist_ok=True)
+        return super()._open()
+
+class LogRouter(logging.Handler):
+    """Hands each queued record to the handlers set up for its logger or nearest parent"""
+
+    def __init__(self):
+        super().__init__()
+        self.routes: Dict[str, List[logging.Handler]] = {}
+
+    def handle(self, record):
+        name = record.name
+        while name not in self.routes:
+            if "." not in name:
+                return False
+            name = name.rsplit(".", 1)[0]
+        for handler in self.routes[name]:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+        return True
+
+# One queue and one listener thread per process, shared by every logger
+log_router = LogRouter()
+queue_handler = NonBlockingQueueHandler(queue.Queue(maxsize=settings.LOG_QUEUE_SIZE))
+log_listener: Optional[QueueListener] = None
+
+def _start_listener():
+    global log_listener
+    if log_listener is None:
+        log_listener = QueueListener(queue_handler.queue, log_router)
+        log_listener.start()
+        atexit.register(log_listener.stop)
+
+def setup_logger(name: str, log_file: str = None, level=settings.LOG_LEVEL):
+    """Set up logger whose file and console handlers run on the shared listener thread"""
 
-def setup_logger(name: str, log_file: str = None, level=logging.INFO):
-    """Set up logger with both file and console handlers"""
-    
     logger = logging.getLogger(name)
     logger.setLevel(level)
 
-    # Create logs directory if it doesn't exist
+    handlers = []
+
+    # Nothing touches the disk until the first record, so importing stays side-effect free
     if log_file:
-        log_dir = Path("logs")
-        log_dir.mkdir(exist_ok=True)
-        
         # File handler with rotation
-        file_handler = RotatingFileHandler(
-            log_dir / log_file,
+        file_handler = LazyRotatingFileHandler(
+            Path("logs") / log_file,
             maxBytes=10485760,  # 10MB
             backupCount=5
         )
-        file_handler.setFormatter(logging.Formatter(
-            '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-        ))
-        logger.addHandler(file_handler)
+        file_handler.setFormatter(JsonFormatter())
+        handlers.append(file_handler)
 
     # Console handler with colors
     console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setFormatter(CustomFormatter())
-    logger.addHandler(console_handler)
+    console_handler.setFormatter(JsonFormatter() if settings.LOG_JSON_CONSOLE else CustomFormatter())
+    handlers.append(console_handler)
+
+    log_router.routes[name] = handlers
+    _start_listener()
+    if queue_handler not in logger.handlers:
+        logger.addHandler(queue_handler)
 
     return logger
 
 # Create main application logger
-app_logger = setup_logger('reddit_bot', 'app.log')
\ No newline at end of file
+app_logger = setup_logger('reddit_bot', 'app.log')
+
+# Per-request access log, sampled by ErrorHandlingMiddleware
+access_logger = app_logger.getChild('access')
\ No newline at end of file
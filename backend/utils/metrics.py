@@ -0,0 +1,134 @@
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Seconds spent in the database and the Reddit API by the current request
+request_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("request_timings", default=None)
+
+class Histogram:
+    """Cumulative histogram in the Prometheus exposition layout"""
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def render(self, name: str, labels: str) -> list:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {self.count}')
+        lines.append(f"{name}_sum{{{labels}}} {self.sum}")
+        lines.append(f"{name}_count{{{labels}}} {self.count}")
+        return lines
+
+class MetricsRegistry:
+    """Request and dependency metrics for the /metrics endpoint"""
+
+    def __init__(self):
+        self.latency: Dict[Tuple[str, str], Histogram] = defaultdict(Histogram)
+        self.db_time: Dict[Tuple[str, str], Histogram] = defaultdict(Histogram)
+        self.reddit_time: Dict[Tuple[str, str], Histogram] = defaultdict(Histogram)
+        self.statuses: Dict[Tuple[str, str, int], int] = defaultdict(int)
+        self.reddit_calls = Histogram()
+        self.in_flight = 0
+
+    def observe_request(self, method: str, route: str, status: int, duration: float, timings: Dict[str, float]):
+        key = (method, route)
+        self.latency[key].observe(duration)
+        self.db_time[key].observe(timings["db"])
+        self.reddit_time[key].observe(timings["reddit"])
+        self.statuses[(method, route, status)] += 1
+
+    def render(self) -> str:
+        lines = [
+            "# TYPE http_requests_in_flight gauge",
+            f"http_requests_in_flight {self.in_flight}",
+        ]
+
+        for name, histograms in (
+            ("http_request_duration_seconds", self.latency),
+            ("http_request_db_seconds", self.db_time),
+            ("http_request_reddit_seconds", self.reddit_time),
+        ):
+            lines.append(f"# TYPE {name} histogram")
+            for (method, route), histogram in sorted(histograms.items()):
+                lines.extend(histogram.render(name, f'method="{method}",route="{route}"'))
+
+        lines.append("# TYPE http_responses_total counter")
+        for (method, route, status), count in sorted(self.statuses.items()):
+            lines.append(f'http_responses_total{{method="{method}",route="{route}",status="{status}"}} {count}')
+
+        lines.append("# TYPE reddit_api_call_seconds histogram")
+        lines.extend(self.reddit_calls.render("reddit_api_call_seconds", 'client="praw"'))
+        return "\n".join(lines) + "\n"
+
+metrics = MetricsRegistry()
+
+def add_request_time(kind: str, seconds: float):
+    """Charge time spent in a dependency to the request being served, if any"""
+    timings = request_timings.get()
+    if timings is not None:
+        timings[kind] += seconds
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+def _query_started(conn) -> Optional[float]:
+    # Connections checked out before this module was imported never pushed a start
+    starts = conn.info.get("query_start")
+    return starts.pop() if starts else None
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = _query_started(conn)
+    if started is not None:
+        add_request_time("db", time.perf_counter() - started)
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(context):
+    # A failed statement never reaches after_cursor_execute; drop its start so the stack stays paired
+    if context.connection is not None:
+        _query_started(context.connection)
+
+class TimedRequestor:
+    """prawcore requestor that records time spent on Reddit API calls.
+
+    Pass as ``requestor_class`` when building a ``praw.Reddit`` client. It
+    wraps a prawcore ``Requestor`` instead of subclassing it, so prawcore
+    is only imported once the first client is built.
+    """
+
+    def __init__(self, *args, **kwargs):
+        from prawcore import Requestor
+
+        self._requestor = Requestor(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._requestor, name)
+
+    def request(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return self._requestor.request(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            metrics.reddit_calls.observe(elapsed)
+            add_request_time("reddit", elapsed)
@@ -0,0 +1,31 @@
+import base64
+import json
+from datetime import date, datetime, time, timedelta
+from typing import Optional, Tuple, Union
+
+class InvalidCursor(ValueError):
+    pass
+
+def encode_cursor(moment: datetime, row_id: int) -> str:
+    """Opaque cursor for the (timestamp, id) keyset of the last row on a page"""
+    payload = json.dumps([moment.isoformat(), row_id]).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        moment, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(moment), int(row_id)
+    except (ValueError, TypeError):
+        raise InvalidCursor("Invalid pagination cursor")
+
+def parse_date_bound(value: Optional[Union[datetime, date]], end: bool = False) -> Optional[datetime]:
+    """Turn a query date into a datetime bound.
+
+    A bare date used as an end bound covers that whole day, so it becomes
+    midnight of the following day and should be compared exclusively.
+    """
+    if value is None or isinstance(value, datetime):
+        return value
+    bound = datetime.combine(value, time.min)
+    return bound + timedelta(days=1) if end else bound
@@ -0,0 +1,217 @@
+import threading
+import time
+from typing import TYPE_CHECKING, Callable, Dict, Hashable, List, Optional
+from config import get_settings
+from .metrics import TimedRequestor
+
+if TYPE_CHECKING:
+    import praw
+    import requests
+
+settings = get_settings()
+
+APP_CLIENT = "app"  # key of the client built from REDDIT_CLIENT_ID/SECRET
+
+class TrackedRequestor(TimedRequestor):
+    """TimedRequestor that reports every response to a callback"""
+
+    def __init__(self, *args, on_response: Callable = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.on_response = on_response
+
+    def request(self, *args, **kwargs):
+        try:
+            response = super().request(*args, **kwargs)
+        except Exception:
+            if self.on_response:
+                self.on_response(None)
+            raise
+        if self.on_response:
+            self.on_response(response)
+        return response
+
+def _token_expires_in(authorizer) -> Optional[float]:
+    """Seconds until a prawcore authorizer's token expires, or None without a token"""
+    if authorizer is None or getattr(authorizer, "access_token", None) is None:
+        return None
+    # prawcore 2.4+ tracks expiry on the monotonic clock, older releases on the wall clock
+    expires_ns = getattr(authorizer, "_expiration_timestamp_ns", None)
+    if expires_ns is not None:
+        return (expires_ns - time.monotonic_ns()) / 1_000_000_000
+    expires_at = getattr(authorizer, "_expiration_timestamp", None)
+    if expires_at is not None:
+        return expires_at - time.time()
+    return None
+
+def _serialize_requests(client: "praw.Reddit", lock: threading.RLock):
+    """Run every request of a client's prawcore sessions under lock.
+
+    prawcore refreshes the token and updates its rate limiter inside
+    Session.request without locking, so two threads using one client can
+    refresh the same token twice or lose rate limit state.
+    """
+    cores = (getattr(client, name, None) for name in ("_core", "_read_only_core", "_authorized_core"))
+    for core in {id(core): core for core in cores if core is not None}.values():
+        request = core.request
+
+        def locked(*args, _request=request, **kwargs):
+            with lock:
+                return _request(*args, **kwargs)
+
+        core.request = locked
+
+class ClientStats:
+    __slots__ = ("requests", "errors", "remaining", "used", "reset_at", "last_request_at")
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.remaining: Optional[float] = None
+        self.used: Optional[int] = None
+        self.reset_at: Optional[float] = None
+        self.last_request_at: Optional[float] = None
+
+    def record(self, response):
+        self.requests += 1
+        self.last_request_at = time.time()
+        if response is None or response.status_code >= 400:
+            self.errors += 1
+        if response is None:
+            return
+
+        # Reddit reports the quota window on every OAuth response
+        headers = response.headers
+        if "x-ratelimit-remaining" in headers:
+            self.remaining = float(headers["x-ratelimit-remaining"])
+        if "x-ratelimit-used" in headers:
+            self.used = int(headers["x-ratelimit-used"])
+        if "x-ratelimit-reset" in headers:
+            self.reset_at = time.time() + float(headers["x-ratelimit-reset"])
+
+    def to_dict(self) -> Dict:
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "ratelimit_remaining": self.remaining,
+            "ratelimit_used": self.used,
+            "ratelimit_reset_in": max(self.reset_at - time.time(), 0) if self.reset_at else None,
+            "last_request_at": self.last_request_at
+        }
+
+class RedditClientManager:
+    """One cached PRAW client per account over a shared connection pool.
+
+    Clients are built once per credential set and reused, so each account
+    fetches an OAuth token once per token lifetime instead of once per call.
+    All clients share one requests.Session, which keeps TLS connections to
+    Reddit alive across clients. refresh_tokens() renews tokens shortly
+    before they expire so no API call has to wait for a token fetch.
+    Threads share a client, so each client's requests and token refreshes
+    run one at a time under that client's lock.
+    """
+
+    def __init__(self, session: Optional["requests.Session"] = None):
+        self.session = session  # built with the first client, like PRAW itself
+        self.clients: Dict[Hashable, "praw.Reddit"] = {}
+        self.credentials: Dict[Hashable, Dict] = {}
+        self.stats: Dict[Hashable, ClientStats] = {}
+        self.locks: Dict[Hashable, threading.RLock] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _pooled_session() -> "requests.Session":
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=settings.REDDIT_POOL_CONNECTIONS,
+            pool_maxsize=settings.REDDIT_POOL_MAXSIZE
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def _build(self, key: Hashable, credentials: Dict) -> "praw.Reddit":
+        # Importing PRAW takes a noticeable share of startup, so wait for the first client
+        import praw
+
+        if self.session is None:
+            self.session = self._pooled_session()
+        stats = self.stats.setdefault(key, ClientStats())
+        client = praw.Reddit(
+            client_id=credentials["client_id"],
+            client_secret=credentials["client_secret"],
+            username=credentials.get("username"),
+            user_agent=settings.REDDIT_USER_AGENT,
+            oauth_url=settings.REDDIT_OAUTH_URL,
+            reddit_url=settings.REDDIT_URL,
+            requestor_class=TrackedRequestor,
+            requestor_kwargs={"session": self.session, "on_response": stats.record}
+        )
+        _serialize_requests(client, self.locks.setdefault(key, threading.RLock()))
+        return client
+
+    def get(self, key: Hashable, credentials: Dict) -> "praw.Reddit":
+        """Cached client for an account, rebuilt when its credentials change"""
+        with self._lock:
+            client = self.clients.get(key)
+            if client is None or self.credentials.get(key) != credentials:
+                client = self._build(key, credentials)
+                self.clients[key] = client
+                self.credentials[key] = dict(credentials)
+            return client
+
+    def get_app(self) -> "praw.Reddit":
+        """Client for application-only calls such as analytics lookups"""
+        return self.get(APP_CLIENT, {
+            "client_id": settings.REDDIT_CLIENT_ID,
+            "client_secret": settings.REDDIT_CLIENT_SECRET
+        })
+
+    def evict(self, key: Hashable):
+        """Drop an account's client after its credentials changed or it was deleted"""
+        with self._lock:
+            self.clients.pop(key, None)
+            self.credentials.pop(key, None)
+            self.locks.pop(key, None)
+
+    def refresh_tokens(self) -> int:
+        """Renew tokens expiring within REDDIT_TOKEN_REFRESH_MARGIN; blocking"""
+        with self._lock:
+            clients = [(key, client, self.locks.setdefault(key, threading.RLock())) for key, client in self.clients.items()]
+
+        refreshed = 0
+        for key, client, lock in clients:
+            # prawcore keeps the authorizer private; a client that has not made a call has no token yet
+            authorizer = getattr(client._core, "_authorizer", None)
+            with lock:
+                # Checked under the lock, as a request may have just renewed the token
+                expires_in = _token_expires_in(authorizer)
+                if expires_in is None or expires_in > settings.REDDIT_TOKEN_REFRESH_MARGIN:
+                    continue
+                try:
+                    authorizer.refresh()
+                    refreshed += 1
+                except Exception:
+                    self.stats.setdefault(key, ClientStats()).errors += 1
+        return refreshed
+
+    def get_stats(self) -> Dict[str, Dict]:
+        return {str(key): stats.to_dict() for key, stats in self.stats.items()}
+
+    def render(self) -> List[str]:
+        """Prometheus lines for the /metrics endpoint"""
+        lines = ["# TYPE reddit_client_requests_total counter"]
+        for key, stats in self.stats.items():
+            lines.append(f'reddit_client_requests_total{{account="{key}"}} {stats.requests}')
+        lines.append("# TYPE reddit_client_errors_total counter")
+        for key, stats in self.stats.items():
+            lines.append(f'reddit_client_errors_total{{account="{key}"}} {stats.errors}')
+        lines.append("# TYPE reddit_ratelimit_remaining gauge")
+        for key, stats in self.stats.items():
+            if stats.remaining is not None:
+                lines.append(f'reddit_ratelimit_remaining{{account="{key}"}} {stats.remaining}')
+        return lines
+
+reddit_clients = RedditClientManager()
\ No newline at end of file
@@ -1,42 +1,36 @@
 "use client"
 
-import { useState } from 'react'
+import { useEffect, useRef, useState } from 'react'
 import { Sidebar } from "@/components/ui/sidebar"
 import { Card, CardContent, CardHeader, CardTitle, CardDescription, CardFooter } from "@/components/ui/card"
 import { Button } from "@/components/ui/button"
 import { Input } from "@/components/ui/input"
+import { Label } from "@/components/ui/label"
 import { Alert, AlertDescription } from "@/components/ui/alert"
 import { Progress } from "@/components/ui/progress"
-import { ScrollArea } from "@/components/ui/scroll-area"
 import { Badge } from "@/components/ui/badge"
-import { Tabs, TabsContent, TabsList, TabsTrigger } from "@/components/ui/tabs"
 import { useToast } from "@/hooks/use-toast"
-import { 
-  Table, 
-  TableBody, 
-  TableCell, 
-  TableHead, 
-  TableHeader, 
-  TableRow 
-} from "@/components/ui/table"
+import { API_URL, apiFetch } from "@/lib/api"
 import { 
   Download, 
   Upload, 
   FileSpreadsheet, 
-  AlertCircle,
   CheckCircle2,
-  XCircle,
-  Clock
+  XCircle
 } from "lucide-react"
 import * as XLSX from 'xlsx'
 
+const POLL_INTERVAL = 1000
+
 export default function BulkUpload() {
   const { toast } = useToast()
   const [uploadedFile, setUploadedFile] = useState(null)
-  const [parsedData, setParsedData] = useState([])
-  const [validationResults, setValidationResults] = useState([])
-  const [uploadProgress, setUploadProgress] = useState(0)
-  const [uploadStatus, setUploadStatus] = useState('idle') // idle, validating, uploading, complete, error
+  const [accountId, setAccountId] = useState('')
+  const [job, setJob] = useState(null)
+  const [uploadStatus, setUploadStatus] = useState('idle') // idle, ready, uploading, processing, complete, error
+  const pollTimer = useRef(null)
+
+  useEffect(() => () => clearTimeout(pollTimer.current), [])
 
   // Template structure for download
   const templateData = [
@@ -60,113 +54,57 @@ export default function BulkUpload() {
     XLSX.writeFile(wb, "reddit_bulk_upload_template.xlsx")
   }
 
-  const validateRow = (row, index) => {
-    const errors = []
-    
-    // Required fields
-    if (!row.title?.trim()) errors.push("Title is required")
-    if (!row.subreddit?.trim()) errors.push("Subreddit is required")
-    
-    // Title length
-    if (row.title?.length > 300) errors.push("Title exceeds 300 characters")
-    
-    // Valid datetime
-    if (row.scheduled_time) {
-      const date = new Date(row.scheduled_time)
-      if (isNaN(date.getTime())) errors.push("Invalid scheduled time format")
-      if (date < new Date()) errors.push("Scheduled time must be in the future")
-    }
-    
-    // Numeric values
-    if (row.auto_delete_hours && isNaN(Number(row.auto_delete_hours))) {
-      errors.push("Auto delete hours must be a number")
-    }
-    if (row.auto_delete_score && isNaN(Number(row.auto_delete_score))) {
-      errors.push("Auto delete score must be a number")
-    }
-    
-    // Boolean values
-    if (row.nsfw && !['true', 'false'].includes(row.nsfw.toLowerCase())) {
-      errors.push("NSFW must be true or false")
-    }
-    if (row.spoiler && !['true', 'false'].includes(row.spoiler.toLowerCase())) {
-      errors.push("Spoiler must be true or false")
-    }
-
-    return {
-      rowIndex: index,
-      valid: errors.length === 0,
-      errors
-    }
-  }
-
   const handleFileUpload = (event) => {
     const file = event.target.files[0]
     if (file) {
+      // Parsing and validation happen on the server, which streams the file
       setUploadedFile(file)
-      setUploadStatus('validating')
-      
-      const reader = new FileReader()
-      reader.onload = (e) => {
-        try {
-          const workbook = XLSX.read(e.target.result, { type: 'array' })
-          const sheetName = workbook.SheetNames[0]
-          const worksheet = workbook.Sheets[sheetName]
-          const data = XLSX.utils.sheet_to_json(worksheet)
-          
-          setParsedData(data)
-          const validations = data.map((row, index) => validateRow(row, index))
-          setValidationResults(validations)
-          
-          setUploadStatus(validations.every(v => v.valid) ? 'ready' : 'error')
-          
-          toast({
-            title: validations.every(v => v.valid) 
-              ? "File validated successfully" 
-              : "Validation errors found",
-            description: `${validations.filter(v => v.valid).length} of ${validations.length} rows are valid`,
-            variant: validations.every(v => v.valid) ? "default" : "destructive"
-          })
-        } catch (error) {
-          setUploadStatus('error')
-          toast({
-            title: "Error parsing file",
-            description: "Please ensure the file follows the template format",
-            variant: "destructive"
-          })
-        }
-      }
-      reader.readAsArrayBuffer(file)
+      setJob(null)
+      setUploadStatus('ready')
     }
   }
 
-  const handleBulkUpload = async () => {
-    if (uploadStatus !== 'ready') return
-    
-    setUploadStatus('uploading')
-    let progress = 0
-    
-    for (const [index, post] of parsedData.entries()) {
-      try {
-        // Simulate API call - replace with actual API integration
-        await new Promise(resolve => setTimeout(resolve, 500))
-        
-        progress = ((index + 1) / parsedData.length) * 100
-        setUploadProgress(progress)
-      } catch (error) {
+  const pollJob = async (jobId) => {
+    try {
+      const current = await apiFetch(`/posts/import/${jobId}`)
+      setJob(current)
+      if (current.status === 'complete' || current.status === 'failed') {
+        setUploadStatus(current.status === 'complete' ? 'complete' : 'error')
         toast({
-          title: "Error uploading post",
-          description: `Failed to upload post: ${post.title}`,
-          variant: "destructive"
+          title: current.status === 'complete' ? "Bulk upload complete" : "Bulk upload failed",
+          description: current.status === 'complete'
+            ? `Scheduled ${current.rows_imported} of ${current.rows_processed} posts`
+            : current.error,
+          variant: current.rows_failed || current.status === 'failed' ? "destructive" : "default"
         })
+        return
       }
+      pollTimer.current = setTimeout(() => pollJob(jobId), POLL_INTERVAL)
+    } catch (error) {
+      setUploadStatus('error')
+      toast({ title: "Lost track of the upload", description: error.message, variant: "destructive" })
+    }
+  }
+
+  const handleBulkUpload = async () => {
+    if (uploadStatus !== 'ready' || !accountId) return
+
+    setUploadStatus('uploading')
+    const form = new FormData()
+    form.append('file', uploadedFile)
+    form.append('account_id', accountId)
+    // Naive times in the sheet are in the uploader's timezone
+    form.append('timezone', Intl.DateTimeFormat().resolvedOptions().timeZone)
+
+    try {
+      const created = await apiFetch('/posts/import', { method: 'POST', body: form })
+      setJob(created)
+      setUploadStatus('processing')
+      pollJob(created.job_id)
+    } catch (error) {
+      setUploadStatus('error')
+      toast({ title: "Error uploading file", description: error.message, variant: "destructive" })
     }
-    
-    setUploadStatus('complete')
-    toast({
-      title: "Bulk upload complete",
-      description: `Successfully scheduled ${parsedData.length} posts`
-    })
   }
 
   return (
@@ -220,20 +158,32 @@ export default function BulkUpload() {
                     </div>
                   </div>
 
+                  <div className="space-y-2">
+                    <Label htmlFor="account-id">Account ID</Label>
+                    <Input
+                      id="account-id"
+                      type="number"
+                      min="1"
+                      value={accountId}
+                      onChange={(e) => setAccountId(e.target.value)}
+                    />
+                  </div>
+
                   {uploadedFile && (
                     <Alert>
                       <FileSpreadsheet className="h-4 w-4" />
                       <AlertDescription>
-                        {uploadedFile.name} - {parsedData.length} posts
+                        {uploadedFile.name}
+                        {job && ` - ${job.rows_processed} rows processed`}
                       </AlertDescription>
                     </Alert>
                   )}
 
-                  {uploadStatus === 'uploading' && (
+                  {(uploadStatus === 'uploading' || uploadStatus === 'processing') && (
                     <div className="space-y-2">
-                      <Progress value={uploadProgress} />
+                      <Progress value={uploadStatus === 'uploading' ? 0 : null} />
                       <p className="text-sm text-muted-foreground">
-                        Uploading {Math.round(uploadProgress)}%
+                        {uploadStatus === 'uploading' ? 'Uploading file' : `Importing, ${job?.rows_processed ?? 0} rows so far`}
                       </p>
                     </div>
                   )}
@@ -243,101 +193,46 @@ export default function BulkUpload() {
                 <Button 
                   className="w-full"
                   onClick={handleBulkUpload}
-                  disabled={uploadStatus !== 'ready'}
+                  disabled={uploadStatus !== 'ready' || !accountId}
                 >
-                  Schedule {parsedData.length} Posts
+                  Schedule Posts
                 </Button>
               </CardFooter>
             </Card>
 
-            {/* Validation Results */}
-            {validationResults.length > 0 && (
+            {/* Import Results */}
+            {job && (uploadStatus === 'complete' || uploadStatus === 'error') && (
               <Card>
                 <CardHeader>
-                  <CardTitle>Validation Results</CardTitle>
+                  <CardTitle>Import Results</CardTitle>
                   <CardDescription>
-                    {validationResults.filter(v => v.valid).length} of {validationResults.length} posts are valid
+                    {job.rows_imported} of {job.rows_processed} posts were scheduled
                   </CardDescription>
                 </CardHeader>
-                <CardContent>
-                  <ScrollArea className="h-[400px]">
-                    <Table>
-                      <TableHeader>
-                        <TableRow>
-                          <TableHead>Row</TableHead>
-                          <TableHead>Status</TableHead>
-                          <TableHead>Title</TableHead>
-                          <TableHead>Subreddit</TableHead>
-                          <TableHead>Scheduled Time</TableHead>
-                          <TableHead>Issues</TableHead>
-                        </TableRow>
-                      </TableHeader>
-                      <TableBody>
-                        {parsedData.map((row, index) => {
-                          const validation = validationResults[index]
-                          return (
-                            <TableRow key={index}>
-                              <TableCell>{index + 1}</TableCell>
-                              <TableCell>
-                                {validation.valid ? (
-                                  <CheckCircle2 className="h-4 w-4 text-green-500" />
-                                ) : (
-                                  <XCircle className="h-4 w-4 text-red-500" />
-                                )}
-                              </TableCell>
-                              <TableCell>{row.title}</TableCell>
-                              <TableCell>r/{row.subreddit}</TableCell>
-                              <TableCell>{row.scheduled_time}</TableCell>
-                              <TableCell>
-                                {validation.errors.map((error, i) => (
-                                  <Badge 
-                                    key={i}
-                                    variant="destructive"
-                                    className="mr-1 mb-1"
-                                  >
-                                    {error}
-                                  </Badge>
-                                ))}
-                              </TableCell>
-                            </TableRow>
-                          )
-                        })}
-                      </TableBody>
-                    </Table>
-                  </ScrollArea>
-                </CardContent>
-              </Card>
-            )}
-
-            {/* Scheduled Posts Preview */}
-            {uploadStatus === 'complete' && (
-              <Card>
-                <CardHeader>
-                  <CardTitle>Scheduled Posts</CardTitle>
-                  <CardDescription>
-                    Overview of your scheduled posts
-                  </CardDescription>
-                </CardHeader>
-                <CardContent>
-                  <ScrollArea className="h-[300px]">
-                    {parsedData.map((post, index) => (
-                      <div
-                        key={index}
-                        className="flex items-center space-x-4 border-b py-4"
-                      >
-                        <Clock className="h-4 w-4 text-muted-foreground" />
-                        <div className="flex-1 space-y-1">
-                          <p className="font-medium">{post.title}</p>
-                          <div className="flex items-center space-x-2">
-                            <Badge>r/{post.subreddit}</Badge>
-                            <span className="text-sm text-muted-foreground">
-                              {post.scheduled_time}
-                            </span>
-                          </div>
-                        </div>
-                      </div>
-                    ))}
-                  </ScrollArea>
+                <CardContent className="space-y-4">
+                  <div className="flex items-center space-x-4">
+                    <Badge variant="secondary">
+                      <CheckCircle2 className="mr-1 h-4 w-4 text-green-500" />
+                      {job.rows_imported} imported
+                    </Badge>
+                    <Badge variant={job.rows_failed ? "destructive" : "secondary"}>
+                      <XCircle className="mr-1 h-4 w-4" />
+                      {job.rows_failed} rejected
+                    </Badge>
+                  </div>
+                  {job.error && (
+                    <Alert variant="destructive">
+                      <AlertDescription>{job.error}</AlertDescription>
+                    </Alert>
+                  )}
+                  {job.has_error_report && (
+                    <Button variant="outline" asChild>
+                      <a href={`${API_URL}/posts/import/${job.job_id}/errors`}>
+                        <Download className="mr-2 h-4 w-4" />
+                        Download Error Report
+                      </a>
+                    </Button>
+                  )}
                 </CardContent>
               </Card>
             )}
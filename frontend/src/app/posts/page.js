@@ -1,13 +1,14 @@
 // Add to imports
 import { FlairSelector } from "@/components/flair-selector"
-import { validateFlair } from "@/lib/flair-validation"
+import { fetchFlairs, validateFlair } from "@/lib/flair-validation"
 
 // Add validation check before scheduling/posting
-const validatePost = () => {
-  const subreddits = currentDraft.subreddits.split(',').map(s => s.trim())
+const validatePost = async () => {
+  const subreddits = currentDraft.subreddits.split(',').map(s => s.trim()).filter(Boolean)
+  const flairs = await Promise.all(subreddits.map(fetchFlairs))
   
-  for (const subreddit of subreddits) {
-    const error = validateFlair(subreddit, currentDraft.flair)
+  for (const [index, subreddit] of subreddits.entries()) {
+    const error = validateFlair(subreddit, currentDraft.flair, flairs[index])
     if (error) {
       toast({
         title: "Invalid Flair",
@@ -22,8 +23,8 @@ const validatePost = () => {
 }
 
 // Update handleSchedulePost
-const handleSchedulePost = (scheduleDetails) => {
-  if (!validatePost()) return
+const handleSchedulePost = async (scheduleDetails) => {
+  if (!(await validatePost())) return
 
   // ... rest of the scheduling logic ...
 }
@@ -18,7 +18,7 @@ import {
   SelectValue,
 } from "@/components/ui/select"
 import { Tag, Plus, AlertCircle } from "lucide-react"
-import { validateFlair, getAvailableFlairs, isCustomFlairAllowed } from "@/lib/flair-validation"
+import { fetchFlairs, validateFlair, getAvailableFlairs, isCustomFlairAllowed } from "@/lib/flair-validation"
 
 export function FlairSelector({ 
   subreddits, 
@@ -33,27 +33,41 @@ export function FlairSelector({
     textColor: "#1e293b"
   })
   const [validationError, setValidationError] = useState(null)
+  const [flairs, setFlairs] = useState(null)
+  const [loadingFlairs, setLoadingFlairs] = useState(false)
 
-  // Update available flairs when subreddit changes
+  // Load the subreddit's flair templates from the backend when it changes
   useEffect(() => {
-    if (selectedSubreddit) {
-      const error = validateFlair(selectedSubreddit, currentFlair)
+    if (!selectedSubreddit) return
+    let cancelled = false
+    setLoadingFlairs(true)
+    fetchFlairs(selectedSubreddit).then((loaded) => {
+      if (cancelled) return
+      setFlairs(loaded)
+      setLoadingFlairs(false)
+    })
+    return () => { cancelled = true }
+  }, [selectedSubreddit])
+
+  useEffect(() => {
+    if (selectedSubreddit && !loadingFlairs) {
+      const error = validateFlair(selectedSubreddit, currentFlair, flairs)
       setValidationError(error)
     }
-  }, [selectedSubreddit, currentFlair])
+  }, [selectedSubreddit, currentFlair, flairs, loadingFlairs])
 
   const subredditList = subreddits.split(',').map(s => s.trim()).filter(Boolean)
-  const availableFlairs = selectedSubreddit ? getAvailableFlairs(selectedSubreddit) : []
-  const allowCustom = selectedSubreddit ? isCustomFlairAllowed(selectedSubreddit) : false
+  const availableFlairs = selectedSubreddit ? getAvailableFlairs(flairs) : []
+  const allowCustom = selectedSubreddit && !loadingFlairs ? isCustomFlairAllowed(flairs) : false
 
   const handleFlairChange = (flair) => {
-    const error = validateFlair(selectedSubreddit, flair)
+    const error = validateFlair(selectedSubreddit, flair, flairs)
     setValidationError(error)
     onFlairChange(error ? null : flair)
   }
 
   const handleCustomFlairAdd = (customFlair) => {
-    const error = validateFlair(selectedSubreddit, customFlair)
+    const error = validateFlair(selectedSubreddit, customFlair, flairs)
     setValidationError(error)
     if (!error) {
       onCustomFlairAdd(customFlair)
@@ -123,7 +137,11 @@ export function FlairSelector({
           </SelectContent>
         </Select>
 
-        {selectedSubreddit && (
+        {selectedSubreddit && loadingFlairs && (
+          <p className="text-sm text-muted-foreground">Loading flairs for r/{selectedSubreddit}...</p>
+        )}
+
+        {selectedSubreddit && !loadingFlairs && (
           <>
             <div className="flex flex-wrap gap-2">
               {availableFlairs.map((flair) => (
@@ -0,0 +1,10 @@
+export const API_URL = process.env.NEXT_PUBLIC_API_URL || "http://localhost:8000/api/v1"
+
+export async function apiFetch(path, options = {}) {
+  const response = await fetch(`${API_URL}${path}`, options)
+  if (!response.ok) {
+    const body = await response.json().catch(() => ({}))
+    throw new Error(body.detail || `Request failed with status ${response.status}`)
+  }
+  return response.json()
+}